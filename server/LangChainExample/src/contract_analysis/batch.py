@@ -0,0 +1,177 @@
+"""
+Answer many contract questions in one process.
+
+    python -m src.contract_analysis.batch queries.jsonl reports.jsonl [--concurrency 4]
+
+Every input line is a JSON object with a "query" and optionally an "id" and
+further crew inputs. The contracts are indexed once, then crews run
+concurrently on shared clients and caches. Each report is appended to the
+output file as soon as its crew finishes; no report.md is written. Queries
+whose id already has a successful report in the output are skipped, so an
+interrupted run resumes.
+
+A query without an "id" is identified by its line number, so inserting or
+removing lines changes which queries count as answered. Give every query an
+explicit id when the input file may be edited between runs.
+"""
+
+import argparse
+import json
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, Iterator, List, Optional, Set
+
+from src.contract_analysis.indexer import ensure_fresh_index
+
+logger = logging.getLogger(__name__)
+
+
+def read_queries(path: str) -> Iterator[Dict]:
+    """
+    Query records of a JSONL file, with a line-number id where none is given.
+    Line-number ids only stay stable while the file is not edited.
+    """
+    with open(path, "r", encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if not record.get("query"):
+                raise ValueError(f"Line {number} of {path} has no query")
+            record.setdefault("id", str(number))
+            yield record
+
+
+def completed_ids(path: str) -> Set[str]:
+    """Ids that already have a successful report in an output file."""
+    done: Set[str] = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, "r", encoding="utf-8") as file:
+        for line in file:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # A line cut off by an interrupted run is retried
+                continue
+            if record.get("status") == "ok":
+                done.add(str(record.get("id")))
+    return done
+
+
+class BatchRunner:
+    """
+    Runs one crew per query with at most `concurrency` crews at a time.
+
+    Crews share the class-level QdrantVectorSearchTool, and through it the
+    Qdrant and OpenAI clients and the search caches, as well as the process-wide
+    embedding cache. A failing query is recorded with its error and does not
+    stop the others.
+    """
+
+    def __init__(self, output_path: str, concurrency: int = 4):
+        self.output_path = output_path
+        self.concurrency = max(concurrency, 1)
+        self._write_lock = threading.Lock()
+        self._terminate_partial_line()
+
+    def _terminate_partial_line(self) -> None:
+        """Make sure a line cut off by an interrupted run is not glued to the next report."""
+        if not os.path.exists(self.output_path) or not os.path.getsize(self.output_path):
+            return
+        with open(self.output_path, "rb+") as file:
+            file.seek(-1, os.SEEK_END)
+            if file.read(1) != b"\n":
+                file.write(b"\n")
+
+    def run(self, queries: List[Dict]) -> Dict[str, int]:
+        # Index once up front; the crews then skip their own freshness check
+        ensure_fresh_index()
+
+        counts = {"ok": 0, "error": 0}
+        with ThreadPoolExecutor(
+            max_workers=self.concurrency, thread_name_prefix="batch-crew"
+        ) as executor:
+            futures = [executor.submit(self._answer, record) for record in queries]
+            for future in as_completed(futures):
+                counts[future.result()] += 1
+        return counts
+
+    def _answer(self, record: Dict) -> str:
+        from src.contract_analysis.crew import (
+            AnalyzingContractClausesForConflictsAndSimilaritiesCrew,
+        )
+
+        inputs = {key: value for key, value in record.items() if key != "id"}
+        started = time.perf_counter()
+        crew_base = None
+        try:
+            crew_base = AnalyzingContractClausesForConflictsAndSimilaritiesCrew()
+            crew_base.index_on_kickoff = "off"
+            # Concurrent crews would all write the same report file; the report
+            # is stored in the output file instead
+            crew_base.report_file = ""
+            output = crew_base.crew().kickoff(inputs=inputs)
+            result = {"status": "ok", "report": getattr(output, "raw", str(output))}
+        except Exception as e:
+            logger.error(f"Query {record['id']} failed: {str(e)}")
+            # after_kickoff does not run for a failed crew, so close its kickoff scope
+            # here, but only if it was opened: other crews may still be using theirs
+            if crew_base is not None and crew_base.kickoff_open:
+                crew_base.kickoff_open = False
+                crew_base.vector_search_tool.end_kickoff()
+            result = {"status": "error", "error": str(e)}
+
+        result.update(
+            id=record["id"],
+            query=record["query"],
+            seconds=round(time.perf_counter() - started, 3),
+        )
+        self._write(result)
+        logger.info(f"Query {record['id']} finished with status {result['status']}")
+        return result["status"]
+
+    def _write(self, result: Dict) -> None:
+        with self._write_lock:
+            with open(self.output_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(result) + "\n")
+                file.flush()
+
+
+def run_batch(
+    input_path: str, output_path: str, concurrency: Optional[int] = None
+) -> Dict[str, int]:
+    concurrency = concurrency or int(os.getenv("BATCH_CONCURRENCY", "4"))
+    done = completed_ids(output_path)
+    records = list(read_queries(input_path))
+    queries = [record for record in records if str(record["id"]) not in done]
+    skipped = len(records) - len(queries)
+    if skipped:
+        logger.info(f"Skipping {skipped} queries already answered in {output_path}")
+    counts = BatchRunner(output_path, concurrency).run(queries)
+    counts["skipped"] = skipped
+    logger.info(
+        f"Batch complete: {counts['ok']} answered, {counts['error']} failed, "
+        f"{counts['skipped']} skipped"
+    )
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="JSONL file of queries")
+    parser.add_argument("output", help="JSONL file the reports are appended to")
+    parser.add_argument(
+        "--concurrency", type=int, default=None, help="Crews running at once"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    run_batch(args.input, args.output, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,166 @@
+"""
+Compare the vectorized SemanticChunker against the original per-sentence-dict
+implementation: identical chunks, peak traced memory and per-document latency.
+The streaming `iter_chunks` is measured too, with how many of its chunks match.
+
+    python -m src.contract_analysis.benchmarks.chunking [--synthetic N] [--block-sentences N] [paths...]
+"""
+
+import argparse
+import json
+import os
+import random
+import re
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from src.contract_analysis.benchmarks.fakes import FakeOpenAIClient
+from src.contract_analysis.chunking import SemanticChunker
+from src.contract_analysis.embeddings import EmbeddingBatcher
+
+DEFAULT_CONTRACTS_DIR = "knowledge/contracts"
+
+CLAUSES = [
+    "The Company shall indemnify the Distributor against all third party claims.",
+    "This Agreement shall be governed by the laws of the State of Delaware.",
+    "Either party may terminate this Agreement upon thirty days written notice.",
+    "The Licensee shall pay royalties within forty five days after each quarter.",
+    "All confidential information shall remain the property of the disclosing party.",
+    "The Supplier warrants that the products are free from defects in material.",
+    "Any dispute arising under this Agreement shall be settled by arbitration.",
+    "The Affiliate shall not use the trademarks without prior written approval.",
+]
+
+
+def legacy_semantic_chunker(text: str, client, model: str) -> List[str]:
+    """The chunker as it was before SemanticChunker, kept as a reference."""
+    from sklearn.metrics.pairwise import cosine_similarity
+
+    single_sentences_list = re.split(r"(?<=[.?!])\s+", text)
+    sentences = [{"sentence": x, "index": i} for i, x in enumerate(single_sentences_list)]
+
+    buffer_size = 3
+    for i in range(len(sentences)):
+        combined_sentence = ""
+        for j in range(i - buffer_size, i):
+            if j >= 0:
+                combined_sentence += sentences[j]["sentence"] + " "
+        combined_sentence += sentences[i]["sentence"]
+        for j in range(i + 1, i + 1 + buffer_size):
+            if j < len(sentences):
+                combined_sentence += " " + sentences[j]["sentence"]
+        sentences[i]["combined_sentence"] = combined_sentence.strip()
+
+    embeddings = client.embeddings.create(
+        model=model, input=[x["combined_sentence"] for x in sentences]
+    )
+    for i, sentence in enumerate(sentences):
+        sentence["combined_sentence_embedding"] = embeddings.data[i].embedding
+
+    distances = []
+    for i in range(len(sentences) - 1):
+        embedding_current = sentences[i]["combined_sentence_embedding"]
+        embedding_next = sentences[i + 1]["combined_sentence_embedding"]
+        similarity = cosine_similarity([embedding_current], [embedding_next])[0][0]
+        distance = 1 - similarity
+        distances.append(distance)
+        sentences[i]["distance_to_next"] = distance
+
+    breakpoint_threshold = np.percentile(distances, 95)
+    breakpoint_indices = [i for i, x in enumerate(distances) if x > breakpoint_threshold]
+
+    chunks = []
+    start_index = 0
+    for index in breakpoint_indices:
+        group = sentences[start_index : index + 1]
+        chunks.append(" ".join([d["sentence"] for d in group]))
+        start_index = index + 1
+    if start_index < len(sentences):
+        chunks.append(" ".join([d["sentence"] for d in sentences[start_index:]]))
+    return chunks
+
+
+def synthetic_contract(sentences: int, seed: int) -> str:
+    """A deterministic contract-like document made of shuffled clause runs."""
+    rng = random.Random(seed)
+    parts = []
+    while len(parts) < sentences:
+        clause = rng.choice(CLAUSES)
+        parts.extend([clause] * rng.randint(1, 6))
+    return " ".join(parts[:sentences])
+
+
+def load_documents(paths: List[str], synthetic: int) -> Dict[str, str]:
+    documents = {}
+    if paths:
+        from markitdown import MarkItDown
+
+        converter = MarkItDown(enable_builtins=True)
+        for path in paths:
+            documents[os.path.basename(path)] = converter.convert(path).markdown
+    for i in range(synthetic):
+        documents[f"synthetic-{i}"] = synthetic_contract(200 * (i + 1), seed=i)
+    return documents
+
+
+def measure(fn: Callable[[], List[str]]) -> Dict:
+    tracemalloc.start()
+    start = time.perf_counter()
+    chunks = fn()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return {"chunks": chunks, "seconds": elapsed, "peak_bytes": peak}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("paths", nargs="*", help="Contract files to convert and chunk")
+    parser.add_argument("--synthetic", type=int, default=3, help="Synthetic documents")
+    parser.add_argument("--model", default="text-embedding-3-small")
+    parser.add_argument(
+        "--block-sentences", type=int, default=512, help="Streaming block size"
+    )
+    args = parser.parse_args()
+
+    paths = args.paths
+    if not paths and os.path.isdir(DEFAULT_CONTRACTS_DIR):
+        paths = [
+            os.path.join(DEFAULT_CONTRACTS_DIR, name)
+            for name in sorted(os.listdir(DEFAULT_CONTRACTS_DIR))
+        ]
+
+    for name, text in load_documents(paths, args.synthetic).items():
+        client = FakeOpenAIClient()
+        legacy = measure(lambda: legacy_semantic_chunker(text, client, args.model))
+        chunker = SemanticChunker(
+            EmbeddingBatcher(client, args.model), block_sentences=args.block_sentences
+        )
+        current = measure(lambda: chunker.chunk(text))
+        streaming = measure(lambda: list(chunker.iter_chunks(text)))
+        shared = set(current["chunks"]) & set(streaming["chunks"])
+        print(
+            json.dumps(
+                {
+                    "document": name,
+                    "characters": len(text),
+                    "chunks": len(current["chunks"]),
+                    "identical": legacy["chunks"] == current["chunks"],
+                    "legacy_seconds": round(legacy["seconds"], 4),
+                    "seconds": round(current["seconds"], 4),
+                    "legacy_peak_bytes": legacy["peak_bytes"],
+                    "peak_bytes": current["peak_bytes"],
+                    "streaming_chunks": len(streaming["chunks"]),
+                    "streaming_shared_chunks": len(shared),
+                    "streaming_seconds": round(streaming["seconds"], 4),
+                    "streaming_peak_bytes": streaming["peak_bytes"],
+                }
+            )
+        )
+
+
+if __name__ == "__main__":
+    main()
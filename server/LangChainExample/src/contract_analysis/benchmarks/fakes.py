@@ -0,0 +1,78 @@
+import hashlib
+import json
+import re
+import time
+from types import SimpleNamespace
+from typing import List, Optional
+
+import numpy as np
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+def fake_embedding(text: str, dimensions: int = 1536) -> List[float]:
+    """
+    Deterministic bag-of-words embedding: every word is hashed to a signed slot.
+    Texts sharing words get similar vectors, which keeps semantic chunking realistic.
+    """
+    vector = np.zeros(dimensions, dtype=np.float32)
+    for word in WORD_PATTERN.findall(text.lower()):
+        digest = hashlib.blake2b(word.encode("utf-8"), digest_size=8).digest()
+        value = int.from_bytes(digest, "little")
+        vector[value % dimensions] += 1.0 if value & (1 << 63) else -1.0
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector /= norm
+    return vector.tolist()
+
+
+class FakeEmbeddings:
+    """Stands in for `openai.Client().embeddings` without any network access."""
+
+    def __init__(self, dimensions: int = 1536):
+        self.dimensions = dimensions
+        self.requests = 0
+        self.inputs = 0
+
+    def create(self, model: str, input, dimensions: Optional[int] = None, **kwargs):
+        texts = [input] if isinstance(input, str) else list(input)
+        self.requests += 1
+        self.inputs += len(texts)
+        size = dimensions or self.dimensions
+        return SimpleNamespace(
+            data=[
+                SimpleNamespace(index=i, embedding=fake_embedding(text, size))
+                for i, text in enumerate(texts)
+            ]
+        )
+
+
+class FakeOpenAIClient:
+    """Minimal offline replacement for `openai.Client` exposing `embeddings`."""
+
+    def __init__(self, dimensions: int = 1536):
+        self.embeddings = FakeEmbeddings(dimensions)
+
+
+class FakeClassifierLLM:
+    """
+    Offline stand-in for the classification LLM. Picks the category whose name
+    occurs most often in the contract, so results are deterministic.
+    """
+
+    def __init__(self, categories: List[str], latency: float = 0.0):
+        self.categories = categories
+        self.latency = latency
+        self.calls = 0
+
+    def call(self, prompt: str) -> str:
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        document = prompt.rsplit("This is the contract's content:", 1)[-1].lower()
+        category = max(
+            self.categories, key=lambda name: document.count(name.split()[0].lower())
+        )
+        return json.dumps(
+            {"category": category, "reasoning": f"The contract mentions {category} most."}
+        )
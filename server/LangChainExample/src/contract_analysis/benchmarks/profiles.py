@@ -0,0 +1,180 @@
+"""
+Compare collection profiles on recall@k against exact search, query latency and
+estimated RAM, using the vectors of an existing collection (or synthetic ones).
+
+    python -m src.contract_analysis.benchmarks.profiles [--synthetic N] [--profiles default scalar]
+
+Reduced-dimension profiles reuse the stored vectors truncated and renormalized,
+which is what the embeddings API returns for text-embedding-3 models.
+"""
+
+import argparse
+import json
+import os
+import time
+from typing import List
+
+import numpy as np
+from qdrant_client import QdrantClient
+from qdrant_client.models import PointStruct
+
+from src.contract_analysis.profiles import PROFILES, CollectionProfile
+
+
+def load_vectors(client: QdrantClient, collection_name: str) -> np.ndarray:
+    """Every vector stored in a collection, as a float32 matrix."""
+    vectors = []
+    offset = None
+    while True:
+        points, offset = client.scroll(
+            collection_name=collection_name,
+            limit=1024,
+            offset=offset,
+            with_payload=False,
+            with_vectors=True,
+        )
+        vectors.extend(point.vector for point in points)
+        if offset is None:
+            break
+    return np.asarray(vectors, dtype=np.float32)
+
+
+def synthetic_vectors(count: int, dimensions: int, seed: int = 0) -> np.ndarray:
+    """Clustered unit vectors, so that nearest neighbours are not arbitrary."""
+    rng = np.random.default_rng(seed)
+    centers = rng.standard_normal((max(count // 50, 1), dimensions), dtype=np.float32)
+    vectors = centers[rng.integers(len(centers), size=count)]
+    vectors += 0.5 * rng.standard_normal((count, dimensions), dtype=np.float32)
+    return normalize(vectors)
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def exact_top_k(vectors: np.ndarray, queries: np.ndarray, k: int) -> List[set]:
+    scores = queries @ vectors.T
+    top = np.argsort(-scores, axis=1)[:, :k]
+    return [set(row.tolist()) for row in top]
+
+
+def benchmark_profile(
+    client: QdrantClient,
+    collection_name: str,
+    profile: CollectionProfile,
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    truth: List[set],
+    k: int,
+    keep: bool,
+) -> dict:
+    size = profile.vector_size(vectors.shape[1])
+    stored = normalize(vectors[:, :size])
+    searched = normalize(queries[:, :size])
+
+    name = f"{collection_name}__profile_{profile.name}"
+    if client.collection_exists(name):
+        client.delete_collection(name)
+    client.create_collection(
+        collection_name=name,
+        vectors_config=profile.vectors_config(size),
+        quantization_config=profile.quantization_config(),
+        hnsw_config=profile.hnsw_config(),
+    )
+    try:
+        start = time.perf_counter()
+        for offset in range(0, len(stored), 256):
+            client.upsert(
+                collection_name=name,
+                points=[
+                    PointStruct(id=offset + i, vector=vector.tolist())
+                    for i, vector in enumerate(stored[offset : offset + 256])
+                ],
+                wait=True,
+            )
+        load_seconds = time.perf_counter() - start
+
+        latencies = []
+        hits = 0
+        for query, expected in zip(searched, truth):
+            start = time.perf_counter()
+            result = client.query_points(
+                collection_name=name,
+                query=query.tolist(),
+                limit=k,
+                search_params=profile.search_params(),
+            )
+            latencies.append(time.perf_counter() - start)
+            hits += len(expected & {point.id for point in result.points})
+    finally:
+        if not keep:
+            client.delete_collection(name)
+
+    return {
+        "profile": profile.name,
+        "dimensions": size,
+        "quantization": profile.quantization,
+        "on_disk": profile.on_disk,
+        f"recall@{k}": round(hits / (len(truth) * k), 4),
+        "p50_ms": round(float(np.percentile(latencies, 50)) * 1000, 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)) * 1000, 3),
+        "load_seconds": round(load_seconds, 3),
+        "estimated_ram_bytes": profile.estimated_memory_bytes(len(stored), size),
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--collection", default=os.getenv("QDRANT_COLLECTION_NAME", "contracts")
+    )
+    parser.add_argument(
+        "--synthetic",
+        type=int,
+        default=0,
+        help="Benchmark N synthetic vectors in an in-memory Qdrant instead",
+    )
+    parser.add_argument("--dimensions", type=int, default=1536)
+    parser.add_argument("--profiles", nargs="*", default=list(PROFILES))
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--keep", action="store_true", help="Keep profile collections")
+    args = parser.parse_args()
+
+    if args.synthetic:
+        client = QdrantClient(location=":memory:")
+        vectors = synthetic_vectors(args.synthetic, args.dimensions)
+    else:
+        client = QdrantClient(
+            url=os.getenv("QDRANT_URL"), api_key=os.getenv("QDRANT_API_KEY")
+        )
+        vectors = load_vectors(client, args.collection)
+    if len(vectors) == 0:
+        raise SystemExit(f"No vectors found in {args.collection}")
+
+    # Queries are stored vectors with some noise, so each has a known neighbourhood
+    rng = np.random.default_rng(1)
+    sample = vectors[rng.integers(len(vectors), size=args.queries)]
+    queries = normalize(
+        sample + 0.1 * rng.standard_normal(sample.shape, dtype=np.float32)
+    )
+    k = min(args.k, len(vectors))
+    truth = exact_top_k(vectors, queries, k)
+
+    for name in args.profiles:
+        result = benchmark_profile(
+            client,
+            args.collection,
+            PROFILES[name],
+            vectors,
+            queries,
+            truth,
+            k,
+            args.keep,
+        )
+        print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,252 @@
+"""
+Throughput of the request scheduler against a local fake embeddings server that
+enforces requests- and tokens-per-minute quotas and answers 429 when they run out.
+
+    python -m src.contract_analysis.benchmarks.ratelimit [--server-rpm N] [--server-tpm N] [--server-window S] [--no-scheduler]
+
+Bulk ingestion threads embed synthetic contracts while search queries run at
+interactive priority. Reports texts/sec, 429s served, failed texts and search
+latency, with and without the scheduler.
+
+The server holds only `--server-window` seconds of its quotas, the way providers
+enforce per-minute limits over shorter periods, while the scheduler budgets a
+full minute. Its opening burst therefore draws 429s, so the default run also
+exercises the scheduler's backoff and concurrency reduction.
+"""
+
+import argparse
+import base64
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import List
+
+import numpy as np
+
+from src.contract_analysis.benchmarks.chunking import CLAUSES, synthetic_contract
+from src.contract_analysis.benchmarks.fakes import fake_embedding
+from src.contract_analysis.benchmarks.suite import latency_summary
+from src.contract_analysis.embeddings import EmbeddingBatcher
+from src.contract_analysis.scheduler import (
+    INTERACTIVE,
+    RequestScheduler,
+    TokenBucket,
+    estimate_tokens,
+)
+
+
+class ServerQuota:
+    """
+    Requests- and tokens-per-minute quotas that replenish continuously, the way
+    the provider enforces them, holding at most `window` seconds' worth.
+    """
+
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int, window: float = 60.0):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        for bucket in (self.requests, self.tokens):
+            # Same refill rate, smaller burst
+            bucket.capacity = bucket.level = bucket.rate * min(window, 60.0)
+        self.rejected = 0
+        self.served = 0
+        self._lock = threading.Lock()
+
+    def admit(self, tokens: int) -> float:
+        """0 when the request fits, otherwise the seconds until it would."""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(self.requests.delay(1, now), self.tokens.delay(tokens, now))
+            if wait > 0:
+                self.rejected += 1
+                return wait
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            self.served += 1
+            return 0.0
+
+
+class FakeEmbeddingsHandler(BaseHTTPRequestHandler):
+    """Answers POST .../embeddings in the OpenAI response format."""
+
+    quota: ServerQuota
+    dimensions: int
+    latency: float
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        texts = body["input"] if isinstance(body["input"], list) else [body["input"]]
+        tokens = sum(estimate_tokens(text) for text in texts)
+        wait = self.quota.admit(tokens)
+        if wait:
+            self._reply(
+                429,
+                {"error": {"message": "Rate limit reached", "type": "requests"}},
+                {"retry-after-ms": str(int(wait * 1000))},
+            )
+            return
+        if self.latency:
+            time.sleep(self.latency)
+        size = body.get("dimensions") or self.dimensions
+        data = []
+        for i, text in enumerate(texts):
+            vector = fake_embedding(text, size)
+            if body.get("encoding_format") == "base64":
+                vector = base64.b64encode(np.asarray(vector, dtype=np.float32).tobytes()).decode()
+            data.append({"object": "embedding", "index": i, "embedding": vector})
+        self._reply(
+            200,
+            {
+                "object": "list",
+                "data": data,
+                "model": body.get("model"),
+                "usage": {"prompt_tokens": tokens, "total_tokens": tokens},
+            },
+        )
+
+    def _reply(self, status: int, payload: dict, headers: dict = None) -> None:
+        content = json.dumps(payload).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_server(quota: ServerQuota, dimensions: int, latency: float) -> ThreadingHTTPServer:
+    handler = type(
+        "Handler",
+        (FakeEmbeddingsHandler,),
+        {"quota": quota, "dimensions": dimensions, "latency": latency},
+    )
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def main() -> None:
+    import openai
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--server-rpm", type=int, default=600)
+    parser.add_argument("--server-tpm", type=int, default=200_000)
+    parser.add_argument(
+        "--server-window", type=float, default=5.0, help="Seconds of quota the server holds"
+    )
+    parser.add_argument("--server-latency", type=float, default=0.02)
+    parser.add_argument("--ingest-threads", type=int, default=8)
+    parser.add_argument("--documents", type=int, default=16, help="Contracts per thread")
+    parser.add_argument("--sentences", type=int, default=40, help="Sentences per contract")
+    parser.add_argument("--batch-inputs", type=int, default=16, help="Inputs per request")
+    parser.add_argument("--searches", type=int, default=30)
+    parser.add_argument(
+        "--no-scheduler", action="store_true", help="Only the batcher's own retries"
+    )
+    parser.add_argument("--model", default="text-embedding-3-small")
+    args = parser.parse_args()
+
+    quota = ServerQuota(args.server_rpm, args.server_tpm, args.server_window)
+    server = start_server(quota, 256, args.server_latency)
+    client = openai.Client(
+        api_key="benchmark",
+        base_url=f"http://127.0.0.1:{server.server_address[1]}/v1",
+        max_retries=0,
+    )
+    # Run slightly under the server's quota, as a configured deployment would
+    scheduler = None
+    if not args.no_scheduler:
+        scheduler = RequestScheduler(
+            name=args.model,
+            requests_per_minute=args.server_rpm * 0.95,
+            tokens_per_minute=args.server_tpm * 0.95,
+            max_concurrency=args.ingest_threads,
+        )
+    embedder = EmbeddingBatcher(
+        client,
+        args.model,
+        dimensions=256,
+        max_inputs=args.batch_inputs,
+        retry_delay=0.2,
+        scheduler=scheduler,
+    )
+
+    failed = [0]
+    texts = [0]
+    lock = threading.Lock()
+
+    def ingest(worker: int) -> None:
+        for document in range(args.documents):
+            seed = worker * args.documents + document
+            sentences = synthetic_contract(args.sentences, seed).split(". ")
+            # Unique texts so nothing is deduplicated away
+            inputs = [f"{seed}-{i} {text}" for i, text in enumerate(sentences)]
+            try:
+                vectors = embedder.embed(inputs, group=f"{worker}-{document}")
+                missing = sum(vector is None for vector in vectors)
+            except Exception:
+                # Requests that still fail after the retries fail the whole document
+                missing = len(inputs)
+            with lock:
+                texts[0] += len(inputs)
+                failed[0] += missing
+
+    search_latencies: List[float] = []
+    search_failures = [0]
+
+    def search() -> None:
+        for i in range(args.searches):
+            query = [f"search {i} {CLAUSES[i % len(CLAUSES)]}"]
+            start = time.perf_counter()
+            try:
+                if scheduler is not None:
+                    scheduler.call(
+                        lambda: client.embeddings.create(input=query, model=args.model),
+                        tokens=estimate_tokens(query[0]),
+                        priority=INTERACTIVE,
+                    )
+                else:
+                    client.embeddings.create(input=query, model=args.model)
+                search_latencies.append(time.perf_counter() - start)
+            except Exception:
+                search_failures[0] += 1
+            time.sleep(0.05)
+
+    start = time.perf_counter()
+    threads = [
+        threading.Thread(target=ingest, args=(worker,))
+        for worker in range(args.ingest_threads)
+    ] + [threading.Thread(target=search)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    seconds = time.perf_counter() - start
+    server.shutdown()
+
+    print(
+        json.dumps(
+            {
+                "scheduler": scheduler is not None,
+                "seconds": round(seconds, 3),
+                "texts": texts[0],
+                "texts_per_second": round(texts[0] / seconds, 3),
+                "failed_texts": failed[0],
+                "requests_served": quota.served,
+                "rate_limited_responses": quota.rejected,
+                "scheduler_stats": scheduler.stats if scheduler is not None else None,
+                "final_concurrency": scheduler.limit if scheduler is not None else None,
+                "search": latency_summary(search_latencies),
+                "search_failures": search_failures[0],
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Cost of standing up an environment from a snapshot instead of re-ingesting.
+
+    python -m src.contract_analysis.benchmarks.snapshot [--synthetic N] [--dtype float16] [--sharding collection]
+
+Ingests a corpus (fake embeddings and classifier, in-memory Qdrant), exports it,
+imports the snapshot into a fresh in-memory Qdrant and reports ingestion versus
+export and import time, snapshot size, and the largest difference between the
+top-k search scores of the two collections. Synthetic contracts repeat clauses,
+so tied hits make point IDs an unreliable comparison.
+"""
+
+import argparse
+import json
+import os
+import tempfile
+import time
+
+from src.contract_analysis.benchmarks.chunking import CLAUSES
+from src.contract_analysis.benchmarks.fakes import fake_embedding
+from src.contract_analysis.benchmarks.suite import StageTimer, build_corpus, build_service
+
+
+def search_scores(service, queries, k: int):
+    """Top-k scores of every query across the collections the router knows."""
+    hits = []
+    for query in queries:
+        vector = fake_embedding(query, service.vector_size)
+        found = []
+        for collection_name in service.router.collections():
+            found.extend(
+                service.vector_client.query_points(
+                    collection_name=collection_name, query=vector, limit=k
+                ).points
+            )
+        found.sort(key=lambda point: point.score, reverse=True)
+        hits.append([point.score for point in found[:k]])
+    return hits
+
+
+def main() -> None:
+    from src.contract_analysis.snapshot import export_snapshot, import_snapshot
+
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--synthetic", type=int, default=40, help="Synthetic contracts")
+    parser.add_argument("--sentences", type=int, default=120, help="Sentences per contract")
+    parser.add_argument("--dtype", choices=("float32", "float16"), default="float32")
+    parser.add_argument("--sharding", choices=("none", "collection"), default="none")
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("--k", type=int, default=5)
+    parser.add_argument("--llm-latency", type=float, default=0.0)
+    args = parser.parse_args()
+    # Options build_service expects from the suite
+    args.convert_workers = 0
+    args.classify_concurrency = 4
+    args.local_disk = False
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        contracts_dir = os.path.join(work_dir, "contracts")
+        os.makedirs(contracts_dir)
+        build_corpus(contracts_dir, False, args.synthetic, args.sentences)
+
+        source = build_service(contracts_dir, work_dir, args, StageTimer())
+        start = time.perf_counter()
+        source.load_and_classify_contracts()
+        ingest_seconds = time.perf_counter() - start
+
+        path = os.path.join(work_dir, "snapshot")
+        start = time.perf_counter()
+        manifest = export_snapshot(source, path, dtype=args.dtype)
+        export_seconds = time.perf_counter() - start
+        size = sum(entry.stat().st_size for entry in os.scandir(path))
+
+        # A second service gets its own empty in-memory Qdrant
+        target = build_service(contracts_dir, work_dir, args, StageTimer())
+        start = time.perf_counter()
+        imported = import_snapshot(target, path)
+        import_seconds = time.perf_counter() - start
+
+        queries = [CLAUSES[i % len(CLAUSES)] for i in range(args.queries)]
+        expected = search_scores(source, queries, args.k)
+        actual = search_scores(target, queries, args.k)
+        score_difference = max(
+            (abs(a - b) for before, after in zip(expected, actual) for a, b in zip(before, after)),
+            default=0.0,
+        )
+
+    print(
+        json.dumps(
+            {
+                "contracts": len(manifest["contracts"]),
+                "points": manifest["points"],
+                "points_imported": imported,
+                "dtype": args.dtype,
+                "sharding": args.sharding,
+                "ingest_seconds": round(ingest_seconds, 3),
+                "export_seconds": round(export_seconds, 3),
+                "import_seconds": round(import_seconds, 3),
+                "import_points_per_second": round(imported / import_seconds, 1),
+                "snapshot_bytes": size,
+                "snapshot_bytes_per_point": round(size / max(manifest["points"], 1), 1),
+                "max_score_difference": float(score_difference),
+            },
+            indent=2,
+        )
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""
+Guard crew cold-start latency: import a module in fresh interpreters, report the
+import time and the slowest modules, and fail when it is over budget or pulls in
+dependencies that should only load on first use.
+
+    python -m src.contract_analysis.benchmarks.startup [--max-seconds 4] [--runs 3]
+"""
+
+import argparse
+import json
+import re
+import subprocess
+import sys
+from typing import Dict, List, Tuple
+
+DEFAULT_MODULE = "src.contract_analysis.crew"
+
+# Only needed once a search or ingestion actually runs
+LAZY_MODULES = ["qdrant_client", "markitdown", "sklearn", "watchdog"]
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def cold_import(module: str) -> Tuple[float, List[str], Dict[str, int]]:
+    """
+    Import a module in a new interpreter. Returns the wall time in seconds, the
+    lazy modules it loaded and the cumulative import time of each module in µs.
+    """
+    script = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"import {module}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"loaded = [m for m in {LAZY_MODULES!r} if m in sys.modules]\n"
+        "print(json.dumps({'seconds': elapsed, 'loaded': loaded}))\n"
+    )
+    completed = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    result = json.loads(completed.stdout.strip().splitlines()[-1])
+
+    cumulative: Dict[str, int] = {}
+    for line in completed.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if match:
+            cumulative[match.group(4)] = int(match.group(2))
+    return result["seconds"], result["loaded"], cumulative
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument(
+        "--max-seconds",
+        type=float,
+        default=None,
+        help="Exit with an error when the best run is slower than this",
+    )
+    args = parser.parse_args()
+
+    runs = [cold_import(args.module) for _ in range(args.runs)]
+    best_seconds, loaded, cumulative = min(runs, key=lambda run: run[0])
+    slowest = sorted(cumulative.items(), key=lambda item: item[1], reverse=True)
+
+    print(
+        json.dumps(
+            {
+                "module": args.module,
+                "best_seconds": round(best_seconds, 3),
+                "runs_seconds": [round(run[0], 3) for run in runs],
+                "eager_lazy_modules": loaded,
+                "slowest_imports_ms": {
+                    name: round(micros / 1000, 1) for name, micros in slowest[: args.top]
+                },
+            },
+            indent=2,
+        )
+    )
+
+    failures = []
+    if loaded:
+        failures.append(f"{args.module} imports {', '.join(loaded)} at import time")
+    if args.max_seconds is not None and best_seconds > args.max_seconds:
+        failures.append(
+            f"{args.module} took {best_seconds:.3f}s to import, budget is {args.max_seconds}s"
+        )
+    if failures:
+        raise SystemExit("\n".join(failures))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,347 @@
+"""
+Offline end-to-end benchmark of contract ingestion and retrieval: fake embeddings
+and classifier, Qdrant in memory (or local on-disk mode), the contracts in
+knowledge/contracts plus synthetic scaled-up contracts.
+
+    python -m src.contract_analysis.benchmarks.suite [--synthetic N] [--sharding collection] [--scoped] [--output run.json] [--compare base.json]
+
+Reports files/sec, chunks/sec, peak RSS, per-stage latency and search p50/p99 as
+JSON, so runs can be saved and compared.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import random
+import resource
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
+
+import numpy as np
+
+from src.contract_analysis.benchmarks.chunking import CLAUSES, synthetic_contract
+from src.contract_analysis.benchmarks.fakes import FakeClassifierLLM, FakeOpenAIClient
+from src.contract_analysis.classification import CATEGORIES, ContractClassifier
+from src.contract_analysis.sharding import CATEGORY_FIELD
+
+DEFAULT_CONTRACTS_DIR = "knowledge/contracts"
+
+# Metrics compared by --compare, and whether higher is better
+COMPARED_METRICS = {
+    "ingestion.files_per_second": True,
+    "ingestion.chunks_per_second": True,
+    "ingestion.seconds": False,
+    "peak_rss_bytes": False,
+    "search.cold.p50_ms": False,
+    "search.cold.p99_ms": False,
+    "search.warm.p50_ms": False,
+    "search.warm.p99_ms": False,
+}
+
+
+class StageTimer:
+    """Collects per-call latencies of the service methods that make up each stage."""
+
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = defaultdict(list)
+        self._lock = threading.Lock()
+
+    def wrap(self, stage: str, fn: Callable) -> Callable:
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - start
+                with self._lock:
+                    self.samples[stage].append(elapsed)
+
+        return timed
+
+    def report(self) -> Dict[str, dict]:
+        return {stage: latency_summary(values) for stage, values in self.samples.items()}
+
+
+class TimedConverter:
+    """Wraps a document converter so in-thread conversion shows up as a stage."""
+
+    def __init__(self, converter, timer: StageTimer):
+        self.convert = timer.wrap("convert", converter.convert)
+
+
+def latency_summary(seconds: List[float]) -> dict:
+    if not seconds:
+        return {"count": 0}
+    values = np.asarray(seconds) * 1000
+    return {
+        "count": len(values),
+        "mean_ms": round(float(values.mean()), 3),
+        "p50_ms": round(float(np.percentile(values, 50)), 3),
+        "p99_ms": round(float(np.percentile(values, 99)), 3),
+        "total_ms": round(float(values.sum()), 3),
+    }
+
+
+def peak_rss_bytes() -> Dict[str, int]:
+    """Peak resident set size of this process and of its finished children."""
+    # ru_maxrss is in kilobytes on Linux and in bytes on macOS
+    scale = 1 if sys.platform == "darwin" else 1024
+    return {
+        "self": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale,
+        "children": resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * scale,
+    }
+
+
+def build_corpus(
+    directory: str, include_contracts: bool, synthetic: int, sentences: int
+) -> Dict[str, int]:
+    """Fill a directory with the real contracts and synthetic markdown contracts."""
+    counts = {"contracts": 0, "synthetic": 0}
+    if include_contracts and os.path.isdir(DEFAULT_CONTRACTS_DIR):
+        for name in sorted(os.listdir(DEFAULT_CONTRACTS_DIR)):
+            source = os.path.join(DEFAULT_CONTRACTS_DIR, name)
+            if os.path.isfile(source):
+                shutil.copy(source, os.path.join(directory, name))
+                counts["contracts"] += 1
+    for i in range(synthetic):
+        path = os.path.join(directory, f"synthetic-{i:04d}.md")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(synthetic_contract(sentences, seed=i))
+        counts["synthetic"] += 1
+    return counts
+
+
+def build_service(contracts_dir: str, work_dir: str, args, timer: StageTimer):
+    """A ContractsService wired to in-memory or local Qdrant and fake OpenAI clients."""
+    from qdrant_client import QdrantClient
+
+    from src.contract_analysis.services import ContractsService
+
+    os.environ.update(
+        {
+            "CONTRACTS_DIR": contracts_dir,
+            "QDRANT_COLLECTION_NAME": "benchmark_contracts",
+            "FILE_STATE_INDEX_PATH": os.path.join(work_dir, "file_state.json"),
+            "INGEST_CONVERT_WORKERS": str(args.convert_workers),
+            "QDRANT_SHARDING": args.sharding,
+            # Every run starts cold so results are comparable
+            "EMBEDDING_CACHE_PATH": "",
+            "CLASSIFICATION_CACHE_PATH": "",
+            "CONVERSION_CACHE_PATH": "",
+        }
+    )
+    if args.local_disk:
+        vector_client = QdrantClient(path=os.path.join(work_dir, "qdrant"))
+    else:
+        vector_client = QdrantClient(location=":memory:")
+
+    openai_client = FakeOpenAIClient()
+    classifier = ContractClassifier(
+        "",
+        llm=FakeClassifierLLM(CATEGORIES, latency=args.llm_latency),
+        max_concurrency=args.classify_concurrency,
+    )
+    service = ContractsService(
+        vector_client=vector_client, openai_client=openai_client, classifier=classifier
+    )
+
+    # Time the stages by wrapping the methods the pipeline calls
+    service._classify_contract = timer.wrap("classify", service._classify_contract)
+    service._build_points = timer.wrap("chunk_embed", service._build_points)
+    service._commit_contract = timer.wrap("upload", service._commit_contract)
+    service._doc_converter = TimedConverter(service.doc_converter, timer)
+    return service
+
+
+def benchmark_search(service, queries: List[Tuple[str, str]], args) -> dict:
+    """
+    Cold searches (caches cleared) and warm repeats through QdrantVectorSearchTool.
+    Queries are embedded by the service's fake OpenAI client, so the timings
+    include the tool's vectorization path: scheduler and vector cache. With
+    --scoped every query is filtered to its category.
+    """
+    from src.contract_analysis.tools.qdrant_vector_search_tool import (
+        QdrantVectorSearchTool,
+    )
+
+    tool = QdrantVectorSearchTool(
+        client=service.vector_client,
+        collection_name=service.qdrant_collection_name,
+        qdrant_url="local",
+        qdrant_api_key="",
+        limit=args.k,
+        sharding=args.sharding,
+    )
+    tool._openai_client = service.openai_client
+
+    def run(clear: bool) -> List[float]:
+        latencies = []
+        for query, category in queries:
+            if clear:
+                tool.clear_cache()
+                tool._vector_cache.clear()
+            conditions = None
+            if args.scoped:
+                conditions = [{"key": CATEGORY_FIELD, "value": category}]
+            start = time.perf_counter()
+            tool._run(query=query, conditions=conditions)
+            latencies.append(time.perf_counter() - start)
+        return latencies
+
+    cold = run(clear=True)
+    # The cold pass leaves only its last query cached, so fill the caches first
+    run(clear=False)
+    warm = run(clear=False)
+    return {"cold": latency_summary(cold), "warm": latency_summary(warm)}
+
+
+def git_commit() -> str:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except Exception:
+        return ""
+
+
+def flatten(results: dict, prefix: str = "") -> Dict[str, float]:
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{name}."))
+        elif isinstance(value, (int, float)):
+            flat[name] = value
+    return flat
+
+
+def compare(current: dict, baseline: dict) -> Dict[str, dict]:
+    """Relative change of the headline metrics against a saved run."""
+    now, before = flatten(current), flatten(baseline)
+    changes = {}
+    for metric, higher_is_better in COMPARED_METRICS.items():
+        if metric not in now or not before.get(metric):
+            continue
+        ratio = now[metric] / before[metric]
+        changes[metric] = {
+            "baseline": before[metric],
+            "current": now[metric],
+            "change": f"{ratio - 1:+.1%}",
+            "better": ratio > 1 if higher_is_better else ratio < 1,
+        }
+    return changes
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--synthetic", type=int, default=20, help="Synthetic contracts")
+    parser.add_argument(
+        "--sentences", type=int, default=400, help="Sentences per synthetic contract"
+    )
+    parser.add_argument(
+        "--no-contracts", action="store_true", help="Skip knowledge/contracts"
+    )
+    parser.add_argument("--queries", type=int, default=50)
+    parser.add_argument("--k", type=int, default=3)
+    parser.add_argument(
+        "--convert-workers",
+        type=int,
+        default=0,
+        help="Conversion processes; 0 converts in-thread so conversion is timed",
+    )
+    parser.add_argument("--classify-concurrency", type=int, default=4)
+    parser.add_argument(
+        "--llm-latency", type=float, default=0.0, help="Simulated classifier seconds"
+    )
+    parser.add_argument(
+        "--local-disk", action="store_true", help="Use local on-disk Qdrant mode"
+    )
+    parser.add_argument(
+        "--sharding",
+        choices=["none", "collection"],
+        default="none",
+        help="Shard by category; local Qdrant has no shard keys",
+    )
+    parser.add_argument(
+        "--scoped", action="store_true", help="Filter every search to a category"
+    )
+    parser.add_argument("--output", help="Write the results JSON to this file")
+    parser.add_argument("--compare", help="Results JSON of an earlier run")
+    args = parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="contracts-benchmark-")
+    try:
+        contracts_dir = os.path.join(work_dir, "contracts")
+        os.makedirs(contracts_dir)
+        corpus = build_corpus(
+            contracts_dir, not args.no_contracts, args.synthetic, args.sentences
+        )
+
+        timer = StageTimer()
+        service = build_service(contracts_dir, work_dir, args, timer)
+
+        start = time.perf_counter()
+        service.load_and_classify_contracts()
+        ingest_seconds = time.perf_counter() - start
+
+        files = corpus["contracts"] + corpus["synthetic"]
+        chunks = sum(
+            service.vector_client.get_collection(name).points_count or 0
+            for name in service.router.collections()
+        )
+
+        rng = random.Random(0)
+        queries = []
+        for _ in range(args.queries):
+            category = rng.choice(CATEGORIES)
+            queries.append((f"{rng.choice(CLAUSES)} {category}", category))
+        search = benchmark_search(service, queries, args)
+    finally:
+        shutil.rmtree(work_dir, ignore_errors=True)
+
+    rss = peak_rss_bytes()
+    results = {
+        "timestamp": datetime.datetime.now().isoformat(),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "config": {
+            key: value for key, value in vars(args).items() if key not in ("output", "compare")
+        },
+        "corpus": corpus,
+        "ingestion": {
+            "files": files,
+            "chunks": chunks,
+            "seconds": round(ingest_seconds, 3),
+            "files_per_second": round(files / ingest_seconds, 3) if ingest_seconds else 0,
+            "chunks_per_second": round(chunks / ingest_seconds, 3) if ingest_seconds else 0,
+            "embedding_requests": service.openai_client.embeddings.requests,
+        },
+        "stages": timer.report(),
+        "search": search,
+        "peak_rss_bytes": rss["self"],
+        "peak_rss_children_bytes": rss["children"],
+    }
+    if args.compare:
+        with open(args.compare, "r", encoding="utf-8") as file:
+            results["comparison"] = compare(results, json.load(file))
+
+    output = json.dumps(results, indent=2)
+    print(output)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            file.write(output)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,396 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def text_hash(text: str) -> str:
+    """Content hash used to address a text in the caches."""
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    Persistent, content-addressed embedding cache backed by SQLite.
+
+    Vectors are keyed by (model, dimensions, text hash) and stored as float32 blobs.
+    The cache is bounded to `max_entries` rows and evicts the least recently used
+    entries first. Hit and miss counters are kept for the lifetime of the instance.
+    """
+
+    def __init__(self, path: str, max_entries: int = 200_000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS embeddings (
+                model TEXT NOT NULL,
+                dimensions INTEGER NOT NULL,
+                text_hash TEXT NOT NULL,
+                vector BLOB NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (model, dimensions, text_hash)
+            )
+            """
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)"
+        )
+        self._conn.commit()
+
+    @property
+    def hit_rate(self) -> float:
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        """Counters for logging and reporting."""
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate}
+
+    def get_many(
+        self, model: str, dimensions: int, hashes: Iterable[str]
+    ) -> Dict[str, List[float]]:
+        """Look up vectors by text hash. Missing hashes are absent from the result."""
+        hashes = list(dict.fromkeys(hashes))
+        found: Dict[str, List[float]] = {}
+        with self._lock:
+            # Stay below SQLite's bound-parameter limit
+            for start in range(0, len(hashes), 500):
+                batch = hashes[start : start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND dimensions = ? AND text_hash IN ({placeholders})",
+                    (model, dimensions, *batch),
+                ).fetchall()
+                for key, blob in rows:
+                    found[key] = array("f", blob).tolist()
+
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_used = ? WHERE model = ? "
+                    "AND dimensions = ? AND text_hash = ?",
+                    [(now, model, dimensions, key) for key in found],
+                )
+                self._conn.commit()
+
+            self.hits += len(found)
+            self.misses += len(hashes) - len(found)
+        return found
+
+    def put_many(
+        self, model: str, dimensions: int, items: Iterable[Tuple[str, List[float]]]
+    ) -> None:
+        """Store vectors by text hash and evict the least recently used overflow."""
+        now = time.time()
+        rows = [
+            (model, dimensions, key, array("f", vector).tobytes(), now)
+            for key, vector in items
+        ]
+        if not rows:
+            return
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings "
+                "(model, dimensions, text_hash, vector, last_used) VALUES (?, ?, ?, ?, ?)",
+                rows,
+            )
+            self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        count = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+        excess = count - self.max_entries
+        if excess > 0:
+            self._conn.execute(
+                "DELETE FROM embeddings WHERE rowid IN "
+                "(SELECT rowid FROM embeddings ORDER BY last_used LIMIT ?)",
+                (excess,),
+            )
+            logger.debug(f"Evicted {excess} entries from embedding cache")
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ClassificationCache:
+    """
+    Persistent contract classifications backed by SQLite, keyed by (file md5,
+    model, prompt settings).
+
+    A contract's classification only depends on its content and on what the
+    prompt sent of it, so a file that was classified once is never sent to the
+    classifier again, even after its points are re-indexed. A result from an
+    excerpt is not reused for the whole document, nor the other way around.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS classification_results (
+                md5 TEXT NOT NULL,
+                model TEXT NOT NULL,
+                settings TEXT NOT NULL,
+                result TEXT NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (md5, model, settings)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, md5: str, model: str, settings: str) -> Optional[dict]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT result FROM classification_results "
+                "WHERE md5 = ? AND model = ? AND settings = ?",
+                (md5, model, settings),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return json.loads(row[0])
+
+    def put(self, md5: str, model: str, settings: str, result: dict) -> None:
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO classification_results "
+                "(md5, model, settings, result, created) VALUES (?, ?, ?, ?, ?)",
+                (md5, model, settings, json.dumps(result), time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ConversionCache:
+    """
+    Converted markdown and title of documents, zlib-compressed in SQLite and keyed
+    by (file md5, converter version). Re-chunking, re-embedding or re-classifying
+    a contract starts from the stored text instead of converting it again, and a
+    converter upgrade naturally misses the old entries.
+    """
+
+    def __init__(self, path: str, level: int = 6):
+        self.path = path
+        self.level = level
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS conversions (
+                md5 TEXT NOT NULL,
+                converter TEXT NOT NULL,
+                markdown BLOB NOT NULL,
+                title TEXT,
+                size INTEGER NOT NULL,
+                created REAL NOT NULL,
+                PRIMARY KEY (md5, converter)
+            )
+            """
+        )
+        self._conn.commit()
+
+    def get(self, md5: str, converter: str) -> Optional[Tuple[str, Optional[str]]]:
+        """The (markdown, title) of a converted file, or None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT markdown, title FROM conversions WHERE md5 = ? AND converter = ?",
+                (md5, converter),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return zlib.decompress(row[0]).decode("utf-8"), row[1]
+
+    def contains(self, md5: str, converter: str) -> bool:
+        with self._lock:
+            return (
+                self._conn.execute(
+                    "SELECT 1 FROM conversions WHERE md5 = ? AND converter = ?",
+                    (md5, converter),
+                ).fetchone()
+                is not None
+            )
+
+    def put(
+        self, md5: str, converter: str, markdown: str, title: Optional[str]
+    ) -> None:
+        data = markdown.encode("utf-8")
+        blob = zlib.compress(data, self.level)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO conversions "
+                "(md5, converter, markdown, title, size, created) VALUES (?, ?, ?, ?, ?, ?)",
+                (md5, converter, blob, title, len(data), time.time()),
+            )
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class TTLCache:
+    """
+    Thread-safe in-memory LRU cache whose entries also expire after `ttl` seconds.
+
+    Every entry remembers how long it took to compute, so the cache can report the
+    latency its hits saved.
+    """
+
+    def __init__(self, maxsize: int = 256, ttl: float = 300.0):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+        self._entries: "OrderedDict[Hashable, Tuple[float, float, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                self._entries.pop(key, None)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self.saved_seconds += entry[1]
+            return entry[2]
+
+    def put(self, key: Hashable, value: Any, cost: float = 0.0) -> None:
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, cost, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, float]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_seconds": round(self.saved_seconds, 3),
+            "size": len(self._entries),
+        }
+
+
+_shared_caches: Dict[str, EmbeddingCache] = {}
+_shared_caches_lock = threading.Lock()
+
+
+def shared_embedding_cache() -> Optional[EmbeddingCache]:
+    """
+    Process-wide embedding cache configured from the environment.
+
+    EMBEDDING_CACHE_PATH selects the SQLite file (empty disables caching) and
+    EMBEDDING_CACHE_MAX_ENTRIES bounds its size.
+    """
+    path = os.getenv("EMBEDDING_CACHE_PATH", ".cache/embeddings.sqlite")
+    if not path:
+        return None
+    with _shared_caches_lock:
+        if path not in _shared_caches:
+            max_entries = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", "200000"))
+            _shared_caches[path] = EmbeddingCache(path, max_entries=max_entries)
+        return _shared_caches[path]
+
+
+_shared_classification_caches: Dict[str, ClassificationCache] = {}
+
+
+def shared_classification_cache() -> Optional[ClassificationCache]:
+    """
+    Process-wide classification cache configured from the environment.
+
+    CLASSIFICATION_CACHE_PATH selects the SQLite file (empty disables caching).
+    """
+    path = os.getenv("CLASSIFICATION_CACHE_PATH", ".cache/classifications.sqlite")
+    if not path:
+        return None
+    with _shared_caches_lock:
+        if path not in _shared_classification_caches:
+            _shared_classification_caches[path] = ClassificationCache(path)
+        return _shared_classification_caches[path]
+
+
+_shared_conversion_caches: Dict[str, ConversionCache] = {}
+
+
+def shared_conversion_cache() -> Optional[ConversionCache]:
+    """
+    Process-wide converted-markdown cache configured from the environment.
+
+    CONVERSION_CACHE_PATH selects the SQLite file (empty disables caching).
+    """
+    path = os.getenv("CONVERSION_CACHE_PATH", ".cache/conversions.sqlite")
+    if not path:
+        return None
+    with _shared_caches_lock:
+        if path not in _shared_conversion_caches:
+            _shared_conversion_caches[path] = ConversionCache(path)
+        return _shared_conversion_caches[path]
@@ -0,0 +1,235 @@
+import re
+from typing import Iterator, List, Optional
+
+import numpy as np
+
+from src.contract_analysis.embeddings import EmbeddingBatcher
+
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.?!])\s+")
+
+
+class StreamingPercentile:
+    """
+    Approximate percentile of a stream of cosine distances in constant memory,
+    from a fixed-bin histogram over the distance range [0, 2].
+    """
+
+    def __init__(self, bins: int = 4096, upper: float = 2.0):
+        self.upper = upper
+        self.counts = np.zeros(bins, dtype=np.int64)
+        self.total = 0
+
+    def add(self, values: np.ndarray) -> None:
+        if len(values):
+            counts, _ = np.histogram(
+                np.clip(values, 0, self.upper), bins=len(self.counts), range=(0, self.upper)
+            )
+            self.counts += counts
+            self.total += len(values)
+
+    def percentile(self, q: float) -> float:
+        if not self.total:
+            return 0.0
+        width = self.upper / len(self.counts)
+        cumulative = np.cumsum(self.counts)
+        rank = q / 100 * self.total
+        index = int(np.searchsorted(cumulative, rank))
+        index = min(index, len(self.counts) - 1)
+        # Interpolate inside the bin the rank falls into
+        below = cumulative[index - 1] if index else 0
+        inside = self.counts[index]
+        fraction = (rank - below) / inside if inside else 0.0
+        return (index + fraction) * width
+
+
+class SemanticChunker:
+    """
+    Splits text into chunks at the points where the meaning of consecutive
+    sentence windows changes the most.
+
+    Sentence window embeddings are held in one contiguous float32 matrix and all
+    adjacent cosine distances are computed with a single row-wise dot product.
+
+    `chunk` works on the whole document at once. `iter_chunks` streams it in
+    blocks of `block_sentences` sentences, so memory and request sizes stay flat
+    however long the contract is.
+    """
+
+    def __init__(
+        self,
+        embedder: EmbeddingBatcher,
+        buffer_size: int = 3,
+        breakpoint_percentile: float = 95,
+        block_sentences: int = 512,
+    ):
+        self.embedder = embedder
+        self.buffer_size = buffer_size
+        self.breakpoint_percentile = breakpoint_percentile
+        self.block_sentences = max(block_sentences, 1)
+
+    @staticmethod
+    def split_sentences(text: str) -> List[str]:
+        return SENTENCE_SPLIT_PATTERN.split(text)
+
+    @staticmethod
+    def iter_sentences(text: str) -> Iterator[str]:
+        """Sentences of a text, split lazily; same result as `split_sentences`."""
+        start = 0
+        for match in SENTENCE_SPLIT_PATTERN.finditer(text):
+            yield text[start : match.start()]
+            start = match.end()
+        yield text[start:]
+
+    @staticmethod
+    def combine_sentences(sentences: List[str], buffer_size: int = 3) -> List[str]:
+        """
+        Build the window of each sentence with `buffer_size` neighbours on each side.
+        Windows are sliced out of one joined string, so building them is linear in
+        the size of the output.
+        """
+        joined = " ".join(sentences)
+        starts = []
+        position = 0
+        for sentence in sentences:
+            starts.append(position)
+            position += len(sentence) + 1
+
+        windows = []
+        last = len(sentences) - 1
+        for i in range(len(sentences)):
+            first = max(i - buffer_size, 0)
+            end = min(i + buffer_size, last)
+            windows.append(joined[starts[first] : starts[end] + len(sentences[end])].strip())
+        return windows
+
+    @staticmethod
+    def cosine_distances(embeddings: np.ndarray) -> np.ndarray:
+        """Cosine distance between every pair of consecutive rows."""
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        norms[norms == 0] = 1
+        normalized = embeddings / norms
+        similarities = np.einsum(
+            "ij,ij->i", normalized[:-1], normalized[1:], dtype=np.float64
+        )
+        return 1 - similarities
+
+    def embed_windows(self, windows: List[str]) -> np.ndarray:
+        embeddings = self.embedder.embed(windows)
+        if any(embedding is None for embedding in embeddings):
+            raise RuntimeError("Failed to embed sentences for semantic chunking")
+        return np.asarray(embeddings, dtype=np.float32)
+
+    def chunk(self, text: str) -> List[str]:
+        """Chunk text based on semantic similarity."""
+        if not text.strip():
+            return []
+        sentences = self.split_sentences(text)
+        if len(sentences) < 2:
+            return [" ".join(sentences)]
+
+        windows = self.combine_sentences(sentences, self.buffer_size)
+        distances = self.cosine_distances(self.embed_windows(windows))
+
+        # Break after every sentence whose distance to the next is an outlier
+        threshold = np.percentile(distances, self.breakpoint_percentile)
+        breakpoints = np.flatnonzero(distances > threshold)
+
+        chunks = []
+        start_index = 0
+        for index in breakpoints:
+            chunks.append(" ".join(sentences[start_index : index + 1]))
+            start_index = index + 1
+
+        # Add final chunk
+        if start_index < len(sentences):
+            chunks.append(" ".join(sentences[start_index:]))
+
+        return chunks
+
+    def iter_chunks(self, text: str) -> Iterator[str]:
+        """
+        Chunk text in overlapping blocks of sentences and yield chunks as soon as
+        their end is known.
+
+        Each block's windows get `buffer_size` sentences of context from the
+        neighbouring blocks, so windows are identical to `chunk`'s. Only the
+        breakpoint threshold differs: the first block uses its exact percentile,
+        later blocks an approximate percentile over every distance seen so far.
+        A document that fits in one block is chunked exactly like `chunk` does.
+        """
+        if not text.strip():
+            return
+        sentences = self.iter_sentences(text)
+        buffer = self.buffer_size
+        # Sentences held back past each block: the context of its last windows, and
+        # at least the sentence its last distance runs to, even without context
+        lookahead = max(buffer, 1)
+        window: List[str] = []  # sentences from index `offset` on
+        offset = 0
+        next_index = 0  # first sentence whose window is not embedded yet
+        exhausted = False
+        previous: Optional[np.ndarray] = None
+        percentile = StreamingPercentile()
+        chunk: List[str] = []
+
+        while True:
+            # Read one block plus the lookahead its last windows need
+            while not exhausted and len(window) + offset - next_index < (
+                self.block_sentences + lookahead
+            ):
+                try:
+                    window.append(next(sentences))
+                except StopIteration:
+                    exhausted = True
+            available = len(window) + offset - next_index
+            count = available if exhausted else available - lookahead
+            if count <= 0:
+                break
+            if exhausted and previous is None and count < 2:
+                yield " ".join(window)
+                return
+
+            last = len(window) + offset - 1
+            windows = [
+                " ".join(
+                    window[max(i - buffer, 0) - offset : min(i + buffer, last) - offset + 1]
+                ).strip()
+                for i in range(next_index, next_index + count)
+            ]
+            embeddings = self.embed_windows(windows)
+            if previous is not None:
+                # The distance across the block boundary belongs to the previous sentence
+                distances = self.cosine_distances(np.vstack([previous, embeddings]))
+                first = next_index - 1
+            else:
+                distances = self.cosine_distances(embeddings)
+                first = next_index
+            previous = embeddings[-1:]
+
+            threshold = 0.0
+            if len(distances):
+                seen = percentile.total
+                percentile.add(distances)
+                if seen:
+                    threshold = percentile.percentile(self.breakpoint_percentile)
+                else:
+                    threshold = np.percentile(distances, self.breakpoint_percentile)
+
+            # Break after every sentence whose distance to the next is an outlier
+            for index, distance in enumerate(distances, start=first):
+                chunk.append(window[index - offset])
+                if distance > threshold:
+                    yield " ".join(chunk)
+                    chunk = []
+            next_index += count
+
+            if exhausted:
+                # The last sentence has no next one and always closes the final chunk
+                chunk.append(window[last - offset])
+                yield " ".join(chunk)
+                return
+
+            # Keep only the sentences later windows and the open chunk still need
+            keep = max(next_index - lookahead, 0)
+            del window[: keep - offset]
+            offset = keep
@@ -0,0 +1,234 @@
+import json
+import logging
+import os
+import re
+import threading
+from typing import List, Optional
+
+from src.contract_analysis.cache import ClassificationCache
+from src.contract_analysis.metrics import metrics
+from src.contract_analysis.models import ContractClassification
+from src.contract_analysis.scheduler import (
+    BULK,
+    RequestScheduler,
+    estimate_tokens,
+    shared_scheduler,
+)
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = [
+    "Affiliate Agreement",
+    "Co-Branding",
+    "Development",
+    "Distributor",
+    "Endorsement",
+    "Franchise",
+    "Hosting",
+    "IP",
+    "Joint Venture",
+    "License Agreement",
+    "Maintenance",
+    "Manufacturing",
+    "Marketing",
+    "Non-Compete Non-Solicit",
+    "Outsourcing",
+    "Promotion",
+    "Reseller",
+    "Service",
+    "Sponsorship",
+    "Strategic Alliance",
+    "Supply",
+    "Transportation",
+]
+
+# Bump when PROMPT_TEMPLATE changes, so cached classifications are not reused
+PROMPT_VERSION = 1
+
+PROMPT_TEMPLATE = """
+        You are a contract classifier expert.
+        You are given a contract{excerpt_note}.
+        You need to classify the contract into one of the following categories:
+{categories}
+
+        It's imperative that:
+        1. You only return the category name
+        2. One category needs to be selected out of this list
+        3. The reasoning provided has to be thorough yet concise
+
+        This is the contract's content:
+        {document}
+        """
+
+# Words that point at a category, used to pick the most telling paragraphs
+CATEGORY_TERMS = re.compile(
+    r"affiliat|co-brand|develop|distribut|endors|franchis|host|intellectual property|"
+    r"joint venture|licen[cs]|maintenan|manufactur|marketing|non-compet|solicit|"
+    r"outsourc|promot|resell|services?\b|sponsor|alliance|suppl|transport",
+    re.IGNORECASE,
+)
+HEADING = re.compile(
+    r"^\s*(#+\s+\S|(article|section|schedule|exhibit)\b|\d+(\.\d+)*\.?\s+[A-Z])",
+    re.IGNORECASE,
+)
+RECITALS_END = re.compile(r"NOW,?\s+THEREFORE", re.IGNORECASE)
+
+
+def representative_excerpt(
+    document: str, max_chars: int, title: Optional[str] = None
+) -> str:
+    """
+    A bounded excerpt that carries most of a contract's category signal: the title,
+    the opening through the recitals, the section headings and then the paragraphs
+    that mention category terms most often, in document order.
+    """
+    if len(document) <= max_chars:
+        return document
+
+    # Opening: parties and recitals, up to the operative clauses when they start early
+    head_limit = max_chars // 3
+    recitals_end = RECITALS_END.search(document, 0, max_chars // 2)
+    if recitals_end is not None:
+        head_limit = max(head_limit, recitals_end.end())
+    parts: List[str] = [f"Title: {title}"] if title else []
+    parts.append(document[:head_limit])
+    budget = max_chars - sum(len(part) for part in parts)
+
+    rest = document[head_limit:]
+    headings = [line.strip() for line in rest.splitlines() if HEADING.match(line)]
+    heading_block = "\n".join(headings)[: budget // 3]
+    if heading_block:
+        parts.append("Section headings:\n" + heading_block)
+        budget -= len(heading_block)
+
+    paragraphs = [p.strip() for p in re.split(r"\n\s*\n", rest) if p.strip()]
+    ranked = sorted(
+        range(len(paragraphs)),
+        key=lambda i: len(CATEGORY_TERMS.findall(paragraphs[i])),
+        reverse=True,
+    )
+    selected = []
+    for i in ranked:
+        if len(paragraphs[i]) > budget:
+            continue
+        selected.append(i)
+        budget -= len(paragraphs[i])
+    if selected:
+        parts.append("Selected clauses:\n" + "\n\n".join(paragraphs[i] for i in sorted(selected)))
+
+    return "\n\n".join(parts)
+
+
+class ContractClassifier:
+    """
+    Classifies contracts with a single shared LLM client.
+
+    Results are stored by file md5, so a contract is classified at most once.
+    In "excerpt" mode only a bounded representative excerpt is sent; in "full"
+    mode the whole document is sent unless it exceeds `max_document_chars`, in
+    which case the excerpt is used so the prompt stays within the context limit.
+    At most `max_concurrency` classification requests are in flight at a time,
+    however many threads call `classify`, and with a scheduler each request is
+    paced within the model's rate limits and retried on 429s.
+    """
+
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "o3-mini",
+        mode: str = "full",
+        excerpt_chars: int = 12_000,
+        max_document_chars: int = 200_000,
+        max_concurrency: int = 4,
+        cache: Optional[ClassificationCache] = None,
+        llm=None,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
+        if mode not in ("full", "excerpt"):
+            raise ValueError(f"Unknown classification mode {mode}, expected full or excerpt")
+        self.api_key = api_key
+        self.model = model
+        self.mode = mode
+        self.excerpt_chars = excerpt_chars
+        self.max_document_chars = max_document_chars
+        self.cache = cache
+        self._llm = llm
+        self.scheduler = scheduler
+        self._llm_lock = threading.Lock()
+        self._semaphore = threading.BoundedSemaphore(max(max_concurrency, 1))
+
+    @classmethod
+    def from_env(
+        cls, api_key: str, cache: Optional[ClassificationCache] = None
+    ) -> "ContractClassifier":
+        model = os.getenv("CLASSIFY_MODEL", "o3-mini")
+        return cls(
+            api_key,
+            model=model,
+            mode=os.getenv("CLASSIFY_MODE", "full"),
+            excerpt_chars=int(os.getenv("CLASSIFY_EXCERPT_CHARS", "12000")),
+            max_document_chars=int(os.getenv("CLASSIFY_MAX_DOCUMENT_CHARS", "200000")),
+            max_concurrency=int(os.getenv("CLASSIFY_MAX_CONCURRENCY", "4")),
+            cache=cache,
+            scheduler=shared_scheduler(model),
+        )
+
+    @property
+    def llm(self):
+        """The LLM used for classification, built on first use and then reused."""
+        if self._llm is None:
+            with self._llm_lock:
+                if self._llm is None:
+                    from crewai.llm import LLM
+
+                    self._llm = LLM(
+                        model=self.model,
+                        api_key=self.api_key,
+                        response_format=ContractClassification,
+                    )
+        return self._llm
+
+    def uses_excerpt(self, document: str) -> bool:
+        return self.mode == "excerpt" or len(document) > self.max_document_chars
+
+    def prompt_settings(self, document: str) -> str:
+        """What the prompt of a document is built from, part of its cache key."""
+        sent = f"excerpt-{self.excerpt_chars}" if self.uses_excerpt(document) else "full"
+        return f"v{PROMPT_VERSION}/{sent}"
+
+    def prompt(self, document: str, title: Optional[str] = None) -> str:
+        excerpt = self.uses_excerpt(document)
+        if excerpt:
+            document = representative_excerpt(document, self.excerpt_chars, title)
+        return PROMPT_TEMPLATE.format(
+            excerpt_note=" excerpt" if excerpt else "",
+            categories="\n".join(f"        - {category}" for category in CATEGORIES),
+            document=document,
+        )
+
+    def classify(
+        self, document: str, md5: Optional[str] = None, title: Optional[str] = None
+    ) -> dict:
+        """Classify a contract, reusing the stored result for a known md5 and prompt."""
+        settings = self.prompt_settings(document)
+        if md5 and self.cache is not None:
+            cached = self.cache.get(md5, self.model, settings)
+            if cached is not None:
+                metrics.incr("classify.cache_hits")
+                return cached
+
+        prompt = self.prompt(document, title)
+        metrics.incr("classify.requests", mode=self.mode)
+        metrics.incr("classify.prompt_chars", len(prompt), mode=self.mode)
+        with self._semaphore, metrics.span("classify.request", mode=self.mode):
+            if self.scheduler is not None:
+                result = self.scheduler.call(
+                    lambda: self.llm.call(prompt), tokens=estimate_tokens(prompt), priority=BULK
+                )
+            else:
+                result = self.llm.call(prompt)
+        result_dict = json.loads(result)
+
+        if md5 and self.cache is not None:
+            self.cache.put(md5, self.model, settings, result_dict)
+        return result_dict
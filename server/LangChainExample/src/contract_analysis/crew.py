@@ -1,10 +1,12 @@
+import logging
 import os
-from typing import Any
+from typing import Any, Optional
 
 from crewai import Agent, Crew, Process, Task
-from crewai.project import CrewBase, agent, before_kickoff, crew, task
+from crewai.project import CrewBase, after_kickoff, agent, before_kickoff, crew, task
 
-from src.contract_analysis.services import ContractsService
+from src.contract_analysis.indexer import ensure_fresh_index
+from src.contract_analysis.metrics import metrics
 from src.contract_analysis.tools.qdrant_vector_search_tool import QdrantVectorSearchTool
 
 
@@ -18,11 +20,34 @@ class AnalyzingContractClausesForConflictsAndSimilaritiesCrew:
         qdrant_api_key=os.getenv("QDRANT_API_KEY"),
     )
 
+    # INDEX_ON_KICKOFF policy of this crew's freshness check; None reads the environment
+    index_on_kickoff: Optional[str] = None
+    # Whether this crew's kickoff scope on the shared tool is open
+    kickoff_open: bool = False
+    # Report file of generate_report_task; None keeps the task config's, "" writes none
+    report_file: Optional[str] = None
+
     @before_kickoff
     def load_and_classify_contracts(self, inputs: dict[str, Any]) -> dict[str, Any]:
-        ContractsService().load_and_classify_contracts()
+        # Agents share every search result for the rest of the kickoff
+        started_alone = self.vector_search_tool.begin_kickoff()
+        self.kickoff_open = True
+        if started_alone:
+            # Metrics cover one kickoff, or one stretch of overlapping batch kickoffs
+            metrics.reset()
+        # Cheap freshness check; the background indexer keeps the collection current
+        ensure_fresh_index(self.index_on_kickoff)
         return inputs
 
+    @after_kickoff
+    def finish_kickoff(self, output: Any) -> Any:
+        self.kickoff_open = False
+        if self.vector_search_tool.end_kickoff() and metrics.enabled:
+            metrics.export(event="kickoff")
+            if os.getenv("METRICS_KICKOFF_REPORT", "true").lower() == "true":
+                logging.getLogger(__name__).info(metrics.summary())
+        return output
+
     @agent
     def data_retrieval_analysis_specialist(self) -> Agent:
         return Agent(
@@ -70,9 +95,10 @@ class AnalyzingContractClausesForConflictsAndSimilaritiesCrew:
 
     @task
     def generate_report_task(self) -> Task:
-        return Task(
-            config=self.tasks_config["generate_report_task"],  # type: ignore
-        )
+        config = self.tasks_config["generate_report_task"]  # type: ignore
+        if self.report_file is not None:
+            config = {**config, "output_file": self.report_file or None}
+        return Task(config=config)
 
     @crew
     def crew(self) -> Crew:
@@ -0,0 +1,253 @@
+import logging
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+try:
+    import tiktoken
+
+    TIKTOKEN_AVAILABLE = True
+except ImportError:
+    TIKTOKEN_AVAILABLE = False
+
+from src.contract_analysis.cache import EmbeddingCache, text_hash
+from src.contract_analysis.metrics import metrics
+from src.contract_analysis.scheduler import (
+    BULK,
+    RequestScheduler,
+    estimate_tokens,
+    is_input_error,
+    is_retryable,
+)
+
+logger = logging.getLogger(__name__)
+
+# OpenAI embeddings endpoint limits: inputs per request and total tokens per request
+MAX_INPUTS_PER_REQUEST = 2048
+MAX_TOKENS_PER_REQUEST = 300_000
+
+
+@dataclass
+class BatchReport:
+    """Request accounting for one group of texts (usually one contract file)."""
+
+    inputs: int = 0
+    requests: int = 0
+    cached: int = 0
+    failed: int = 0
+
+    @property
+    def requests_saved(self) -> int:
+        """Requests avoided compared to embedding every text on its own, cache included."""
+        return max(self.inputs - self.requests, 0)
+
+
+class EmbeddingBatcher:
+    """
+    Packs texts from one or more groups into as few embedding requests as the
+    provider's input-count and token limits allow, and maps the vectors back.
+    A request rejected for its inputs is split in half, so only the texts the
+    provider refuses end up failed. Transient errors are retried, and any other
+    error (an outage, a bad key, retries run out) is raised at once rather than
+    retried for every half of every batch. Duplicate texts are sent once and,
+    when a cache is given, previously embedded texts are not sent at all.
+    With a scheduler, requests are paced within the model's rate limits and
+    retried there.
+    """
+
+    def __init__(
+        self,
+        client,
+        model: str,
+        dimensions: Optional[int] = None,
+        cache: Optional[EmbeddingCache] = None,
+        max_inputs: int = MAX_INPUTS_PER_REQUEST,
+        max_tokens: int = MAX_TOKENS_PER_REQUEST,
+        max_retries: int = 2,
+        retry_delay: float = 1.0,
+        scheduler: Optional[RequestScheduler] = None,
+    ):
+        self.client = client
+        self.model = model
+        self.dimensions = dimensions
+        self.cache = cache
+        self.max_inputs = max_inputs
+        self.max_tokens = max_tokens
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.scheduler = scheduler
+        self.reports: Dict[str, BatchReport] = {}
+        self._reports_lock = threading.Lock()
+        self._encoding = None
+        if TIKTOKEN_AVAILABLE:
+            try:
+                try:
+                    self._encoding = tiktoken.encoding_for_model(model)
+                except KeyError:
+                    self._encoding = tiktoken.get_encoding("cl100k_base")
+            except Exception as e:
+                # The encoding files are downloaded on first use and may be unavailable offline
+                logger.warning(f"Falling back to estimated token counts: {str(e)}")
+
+    @property
+    def cache_dimensions(self) -> int:
+        """Dimensions part of the cache key; 0 stands for the model's default size."""
+        return self.dimensions or 0
+
+    def count_tokens(self, text: str) -> int:
+        """Token count of a text, estimated from its length without tiktoken."""
+        if self._encoding is not None:
+            return len(self._encoding.encode(text, disallowed_special=()))
+        return estimate_tokens(text)
+
+    def embed(self, texts: List[str], group: str = "") -> List[Optional[List[float]]]:
+        """
+        Embed a list of texts. Texts the provider rejects map to None; other
+        request errors are raised.
+        """
+        return self.embed_groups({group: texts})[group]
+
+    def embed_groups(
+        self, groups: Dict[str, List[str]]
+    ) -> Dict[str, List[Optional[List[float]]]]:
+        """
+        Embed the texts of several groups, packing them together into shared requests.
+        Returns the vectors per group in the original order; failed texts map to None.
+        """
+        # Every distinct text is embedded once, wherever it appears
+        positions: Dict[str, List[Tuple[str, int]]] = {}
+        texts_by_hash: Dict[str, str] = {}
+        for key, texts in groups.items():
+            self._count(key, "inputs", len(texts))
+            for i, text in enumerate(texts):
+                digest = text_hash(text)
+                positions.setdefault(digest, []).append((key, i))
+                texts_by_hash[digest] = text
+
+        vectors: Dict[str, List[float]] = {}
+        if self.cache is not None:
+            vectors.update(
+                self.cache.get_many(self.model, self.cache_dimensions, positions)
+            )
+            for digest in vectors:
+                for key, _ in positions[digest]:
+                    self._count(key, "cached")
+            metrics.incr("embeddings.cache_hits", len(vectors))
+            metrics.incr("embeddings.cache_misses", len(positions) - len(vectors))
+
+        pending = [
+            (digest, texts_by_hash[digest], self.count_tokens(texts_by_hash[digest]))
+            for digest in positions
+            if digest not in vectors
+        ]
+        for batch in self._pack(pending):
+            self._embed_batch(batch, positions, vectors)
+
+        results: Dict[str, List[Optional[List[float]]]] = {
+            key: [None] * len(texts) for key, texts in groups.items()
+        }
+        for digest, locations in positions.items():
+            vector = vectors.get(digest)
+            for key, i in locations:
+                if vector is None:
+                    self._count(key, "failed")
+                results[key][i] = vector
+
+        for key in groups:
+            report = self.reports[key]
+            logger.debug(
+                f"Embedded {report.inputs} texts of {key or 'input'} in {report.requests} "
+                f"requests ({report.cached} cached, {report.requests_saved} requests saved, "
+                f"{report.failed} failed)"
+            )
+        return results
+
+    def take_report(self, key: str) -> BatchReport:
+        """Return and forget the accounting of a group, e.g. once its file is done."""
+        with self._reports_lock:
+            return self.reports.pop(key, BatchReport())
+
+    def _count(self, key: str, counter: str, amount: int = 1) -> None:
+        with self._reports_lock:
+            report = self.reports.setdefault(key, BatchReport())
+            setattr(report, counter, getattr(report, counter) + amount)
+
+    def _pack(self, items: List[Tuple[str, str, int]]):
+        """Greedily pack items into batches respecting input-count and token limits."""
+        batch: List[Tuple[str, str, int]] = []
+        batch_tokens = 0
+        for item in items:
+            tokens = item[2]
+            if batch and (
+                len(batch) >= self.max_inputs or batch_tokens + tokens > self.max_tokens
+            ):
+                yield batch
+                batch, batch_tokens = [], 0
+            batch.append(item)
+            batch_tokens += tokens
+        if batch:
+            yield batch
+
+    def _create(self, inputs: List[str], tokens: int = 0):
+        kwargs = {"model": self.model, "input": inputs}
+        if self.dimensions:
+            kwargs["dimensions"] = self.dimensions
+        if self.scheduler is not None:
+            return self.scheduler.call(
+                lambda: self.client.embeddings.create(**kwargs), tokens=tokens, priority=BULK
+            )
+        return self.client.embeddings.create(**kwargs)
+
+    def _embed_batch(
+        self,
+        batch: List[Tuple[str, str, int]],
+        positions: Dict[str, List[Tuple[str, int]]],
+        vectors: Dict[str, List[float]],
+    ) -> None:
+        for key in {key for digest, _, _ in batch for key, _ in positions[digest]}:
+            self._count(key, "requests")
+
+        tokens = sum(item[2] for item in batch)
+        # The scheduler already retries rate limits and transient errors
+        attempts = 1 if self.scheduler is not None else self.max_retries + 1
+        for attempt in range(attempts):
+            if metrics.enabled:
+                metrics.incr("embeddings.requests")
+                metrics.incr("embeddings.inputs", len(batch))
+                metrics.incr("embeddings.tokens", tokens)
+                metrics.incr("embeddings.retries", 1 if attempt else 0)
+            try:
+                with metrics.span("embeddings.request"):
+                    response = self._create([item[1] for item in batch], tokens)
+                embedded = []
+                for data in response.data:
+                    digest = batch[data.index][0]
+                    vectors[digest] = data.embedding
+                    embedded.append((digest, data.embedding))
+                if self.cache is not None:
+                    self.cache.put_many(self.model, self.cache_dimensions, embedded)
+                return
+            except Exception as e:
+                logger.warning(
+                    f"Embedding request of {len(batch)} inputs failed "
+                    f"(attempt {attempt + 1}/{attempts}): {str(e)}"
+                )
+                if is_input_error(e):
+                    # The same inputs fail the same way again; split them instead
+                    break
+                if not is_retryable(e) or attempt + 1 >= attempts:
+                    # Smaller requests would fail alike, so fail fast
+                    metrics.incr("embeddings.failed_batches")
+                    raise
+                time.sleep(self.retry_delay * (2**attempt))
+
+        metrics.incr("embeddings.failed_batches")
+        if len(batch) == 1:
+            logger.error(f"Giving up on embedding text {batch[0][0][:12]}")
+            return
+
+        # Send each half on its own so only the rejected texts end up failed
+        middle = len(batch) // 2
+        self._embed_batch(batch[:middle], positions, vectors)
+        self._embed_batch(batch[middle:], positions, vectors)
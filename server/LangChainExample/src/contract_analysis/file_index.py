@@ -0,0 +1,154 @@
+import hashlib
+import json
+import logging
+import mmap
+import os
+import threading
+from dataclasses import asdict, dataclass
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+HASH_BLOCK_SIZE = 1024 * 1024
+
+
+def hash_file(path: str, use_mmap: bool = False) -> str:
+    """
+    MD5 of a file, read in fixed-size blocks so large scanned PDFs never have to fit
+    in memory at once. With `use_mmap` the file is mapped and hashed block by block.
+    The digest stays MD5 because it identifies contracts in the collection payloads.
+    """
+    digest = hashlib.md5()
+    with open(path, "rb") as file:
+        if use_mmap and os.fstat(file.fileno()).st_size > 0:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for start in range(0, len(mapped), HASH_BLOCK_SIZE):
+                    digest.update(mapped[start : start + HASH_BLOCK_SIZE])
+        else:
+            for block in iter(lambda: file.read(HASH_BLOCK_SIZE), b""):
+                digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class FileState:
+    """What a file looked like when it was last hashed."""
+
+    size: int
+    mtime_ns: int
+    inode: int
+    md5: str
+
+    def matches(self, stat: os.stat_result) -> bool:
+        return (
+            self.size == stat.st_size
+            and self.mtime_ns == stat.st_mtime_ns
+            and self.inode == stat.st_ino
+        )
+
+
+class FileStateIndex:
+    """
+    Persisted index of file states keyed by path. A file whose size, mtime and
+    inode are unchanged reuses its stored hash without being opened, so a rescan
+    of an unchanged directory only costs one stat per file.
+    """
+
+    def __init__(self, path: str, use_mmap: bool = False):
+        self.path = path
+        self.use_mmap = use_mmap
+        self.hashed = 0
+        self.reused = 0
+        self._states: Dict[str, FileState] = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+        self._load()
+
+    def _load(self) -> None:
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                self._states = {
+                    key: FileState(**value) for key, value in json.load(file).items()
+                }
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable file state index {self.path}: {str(e)}")
+            self._states = {}
+
+    def save(self) -> None:
+        """Write the index atomically if anything changed."""
+        if not self.path or not self._dirty:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self._lock:
+            data = {key: asdict(state) for key, state in self._states.items()}
+            self._dirty = False
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(temporary, self.path)
+
+    def md5(self, path: str, stat: Optional[os.stat_result] = None) -> str:
+        """Hash of a file, taken from the index when its stat is unchanged."""
+        key = os.path.abspath(path)
+        stat = stat or os.stat(path)
+        state = self._states.get(key)
+        if state is not None and state.matches(stat):
+            self.reused += 1
+            return state.md5
+
+        md5 = hash_file(path, self.use_mmap)
+        self.hashed += 1
+        with self._lock:
+            self._states[key] = FileState(
+                size=stat.st_size, mtime_ns=stat.st_mtime_ns, inode=stat.st_ino, md5=md5
+            )
+            self._dirty = True
+        return md5
+
+    def scan(self, directory: str) -> Iterator[Tuple[str, str, str]]:
+        """Yield (filename, path, md5) for every regular file in a directory."""
+        self.hashed = self.reused = 0
+        seen = set()
+        with os.scandir(directory) as entries:
+            for entry in entries:
+                if not entry.is_file():
+                    continue
+                seen.add(os.path.abspath(entry.path))
+                try:
+                    md5 = self.md5(entry.path, entry.stat())
+                except OSError as e:
+                    logger.error(f"Error hashing {entry.name}: {str(e)}")
+                    continue
+                yield entry.name, entry.path, md5
+
+        # Forget files that disappeared from the directory
+        directory = os.path.abspath(directory)
+        with self._lock:
+            removed = [
+                key
+                for key in self._states
+                if os.path.dirname(key) == directory and key not in seen
+            ]
+            for key in removed:
+                del self._states[key]
+                self._dirty = True
+
+
+def directory_fingerprint(directory: str) -> str:
+    """
+    Cheap fingerprint of a directory's regular files from their names, sizes and
+    mtimes. It changes whenever a file is added, removed or modified, and costs
+    one stat per file.
+    """
+    digest = hashlib.sha256()
+    with os.scandir(directory) as entries:
+        files = sorted(
+            (entry.name, entry.stat()) for entry in entries if entry.is_file()
+        )
+    for name, stat in files:
+        digest.update(f"{name}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode("utf-8"))
+    return digest.hexdigest()
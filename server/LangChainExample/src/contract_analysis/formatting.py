@@ -0,0 +1,225 @@
+import json
+import math
+import re
+from collections import Counter
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.contract_analysis.scheduler import estimate_tokens
+
+# Same sentence split as the semantic chunker
+SENTENCE_SPLIT_PATTERN = re.compile(r"(?<=[.?!])\s+")
+WORD_PATTERN = re.compile(r"[a-z0-9]+")
+HEADING_PATTERN = re.compile(
+    r"^\s*(#+\s|(article|section|schedule|exhibit)\b|\d+(\.\d+)*\.?\s)", re.IGNORECASE
+)
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or shall that the "
+    "this to was were will with which what who any all each such not no".split()
+)
+
+# Chunks from the same contract sharing this much of their sentences are duplicates
+DUPLICATE_OVERLAP = 0.6
+# Marks sentences left out of a trimmed chunk
+GAP = "…"
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    try:
+        import tiktoken
+
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        # tiktoken is optional and its encoding files may be unavailable offline
+        return None
+
+
+def count_tokens(text: str) -> int:
+    """Token count of a text, estimated from its length without tiktoken."""
+    encoding = _encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return estimate_tokens(text)
+
+
+def _terms(text: str) -> List[str]:
+    return [word for word in WORD_PATTERN.findall(text.lower()) if word not in STOPWORDS]
+
+
+def _compact_metadata(result: dict) -> dict:
+    """The fields an agent needs to cite a hit: contract, category, chunk position and score."""
+    metadata = result.get("metadata") or {}
+    classification = metadata.get("contract_classification")
+    category = (
+        classification.get("category") if isinstance(classification, dict) else classification
+    )
+    compact = {"file": metadata.get("filename")}
+    if category:
+        compact["category"] = category
+    if metadata.get("chunk_index") is not None:
+        compact["chunk"] = f"{metadata['chunk_index'] + 1}/{metadata.get('total_chunks', '?')}"
+    compact["score"] = round(float(result.get("distance") or 0), 3)
+    return compact
+
+
+def _deduplicate(results: List[dict]) -> Tuple[List[dict], int]:
+    """
+    Drop hits that repeat a better-scored hit of the same contract: the same
+    chunk, or a chunk whose sentences mostly appear in it already.
+    """
+    kept: List[dict] = []
+    seen: Dict[str, List[Set[str]]] = {}
+    dropped = 0
+    for result in sorted(results, key=lambda r: r.get("distance") or 0, reverse=True):
+        filename = (result.get("metadata") or {}).get("filename")
+        sentences = {
+            s.strip() for s in SENTENCE_SPLIT_PATTERN.split(result.get("context", "")) if s.strip()
+        }
+        duplicate = any(
+            sentences and len(sentences & other) / len(sentences) >= DUPLICATE_OVERLAP
+            for other in seen.get(filename, [])
+        )
+        if duplicate:
+            dropped += 1
+            continue
+        seen.setdefault(filename, []).append(sentences)
+        kept.append(result)
+    return kept, dropped
+
+
+def _trim(
+    text: str,
+    query_terms: Counter,
+    weights: Dict[str, float],
+    budget: int,
+    count: Callable[[str], int],
+) -> Optional[str]:
+    """
+    The sentences of a chunk most relevant to the query that fit in about
+    `budget` tokens, in document order with gaps marked; the leading sentences
+    when none is relevant. None if not even one fits.
+    """
+    sentences = [s for s in SENTENCE_SPLIT_PATTERN.split(text) if s.strip()]
+    if not sentences:
+        return None
+    if count(text) <= budget:
+        return text
+
+    def relevance(index: int) -> float:
+        terms = Counter(_terms(sentences[index]))
+        score = sum(weights.get(term, 0) * min(terms[term], query_terms[term]) for term in terms)
+        # A leading heading tells the agent which section the clause comes from
+        if index == 0 and HEADING_PATTERN.match(sentences[0]):
+            score += max(weights.values(), default=1.0)
+        return score
+
+    scores = [relevance(i) for i in range(len(sentences))]
+    ranked = sorted(range(len(sentences)), key=lambda i: (-scores[i], i))
+    if scores[ranked[0]] > 0:
+        # Sentences that share nothing with the query only pad a trimmed chunk
+        ranked = [i for i in ranked if scores[i] > 0]
+    selected: List[int] = []
+    # The trailing gap marker
+    used = 1
+    for index in ranked:
+        # The sentence, the space before it and a gap marker it may open
+        cost = count(sentences[index]) + 2
+        if used + cost > budget:
+            continue
+        selected.append(index)
+        used += cost
+    if not selected:
+        return None
+
+    parts = []
+    previous = -1
+    for index in sorted(selected):
+        if index != previous + 1:
+            parts.append(GAP)
+        parts.append(sentences[index].strip())
+        previous = index
+    if previous != len(sentences) - 1:
+        parts.append(GAP)
+    return " ".join(parts)
+
+
+def entry_tokens(entry: dict, count: Callable[[str], int] = count_tokens) -> int:
+    """Tokens a compact hit takes in the serialized output, with its separator."""
+    return count(json.dumps(entry, ensure_ascii=False, separators=(",", ":"))) + 1
+
+
+def compact_results(
+    query: str,
+    results: List[dict],
+    token_budget: int,
+    count: Callable[[str], int] = count_tokens,
+    max_share: float = 0.5,
+) -> Tuple[List[dict], Dict[str, int]]:
+    """
+    Fit search results into `token_budget` tokens: duplicates are dropped,
+    metadata is cut to what a citation needs and every chunk is trimmed to its
+    sentences most relevant to the query. Hits are filled in score order, each
+    taking what it needs up to `max_share` of the budget, until the budget runs
+    out, so a tight budget keeps the best hits. Returns the compact hits and
+    counts of what was dropped.
+    """
+    results, duplicates = _deduplicate(results)
+    query_terms = Counter(_terms(query))
+
+    # Rarer query terms across the hits' sentences weigh more
+    sentence_terms = [
+        set(_terms(sentence))
+        for result in results
+        for sentence in SENTENCE_SPLIT_PATTERN.split(result.get("context", ""))
+    ]
+    weights = {
+        term: math.log(1 + len(sentence_terms) / (1 + sum(term in s for s in sentence_terms)))
+        for term in query_terms
+    }
+
+    compact: List[dict] = []
+    remaining = token_budget
+    # A single hit may use the whole budget
+    cap = token_budget if len(results) <= 1 else int(token_budget * max_share)
+    dropped = 0
+    for result in results:
+        entry = _compact_metadata(result)
+        text, cost = None, 0
+        # A hit that does not fit in its capped share may use what is left, so
+        # a tight budget still returns the best hit
+        for allowance in sorted({min(remaining, cap), remaining}):
+            text, cost = _fit(
+                result.get("context", ""), entry, query_terms, weights, allowance, count
+            )
+            if text is not None:
+                break
+        if text is None:
+            dropped += 1
+            continue
+        entry["text"] = text
+        compact.append(entry)
+        remaining -= cost
+    return compact, {"duplicates": duplicates, "dropped": dropped}
+
+
+def _fit(
+    text: str,
+    entry: dict,
+    query_terms: Counter,
+    weights: Dict[str, float],
+    allowance: int,
+    count: Callable[[str], int],
+) -> Tuple[Optional[str], int]:
+    """The trimmed text of a hit whose serialized entry fits in `allowance`, and its cost."""
+    budget = allowance - entry_tokens({**entry, "text": ""}, count)
+    while budget > 0:
+        trimmed = _trim(text, query_terms, weights, budget, count)
+        if trimmed is None:
+            break
+        # Sentence counts only approximate the serialized hit, so check it
+        cost = entry_tokens({**entry, "text": trimmed}, count)
+        if cost <= allowance:
+            return trimmed, cost
+        budget -= cost - allowance
+    return None, 0
@@ -0,0 +1,298 @@
+"""
+Long-running contracts indexer.
+
+    python -m src.contract_analysis.indexer [--once | --convert-only]
+
+Indexes the contracts directory, then watches it (inotify through watchdog when
+installed, stat polling otherwise) and re-indexes incrementally after changes.
+Every successful run records an index version marker, so crew kickoff only has
+to compare the directory fingerprint against it. --convert-only fills the
+conversion cache in parallel without touching the collection.
+"""
+
+import argparse
+import datetime
+import importlib.util
+import json
+import logging
+import os
+import threading
+from typing import Dict, Optional
+
+from src.contract_analysis.file_index import directory_fingerprint
+from src.contract_analysis.metrics import metrics
+
+# watchdog is only imported when the indexer starts watching
+WATCHDOG_AVAILABLE = importlib.util.find_spec("watchdog") is not None
+
+logger = logging.getLogger(__name__)
+
+
+class IndexVersion:
+    """
+    Marker file recording which state of the contracts directory the collection
+    was last indexed from.
+    """
+
+    def __init__(self, path: str, collection_name: str):
+        self.path = path
+        self.collection_name = collection_name
+
+    @classmethod
+    def from_env(cls) -> "IndexVersion":
+        return cls(
+            os.getenv("INDEX_VERSION_PATH", ".cache/index_version.json"),
+            os.getenv("QDRANT_COLLECTION_NAME", ""),
+        )
+
+    def read(self) -> Optional[dict]:
+        if not self.path or not os.path.exists(self.path):
+            return None
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                return json.load(file)
+        except Exception as e:
+            logger.warning(f"Ignoring unreadable index version {self.path}: {str(e)}")
+            return None
+
+    def write(self, fingerprint: Optional[str]) -> dict:
+        """
+        Record a new index version atomically. A fingerprint of None records a
+        run that left files to retry: searches still see that the collection
+        changed, but the marker is never current.
+        """
+        previous = self.read() or {}
+        marker = {
+            "version": previous.get("version", 0) + 1,
+            "collection": self.collection_name,
+            "fingerprint": fingerprint,
+            "updated": datetime.datetime.now().isoformat(),
+        }
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as file:
+            json.dump(marker, file)
+        os.replace(temporary, self.path)
+        return marker
+
+    def is_current(self, fingerprint: str) -> bool:
+        marker = self.read()
+        return (
+            marker is not None
+            and marker.get("collection") == self.collection_name
+            and marker.get("fingerprint") == fingerprint
+        )
+
+
+class ContractsIndexer:
+    """
+    Keeps the contracts collection in sync with the contracts directory.
+
+    A single ContractsService is reused across runs, so clients, caches and the
+    file state index stay warm. Bursts of file events are debounced into one run,
+    and a run only starts when the directory fingerprint differs from the marker.
+    """
+
+    def __init__(
+        self,
+        service=None,
+        version: Optional[IndexVersion] = None,
+        poll_interval: float = 5.0,
+        debounce: float = 2.0,
+        use_watchdog: bool = True,
+    ):
+        self._service = service
+        self.contracts_dir = (
+            service.contracts_dir
+            if service is not None
+            else os.getenv("CONTRACTS_DIR", "knowledge/contracts")
+        )
+        self.version = version or IndexVersion.from_env()
+        self.poll_interval = poll_interval
+        self.debounce = debounce
+        self.use_watchdog = use_watchdog and WATCHDOG_AVAILABLE
+        self._changed = threading.Event()
+        self._run_lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, service=None) -> "ContractsIndexer":
+        return cls(
+            service,
+            poll_interval=float(os.getenv("INDEXER_POLL_INTERVAL", "5")),
+            debounce=float(os.getenv("INDEXER_DEBOUNCE", "2")),
+            use_watchdog=os.getenv("INDEXER_WATCHDOG", "true").lower() == "true",
+        )
+
+    @property
+    def service(self):
+        if self._service is None:
+            from src.contract_analysis.services import ContractsService
+
+            self._service = ContractsService()
+        return self._service
+
+    def is_current(self) -> bool:
+        return self.version.is_current(directory_fingerprint(self.contracts_dir))
+
+    def index_once(self, force: bool = False) -> bool:
+        """
+        Index the directory unless the marker is current. Returns whether it ran.
+        The marker is only recorded when every file was indexed, so files that
+        failed are retried by the next check instead of waiting for another change.
+        """
+        with self._run_lock:
+            # Taken before indexing, so changes made during the run trigger another one
+            fingerprint = directory_fingerprint(self.contracts_dir)
+            if not force and self.version.is_current(fingerprint):
+                return False
+            failed = self.service.load_and_classify_contracts()
+            self.service.remove_missing_contracts()
+            if failed:
+                logger.warning(
+                    f"{failed} files failed to index, leaving the index version stale "
+                    f"so they are retried"
+                )
+            marker = self.version.write(None if failed else fingerprint)
+            logger.info(f"Index version {marker['version']} recorded")
+            return True
+
+    def run(self, stop: Optional[threading.Event] = None) -> None:
+        """Index, then watch the directory and re-index after changes until stopped."""
+        stop = stop or threading.Event()
+        self._safe_index()
+
+        observer = self._start_observer()
+        logger.info(
+            f"Watching {self.contracts_dir} "
+            f"({'inotify' if observer is not None else 'polling'})"
+        )
+        try:
+            while not stop.is_set():
+                if observer is not None:
+                    # Timing out still re-checks the fingerprint, which retries failed runs
+                    self._changed.wait(self.poll_interval)
+                    # Wait for the burst of events to settle before indexing
+                    while self._changed.is_set() and not stop.is_set():
+                        self._changed.clear()
+                        stop.wait(self.debounce)
+                elif stop.wait(self.poll_interval):
+                    break
+                self._safe_index()
+        finally:
+            if observer is not None:
+                observer.stop()
+                observer.join()
+
+    def _safe_index(self) -> None:
+        try:
+            ran = self.index_once()
+        except Exception as e:
+            # A failed run leaves the marker stale, so the next change or poll retries
+            logger.error(f"Error indexing contracts: {str(e)}")
+            ran = True
+        if ran:
+            # The long-running indexer exports one metrics record per run
+            metrics.export(event="index")
+            metrics.reset()
+
+    def _start_observer(self):
+        if not self.use_watchdog:
+            return None
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+
+        changed = self._changed
+
+        class Handler(FileSystemEventHandler):
+            def on_any_event(self, event):
+                if not event.is_directory:
+                    changed.set()
+
+        observer = Observer()
+        observer.schedule(Handler(), self.contracts_dir, recursive=False)
+        observer.start()
+        return observer
+
+
+def ensure_fresh_index(mode: Optional[str] = None) -> None:
+    """
+    Freshness check run before crew kickoff, selected by INDEX_ON_KICKOFF:
+    "check" indexes only when the directory changed since the last recorded
+    version, "always" indexes unconditionally and "off" leaves indexing to the
+    background indexer.
+    """
+    mode = mode or os.getenv("INDEX_ON_KICKOFF", "check")
+    if mode == "off":
+        return
+    if mode not in ("check", "always"):
+        raise ValueError(f"Unknown INDEX_ON_KICKOFF mode {mode}, expected check, always or off")
+    indexer = ContractsIndexer.from_env()
+    if not indexer.index_once(force=mode == "always"):
+        logger.info("Contracts index is current... skipping ingestion")
+
+
+def convert_only(workers: Optional[int] = None) -> Dict[str, int]:
+    """Pre-warm the conversion cache for every file in the contracts directory."""
+    from src.contract_analysis.cache import shared_conversion_cache
+    from src.contract_analysis.file_index import FileStateIndex
+    from src.contract_analysis.pipeline import PipelineConfig, prewarm_conversions
+
+    cache = shared_conversion_cache()
+    if cache is None:
+        raise ValueError("CONVERSION_CACHE_PATH is empty, there is no cache to warm")
+    file_index = FileStateIndex(
+        os.getenv("FILE_STATE_INDEX_PATH", ".cache/file_state.json"),
+        use_mmap=os.getenv("FILE_HASH_MMAP", "false").lower() == "true",
+    )
+    try:
+        counts = prewarm_conversions(
+            file_index.scan(os.getenv("CONTRACTS_DIR", "knowledge/contracts")),
+            cache,
+            workers=workers or PipelineConfig.from_env().convert_workers,
+        )
+    finally:
+        file_index.save()
+    logger.info(
+        f"Conversion cache warmed: {counts['converted']} converted, "
+        f"{counts['cached']} already cached, {counts['failed']} failed"
+    )
+    return counts
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument(
+        "--once", action="store_true", help="Index once if needed and exit"
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="Index once even if the marker is current"
+    )
+    parser.add_argument(
+        "--convert-only",
+        action="store_true",
+        help="Only convert documents into the conversion cache and exit",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="Conversion processes for --convert-only"
+    )
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    if args.convert_only:
+        convert_only(args.workers)
+        return
+
+    indexer = ContractsIndexer.from_env()
+    if args.once or args.force:
+        indexer.index_once(force=args.force)
+        return
+    try:
+        indexer.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
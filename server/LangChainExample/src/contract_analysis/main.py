@@ -21,6 +21,42 @@ def run():
     )
 
 
+def index():
+    """
+    Run the background contracts indexer.
+    """
+    from src.contract_analysis.indexer import main as run_indexer
+
+    run_indexer()
+
+
+def batch():
+    """
+    Answer every query of a JSONL file and stream the reports to an output file.
+    """
+    from src.contract_analysis.batch import run_batch
+
+    run_batch(sys.argv[1], sys.argv[2], int(sys.argv[3]) if len(sys.argv) > 3 else None)
+
+
+def export_index():
+    """
+    Export the contracts collection to a snapshot directory.
+    """
+    from src.contract_analysis.snapshot import main as run_snapshot
+
+    run_snapshot(["export", *sys.argv[1:]])
+
+
+def import_index():
+    """
+    Load a snapshot directory into empty contracts collections.
+    """
+    from src.contract_analysis.snapshot import main as run_snapshot
+
+    run_snapshot(["import", *sys.argv[1:]])
+
+
 def train():
     """
     Train the crew for a given number of iterations.
@@ -0,0 +1,233 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+LabelKey = Tuple[Tuple[str, str], ...]
+
+
+class _NoopSpan:
+    """Shared do-nothing context manager returned by a disabled registry."""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class SpanStats:
+    """Count, total and maximum duration of one span name and label set."""
+
+    __slots__ = ("count", "total", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        if seconds > self.max:
+            self.max = seconds
+
+
+class Metrics:
+    """
+    In-process timing spans and counters for ingestion and search.
+
+    Spans record how long a block took and counters accumulate amounts such as
+    requests, tokens, bytes, cache hits and retries, each under a name and
+    optional labels. Everything can be exported as Prometheus text or appended
+    as JSON lines. A disabled registry returns a shared no-op span and ignores
+    counters, so instrumented code pays one attribute check.
+    """
+
+    def __init__(
+        self,
+        enabled: bool = False,
+        jsonl_path: Optional[str] = None,
+        prometheus_path: Optional[str] = None,
+        prefix: str = "contracts",
+    ):
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path
+        self.prometheus_path = prometheus_path
+        self.prefix = prefix
+        self._spans: Dict[Tuple[str, LabelKey], SpanStats] = {}
+        self._counters: Dict[Tuple[str, LabelKey], float] = {}
+        self._lock = threading.Lock()
+        self._started = time.time()
+
+    @classmethod
+    def from_env(cls) -> "Metrics":
+        """
+        METRICS_ENABLED turns collection on. METRICS_JSONL_PATH and
+        METRICS_PROMETHEUS_PATH select where `export` writes.
+        """
+        return cls(
+            enabled=os.getenv("METRICS_ENABLED", "false").lower() == "true",
+            jsonl_path=os.getenv("METRICS_JSONL_PATH") or None,
+            prometheus_path=os.getenv("METRICS_PROMETHEUS_PATH") or None,
+        )
+
+    @staticmethod
+    def _key(name: str, labels: Dict[str, object]) -> Tuple[str, LabelKey]:
+        return name, tuple(sorted((key, str(value)) for key, value in labels.items()))
+
+    def span(self, name: str, **labels):
+        """Time a block: `with metrics.span("ingest.convert"): ...`."""
+        if not self.enabled:
+            return _NOOP_SPAN
+        return self._span(name, labels)
+
+    @contextmanager
+    def _span(self, name: str, labels: Dict[str, object]) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def observe(self, name: str, seconds: float, **labels) -> None:
+        """Record a duration measured elsewhere."""
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            stats = self._spans.get(key)
+            if stats is None:
+                stats = self._spans[key] = SpanStats()
+            stats.add(seconds)
+
+    def incr(self, name: str, amount: float = 1, **labels) -> None:
+        """Add to a counter."""
+        if not self.enabled or not amount:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + amount
+
+    def reset(self) -> None:
+        with self._lock:
+            self._spans.clear()
+            self._counters.clear()
+            self._started = time.time()
+
+    def snapshot(self) -> dict:
+        """Current spans and counters as plain data."""
+        with self._lock:
+            spans = [
+                {
+                    "name": name,
+                    "labels": dict(labels),
+                    "count": stats.count,
+                    "total_seconds": round(stats.total, 6),
+                    "mean_seconds": round(stats.total / stats.count, 6),
+                    "max_seconds": round(stats.max, 6),
+                }
+                for (name, labels), stats in self._spans.items()
+            ]
+            counters = [
+                {"name": name, "labels": dict(labels), "value": value}
+                for (name, labels), value in self._counters.items()
+            ]
+        return {
+            "started": self._started,
+            "ended": time.time(),
+            "spans": spans,
+            "counters": counters,
+        }
+
+    def to_prometheus(self) -> str:
+        """Prometheus text exposition format of the current spans and counters."""
+        snapshot = self.snapshot()
+        lines = []
+        declared = set()
+
+        def metric(name: str, kind: str) -> str:
+            full = f"{self.prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', name)}"
+            if full not in declared:
+                declared.add(full)
+                lines.append(f"# TYPE {full} {kind}")
+            return full
+
+        def labels(values: Dict[str, str]) -> str:
+            if not values:
+                return ""
+            pairs = ",".join(
+                f'{key}="{_escape_label(value)}"' for key, value in values.items()
+            )
+            return "{" + pairs + "}"
+
+        for span in sorted(snapshot["spans"], key=lambda s: s["name"]):
+            name = metric(f"{span['name']}_seconds", "summary")
+            lines.append(f"{name}_count{labels(span['labels'])} {span['count']}")
+            lines.append(f"{name}_sum{labels(span['labels'])} {span['total_seconds']}")
+        for span in sorted(snapshot["spans"], key=lambda s: s["name"]):
+            name = metric(f"{span['name']}_seconds_max", "gauge")
+            lines.append(f"{name}{labels(span['labels'])} {span['max_seconds']}")
+        for counter in sorted(snapshot["counters"], key=lambda c: c["name"]):
+            name = metric(f"{counter['name']}_total", "counter")
+            lines.append(f"{name}{labels(counter['labels'])} {counter['value']}")
+        return "\n".join(lines) + "\n"
+
+    def export(self, **context) -> None:
+        """Write the configured Prometheus file and append a JSON lines record."""
+        if not self.enabled:
+            return
+        if self.prometheus_path:
+            _write_atomically(self.prometheus_path, self.to_prometheus())
+        if self.jsonl_path:
+            record = {**context, **self.snapshot()}
+            directory = os.path.dirname(self.jsonl_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            with open(self.jsonl_path, "a", encoding="utf-8") as file:
+                file.write(json.dumps(record) + "\n")
+
+    def summary(self) -> str:
+        """Human-readable table of where the time went, slowest spans first."""
+        snapshot = self.snapshot()
+        lines = [f"Metrics over {snapshot['ended'] - snapshot['started']:.1f}s"]
+        for span in sorted(snapshot["spans"], key=lambda s: s["total_seconds"], reverse=True):
+            label = ",".join(f"{k}={v}" for k, v in span["labels"].items())
+            lines.append(
+                f"  {span['name']}{'[' + label + ']' if label else ''}: "
+                f"{span['count']} x {span['mean_seconds'] * 1000:.1f}ms "
+                f"= {span['total_seconds']:.3f}s (max {span['max_seconds'] * 1000:.1f}ms)"
+            )
+        for counter in sorted(snapshot["counters"], key=lambda c: c["name"]):
+            label = ",".join(f"{k}={v}" for k, v in counter["labels"].items())
+            lines.append(
+                f"  {counter['name']}{'[' + label + ']' if label else ''}: {counter['value']:g}"
+            )
+        return "\n".join(lines)
+
+
+def _escape_label(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _write_atomically(path: str, content: str) -> None:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    temporary = f"{path}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+
+# Process-wide registry used by the instrumented modules
+metrics = Metrics.from_env()
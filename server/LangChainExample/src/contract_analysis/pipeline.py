@@ -0,0 +1,292 @@
+import importlib.metadata
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from src.contract_analysis.cache import ConversionCache
+from src.contract_analysis.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Marks the end of the stream on a stage's inbox
+_DONE = object()
+
+_converter = None
+
+# Bump when the conversion settings change, so cached markdown is not reused
+CONVERSION_FORMAT = 1
+
+
+def convert_document(file_path: str) -> Tuple[str, Optional[str]]:
+    """Convert a document to markdown. Runs in a worker process of the convert stage."""
+    global _converter
+    if _converter is None:
+        from markitdown import MarkItDown
+
+        _converter = MarkItDown(enable_builtins=True)
+    result = _converter.convert(file_path)
+    return result.markdown, result.title
+
+
+def conversion_pool(workers: int) -> ProcessPoolExecutor:
+    """
+    Process pool for document conversion. Workers are spawned rather than
+    forked: by the time they start, stage threads and SQLite connections exist,
+    and a forked worker could inherit a lock one of them holds.
+    """
+    return ProcessPoolExecutor(
+        max_workers=max(workers, 1), mp_context=multiprocessing.get_context("spawn")
+    )
+
+
+@lru_cache(maxsize=1)
+def converter_version() -> str:
+    """Identifies the converter in conversion cache keys, without importing it."""
+    try:
+        version = importlib.metadata.version("markitdown")
+    except importlib.metadata.PackageNotFoundError:
+        version = "unknown"
+    return f"markitdown-{version}/{CONVERSION_FORMAT}"
+
+
+def cached_conversion(
+    cache: Optional[ConversionCache],
+    md5: str,
+    convert: Callable[[], Tuple[str, Optional[str]]],
+) -> Tuple[str, Optional[str]]:
+    """Markdown and title of a file from the conversion cache, converting on a miss."""
+    if cache is not None:
+        found = cache.get(md5, converter_version())
+        if found is not None:
+            metrics.incr("ingest.conversion_cache_hits")
+            return found
+    markdown, title = convert()
+    if cache is not None:
+        cache.put(md5, converter_version(), markdown, title)
+    return markdown, title
+
+
+def prewarm_conversions(
+    files: Iterable[Tuple[str, str, str]],
+    cache: ConversionCache,
+    workers: int = 2,
+) -> Dict[str, int]:
+    """
+    Convert every (filename, path, md5) that is not in the conversion cache yet,
+    in a process pool, without classifying or embedding anything.
+    """
+    counts = {"converted": 0, "cached": 0, "failed": 0}
+    version = converter_version()
+    with conversion_pool(workers) as pool:
+        futures = {}
+        for filename, path, md5 in files:
+            if cache.contains(md5, version):
+                counts["cached"] += 1
+                continue
+            futures[pool.submit(convert_document, path)] = (filename, md5)
+        for future in as_completed(futures):
+            filename, md5 = futures[future]
+            try:
+                markdown, title = future.result()
+            except Exception as e:
+                logger.error(f"Error converting {filename}: {str(e)}")
+                counts["failed"] += 1
+                continue
+            cache.put(md5, version, markdown, title)
+            counts["converted"] += 1
+            logger.info(f"Converted {filename}")
+    return counts
+
+
+@dataclass
+class PipelineConfig:
+    """Concurrency limits of the ingestion pipeline stages."""
+
+    convert_workers: int = 2
+    classify_workers: int = 4
+    embed_workers: int = 4
+    queue_size: int = 8
+
+    @classmethod
+    def from_env(cls) -> "PipelineConfig":
+        return cls(
+            convert_workers=int(
+                os.getenv("INGEST_CONVERT_WORKERS", str(min(os.cpu_count() or 1, 4)))
+            ),
+            classify_workers=int(os.getenv("INGEST_CLASSIFY_WORKERS", "4")),
+            embed_workers=int(os.getenv("INGEST_EMBED_WORKERS", "4")),
+            queue_size=int(os.getenv("INGEST_QUEUE_SIZE", "8")),
+        )
+
+
+@dataclass
+class ContractJob:
+    """A contract file travelling through the ingestion pipeline."""
+
+    filename: str
+    file_path: str
+    md5: str
+    markdown: str = ""
+    title: Optional[str] = None
+    classification: Optional[dict] = None
+    points: List[Any] = field(default_factory=list)
+    payload_updates: Dict[str, dict] = field(default_factory=dict)
+    # Metadata the points in `payload_updates` had before this run
+    previous_payloads: Dict[str, dict] = field(default_factory=dict)
+    stale_ids: List[str] = field(default_factory=list)
+
+
+class IngestionPipeline:
+    """
+    Runs contract ingestion as overlapping stages connected by bounded queues:
+    document conversion in a process pool, then classification and
+    chunking/embedding in thread pools. Throughput is bounded by the slowest
+    stage rather than the sum of all stages, and the bounded queues keep a fast
+    stage from running arbitrarily far ahead of a slow one.
+
+    Conversion happens in-thread with the service's own converter when
+    `convert_workers` is 0. Files found in the service's conversion cache are
+    not converted at all.
+    """
+
+    def __init__(self, service, config: Optional[PipelineConfig] = None):
+        self.service = service
+        self.config = config or PipelineConfig.from_env()
+
+    def run(
+        self,
+        jobs: Iterable[ContractJob],
+        on_complete: Callable[[ContractJob], None],
+        on_error: Optional[Callable[[ContractJob, Exception], None]] = None,
+    ) -> int:
+        """
+        Push jobs through every stage, calling `on_complete` for each finished file
+        and `on_error` for each file a stage failed on. Both run on the stage
+        workers and may be called concurrently. Returns the number of files a
+        stage failed on; errors raised by `on_complete` are logged, not counted.
+        """
+        size = self.config.queue_size
+        converted: queue.Queue = queue.Queue(maxsize=size)
+        classified: queue.Queue = queue.Queue(maxsize=size)
+        pending: queue.Queue = queue.Queue(maxsize=size)
+
+        pool = None
+        workers = max(self.config.convert_workers, 1)
+        if self.config.convert_workers > 0:
+            pool = conversion_pool(self.config.convert_workers)
+
+        def convert_file(job: ContractJob) -> Tuple[str, Optional[str]]:
+            if pool is not None:
+                return pool.submit(convert_document, job.file_path).result()
+            result = self.service.doc_converter.convert(job.file_path)
+            return result.markdown, result.title
+
+        cache = getattr(self.service, "conversion_cache", None)
+
+        def convert(job: ContractJob) -> ContractJob:
+            with metrics.span("ingest.convert"):
+                job.markdown, job.title = cached_conversion(
+                    cache, job.md5, lambda: convert_file(job)
+                )
+            if metrics.enabled:
+                metrics.incr("ingest.bytes_read", os.path.getsize(job.file_path))
+                metrics.incr("ingest.markdown_chars", len(job.markdown))
+            return job
+
+        def classify(job: ContractJob) -> ContractJob:
+            job.classification = self.service._classify_contract(
+                job.markdown, job.md5, job.title
+            )
+            return job
+
+        def embed(job: ContractJob) -> None:
+            job.points = self.service._build_points(job)
+            try:
+                on_complete(job)
+            except Exception as e:
+                # on_complete accounts for the files it fails, so this is not
+                # a stage failure and the file is not counted a second time
+                logger.error(f"Error completing {job.filename}: {str(e)}")
+                metrics.incr("ingest.complete_errors")
+
+        failed = [0]
+        failed_lock = threading.Lock()
+
+        def fail(name: str, job: ContractJob, error: Exception) -> None:
+            logger.error(f"Error in {name} stage for {job.filename}: {str(error)}")
+            metrics.incr("ingest.stage_errors", stage=name)
+            with failed_lock:
+                failed[0] += 1
+            if on_error is not None:
+                on_error(job, error)
+
+        threads = (
+            self._start_stage("convert", convert, pending, converted, workers, fail)
+            + self._start_stage(
+                "classify", classify, converted, classified, self.config.classify_workers, fail
+            )
+            + self._start_stage(
+                "embed", embed, classified, None, self.config.embed_workers, fail
+            )
+        )
+
+        try:
+            # Feeding happens in the caller's thread, so producing jobs (hashing,
+            # skip checks) overlaps with the stages and blocks when they fall behind
+            for job in jobs:
+                pending.put(job)
+        finally:
+            pending.put(_DONE)
+            for thread in threads:
+                thread.join()
+            if pool is not None:
+                pool.shutdown()
+        return failed[0]
+
+    def _start_stage(
+        self,
+        name: str,
+        fn: Callable[[ContractJob], Optional[ContractJob]],
+        inbox: queue.Queue,
+        outbox: Optional[queue.Queue],
+        workers: int,
+        fail: Callable[[str, ContractJob, Exception], None],
+    ) -> List[threading.Thread]:
+        remaining = [max(workers, 1)]
+        lock = threading.Lock()
+
+        def work() -> None:
+            while True:
+                job = inbox.get()
+                if job is _DONE:
+                    # Let the other workers of this stage see the end of the stream
+                    inbox.put(_DONE)
+                    break
+                try:
+                    result = fn(job)
+                except Exception as e:
+                    # The file is left out of the run, so it is retried by the next one
+                    fail(name, job, e)
+                    continue
+                if outbox is not None and result is not None:
+                    outbox.put(result)
+
+            with lock:
+                remaining[0] -= 1
+                last = remaining[0] == 0
+            if last and outbox is not None:
+                outbox.put(_DONE)
+
+        threads = [
+            threading.Thread(target=work, name=f"ingest-{name}-{i}", daemon=True)
+            for i in range(remaining[0])
+        ]
+        for thread in threads:
+            thread.start()
+        return threads
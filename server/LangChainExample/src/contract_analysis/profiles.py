@@ -0,0 +1,118 @@
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Distance,
+    HnswConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+)
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """
+    How a contracts collection stores its vectors.
+
+    dimensions: Reduced embedding size requested from the model (text-embedding-3
+        models are Matryoshka-trained, so shortened vectors stay meaningful).
+        None keeps the full VECTOR_SIZE.
+    quantization: "scalar" (int8, 4x smaller) or "binary" (1 bit, 32x smaller)
+        copies of the vectors kept in RAM for the search itself.
+    on_disk: Keep the original float32 vectors on disk; they are only read to
+        rescore the oversampled quantized candidates.
+    """
+
+    name: str
+    dimensions: Optional[int] = None
+    quantization: Optional[str] = None
+    on_disk: bool = False
+    hnsw_m: Optional[int] = None
+    hnsw_ef_construct: Optional[int] = None
+    hnsw_ef: Optional[int] = None
+    rescore: bool = True
+    oversampling: float = 2.0
+
+    def vector_size(self, default_size: int) -> int:
+        return self.dimensions or default_size
+
+    def vectors_config(self, default_size: int) -> VectorParams:
+        return VectorParams(
+            size=self.vector_size(default_size),
+            distance=Distance.COSINE,
+            on_disk=self.on_disk or None,
+        )
+
+    def quantization_config(self):
+        if self.quantization == "scalar":
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8, quantile=0.99, always_ram=True
+                )
+            )
+        if self.quantization == "binary":
+            return BinaryQuantization(binary=BinaryQuantizationConfig(always_ram=True))
+        return None
+
+    def hnsw_config(self) -> Optional[HnswConfigDiff]:
+        if self.hnsw_m is None and self.hnsw_ef_construct is None:
+            return None
+        return HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def search_params(self) -> Optional[SearchParams]:
+        """Search parameters matching how the collection was built."""
+        if self.quantization is None and self.hnsw_ef is None:
+            return None
+        quantization = None
+        if self.quantization is not None:
+            quantization = QuantizationSearchParams(
+                rescore=self.rescore, oversampling=self.oversampling
+            )
+        return SearchParams(hnsw_ef=self.hnsw_ef, quantization=quantization)
+
+    def estimated_memory_bytes(self, points: int, default_size: int) -> int:
+        """Rough RAM footprint: vectors kept in memory plus the HNSW graph links."""
+        size = self.vector_size(default_size)
+        in_ram = 0 if self.on_disk else size * 4
+        if self.quantization == "scalar":
+            in_ram += size
+        elif self.quantization == "binary":
+            in_ram += (size + 7) // 8
+        # Level 0 of the graph keeps 2 * m links of 4 bytes per point
+        links = 2 * (self.hnsw_m or 16) * 4
+        # 1.5x covers metadata and segment overhead, as in Qdrant's sizing guide
+        return int(points * (in_ram + links) * 1.5)
+
+
+PROFILES: Dict[str, CollectionProfile] = {
+    "default": CollectionProfile("default"),
+    "scalar": CollectionProfile("scalar", quantization="scalar", on_disk=True),
+    "binary": CollectionProfile(
+        "binary", quantization="binary", on_disk=True, oversampling=3.0
+    ),
+    "compact": CollectionProfile(
+        "compact",
+        dimensions=512,
+        quantization="scalar",
+        on_disk=True,
+        hnsw_m=8,
+        hnsw_ef_construct=64,
+    ),
+}
+
+
+def get_profile(name: Optional[str] = None) -> CollectionProfile:
+    """Profile by name, defaulting to QDRANT_COLLECTION_PROFILE."""
+    name = name or os.getenv("QDRANT_COLLECTION_PROFILE", "default")
+    if name not in PROFILES:
+        raise ValueError(
+            f"Unknown collection profile {name}, expected one of: {', '.join(PROFILES)}"
+        )
+    return PROFILES[name]
@@ -0,0 +1,296 @@
+import heapq
+import itertools
+import logging
+import os
+import random
+import threading
+import time
+from typing import Callable, Dict, Optional, TypeVar
+
+from src.contract_analysis.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Priorities: lower goes first, so interactive search overtakes bulk ingestion
+INTERACTIVE = 0
+BULK = 1
+
+PRIORITY_NAMES = {INTERACTIVE: "interactive", BULK: "bulk"}
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# Statuses that depend on the request's inputs, so a smaller request may succeed
+INPUT_ERROR_STATUS = {400, 413}
+RETRYABLE_ERRORS = {
+    "APIConnectionError",
+    "APITimeoutError",
+    "RateLimitError",
+    "InternalServerError",
+    "ServiceUnavailableError",
+    "Timeout",
+}
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Token count of a text estimated from its length, about three characters per
+    token. Used for scheduler admission and wherever tiktoken is unavailable, so
+    requests are packed and admitted by the same count.
+    """
+    return len(text) // 3 + 1
+
+
+def status_code(error: BaseException) -> Optional[int]:
+    """HTTP status of an OpenAI or LiteLLM error, when it has one."""
+    code = getattr(error, "status_code", None)
+    if code is None:
+        code = getattr(getattr(error, "response", None), "status_code", None)
+    return code if isinstance(code, int) else None
+
+
+def is_rate_limited(error: BaseException) -> bool:
+    return status_code(error) == 429 or type(error).__name__ == "RateLimitError"
+
+
+def is_retryable(error: BaseException) -> bool:
+    code = status_code(error)
+    if code is not None:
+        return code in RETRYABLE_STATUS
+    return type(error).__name__ in RETRYABLE_ERRORS or isinstance(
+        error, (ConnectionError, TimeoutError)
+    )
+
+
+def is_input_error(error: BaseException) -> bool:
+    """Whether the request was rejected for its inputs, e.g. a text over the token limit."""
+    code = status_code(error)
+    if code is not None:
+        return code in INPUT_ERROR_STATUS
+    return type(error).__name__ == "BadRequestError"
+
+
+def retry_after(error: BaseException) -> Optional[float]:
+    """Seconds the server asked us to wait, from the retry-after(-ms) headers."""
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    for name, scale in (("retry-after-ms", 0.001), ("retry-after", 1.0)):
+        value = headers.get(name)
+        if value is None:
+            continue
+        try:
+            return max(float(value) * scale, 0.0)
+        except ValueError:
+            continue
+    return None
+
+
+class TokenBucket:
+    """
+    Budget of `per_minute` units that refills continuously and holds at most
+    one minute's worth. Not thread-safe on its own; the scheduler's lock guards it.
+    """
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = self.capacity / 60
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount: float, now: float, reserve: float = 0.0) -> float:
+        """
+        Seconds until `amount` is available on top of `reserve`; more than the
+        capacity waits for a full bucket.
+        """
+        self._refill(now)
+        missing = min(amount + reserve, self.capacity) - self.level
+        return missing / self.rate if missing > 0 else 0.0
+
+    def take(self, amount: float, now: float) -> None:
+        """Spend `amount`; a negative amount refunds an overestimate."""
+        self._refill(now)
+        self.level = min(self.capacity, self.level - min(amount, self.capacity))
+
+
+class RequestScheduler:
+    """
+    Paces calls to one rate-limited API (one model's quota) from every thread
+    in the process.
+
+    A call waits for a concurrency slot and for room in both the requests-per-
+    minute and tokens-per-minute buckets. Waiting calls are served by priority,
+    then in arrival order, so interactive search does not queue behind bulk
+    ingestion, and bulk calls leave `interactive_reserve` of each bucket for
+    interactive ones so a search does not wait for a refill.
+
+    Concurrency adapts: it is halved when the API answers 429 and grows by one
+    slot after a window of successes. A 429 also pauses every call for the
+    server's retry-after. Retryable errors are retried with full-jitter
+    exponential backoff; other errors are raised at once.
+    """
+
+    def __init__(
+        self,
+        name: str = "openai",
+        requests_per_minute: float = 3000,
+        tokens_per_minute: float = 1_000_000,
+        max_concurrency: int = 8,
+        min_concurrency: int = 1,
+        max_retries: int = 5,
+        base_delay: float = 0.5,
+        max_delay: float = 30.0,
+        interactive_reserve: float = 0.05,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_concurrency = max(max_concurrency, 1)
+        self.min_concurrency = max(min(min_concurrency, self.max_concurrency), 1)
+        self.limit = self.max_concurrency
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.interactive_reserve = interactive_reserve
+        self.stats: Dict[str, int] = {"calls": 0, "retries": 0, "rate_limited": 0}
+        self._cond = threading.Condition()
+        self._waiting = []
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._successes = 0
+        self._paused_until = 0.0
+        self._last_decrease = 0.0
+
+    @classmethod
+    def from_env(cls, name: str = "openai") -> "RequestScheduler":
+        """
+        OPENAI_RPM and OPENAI_TPM are the per-model quotas. OPENAI_MAX_CONCURRENCY
+        caps requests in flight and OPENAI_MAX_RETRIES the retries of one call.
+        OPENAI_INTERACTIVE_RESERVE is the share of the quotas kept for searches.
+        """
+        return cls(
+            name=name,
+            requests_per_minute=float(os.getenv("OPENAI_RPM", "3000")),
+            tokens_per_minute=float(os.getenv("OPENAI_TPM", "1000000")),
+            max_concurrency=int(os.getenv("OPENAI_MAX_CONCURRENCY", "8")),
+            max_retries=int(os.getenv("OPENAI_MAX_RETRIES", "5")),
+            interactive_reserve=float(os.getenv("OPENAI_INTERACTIVE_RESERVE", "0.05")),
+        )
+
+    def call(self, fn: Callable[[], T], tokens: int = 0, priority: int = BULK) -> T:
+        """Run `fn` within the rate limits, retrying it on retryable errors."""
+        attempt = 0
+        while True:
+            self._acquire(tokens, priority)
+            try:
+                result = fn()
+            except Exception as e:
+                self._release(tokens, error=e)
+                if not is_retryable(e) or attempt >= self.max_retries:
+                    raise
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2**attempt))
+                logger.debug(
+                    f"{self.name} call failed (attempt {attempt + 1}), retrying in "
+                    f"{delay:.2f}s: {str(e)}"
+                )
+                with self._cond:
+                    self.stats["retries"] += 1
+                metrics.incr("scheduler.retries", scheduler=self.name)
+                time.sleep(delay)
+                attempt += 1
+                continue
+            self._release(tokens, used=_used_tokens(result))
+            return result
+
+    def _acquire(self, tokens: int, priority: int) -> None:
+        ticket = (priority, next(self._sequence))
+        share = self.interactive_reserve if priority > INTERACTIVE else 0.0
+        started = time.monotonic()
+        with self._cond:
+            heapq.heappush(self._waiting, ticket)
+            try:
+                while True:
+                    wait = None
+                    if self._waiting[0] == ticket and self._in_flight < self.limit:
+                        now = time.monotonic()
+                        wait = max(
+                            self._paused_until - now,
+                            self.requests.delay(1, now, share * self.requests.capacity),
+                            self.tokens.delay(tokens, now, share * self.tokens.capacity),
+                        )
+                        if wait <= 0:
+                            break
+                    self._cond.wait(wait)
+            except BaseException:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+                raise
+
+            heapq.heappop(self._waiting)
+            now = time.monotonic()
+            self.requests.take(1, now)
+            self.tokens.take(tokens, now)
+            self._in_flight += 1
+            self.stats["calls"] += 1
+            # The next waiter may be able to go as well
+            self._cond.notify_all()
+        metrics.observe(
+            "scheduler.wait",
+            time.monotonic() - started,
+            scheduler=self.name,
+            priority=PRIORITY_NAMES.get(priority, priority),
+        )
+
+    def _release(
+        self,
+        tokens: int,
+        used: Optional[int] = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        with self._cond:
+            self._in_flight -= 1
+            now = time.monotonic()
+            if used is not None:
+                # Settle the estimate against the usage the API reported
+                self.tokens.take(used - tokens, now)
+            if error is not None and is_rate_limited(error):
+                self.stats["rate_limited"] += 1
+                metrics.incr("scheduler.rate_limited", scheduler=self.name)
+                pause = retry_after(error) or self.base_delay
+                # One burst of 429s halves concurrency once, not once per request
+                if now - self._last_decrease > pause:
+                    self.limit = max(self.min_concurrency, self.limit // 2)
+                    self._last_decrease = now
+                    logger.info(f"{self.name} rate limited, concurrency now {self.limit}")
+                self._successes = 0
+                self._paused_until = max(self._paused_until, now + pause)
+            elif error is None:
+                self._successes += 1
+                if self.limit < self.max_concurrency and self._successes >= self.limit:
+                    self.limit += 1
+                    self._successes = 0
+            self._cond.notify_all()
+
+
+def _used_tokens(response) -> Optional[int]:
+    usage = getattr(response, "usage", None)
+    used = getattr(usage, "total_tokens", None)
+    return used if isinstance(used, int) else None
+
+
+_schedulers: Dict[str, RequestScheduler] = {}
+_schedulers_lock = threading.Lock()
+
+
+def shared_scheduler(model: str) -> RequestScheduler:
+    """The process-wide scheduler of a model's quota, created from the environment."""
+    with _schedulers_lock:
+        scheduler = _schedulers.get(model)
+        if scheduler is None:
+            scheduler = _schedulers[model] = RequestScheduler.from_env(model)
+        return scheduler
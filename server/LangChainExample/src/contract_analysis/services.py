@@ -1,126 +1,266 @@
 import datetime
-import hashlib
-import json
 import logging
 import os
+import threading
 import uuid
-import numpy as np
-from typing import List, Dict
-import re
+from typing import TYPE_CHECKING, Dict, List, Optional, Set, Tuple
 
 import openai
-from crewai.llm import LLM
-from markitdown import MarkItDown
 
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, PointStruct, VectorParams
-from sklearn.metrics.pairwise import cosine_similarity
-
-from src.contract_analysis.models import ContractClassification
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    MatchValue,
+    PayloadSchemaType,
+    PointIdsList,
+    PointStruct,
+    SetPayload,
+    SetPayloadOperation,
+    ShardingMethod,
+    VectorParams,
+)
+
+from src.contract_analysis.cache import (
+    shared_classification_cache,
+    shared_conversion_cache,
+    shared_embedding_cache,
+    text_hash,
+)
+from src.contract_analysis.chunking import SemanticChunker
+from src.contract_analysis.classification import ContractClassifier
+from src.contract_analysis.embeddings import EmbeddingBatcher
+from src.contract_analysis.file_index import FileStateIndex
+from src.contract_analysis.metrics import metrics
+from src.contract_analysis.profiles import get_profile
+from src.contract_analysis.scheduler import shared_scheduler
+from src.contract_analysis.sharding import ShardRouter
+from src.contract_analysis.pipeline import (
+    ContractJob,
+    IngestionPipeline,
+    PipelineConfig,
+    cached_conversion,
+)
+from src.contract_analysis.uploader import PointUploader
+
+if TYPE_CHECKING:
+    from crewai.llm import LLM
 
 # Setup logging
 logger = logging.getLogger(__name__)
 
+# Payload fields that ingestion and QdrantVectorSearchTool filter on
+PAYLOAD_INDEXES = {
+    "metadata.md5": PayloadSchemaType.KEYWORD,
+    "metadata.filename": PayloadSchemaType.KEYWORD,
+    "metadata.contract_classification.category": PayloadSchemaType.KEYWORD,
+    "metadata.chunk_index": PayloadSchemaType.INTEGER,
+}
+
+# Namespace of the deterministic chunk point IDs
+POINT_ID_NAMESPACE = uuid.UUID("4f1c9b1e-6f0a-4d59-9a53-2f6f1e0c8d7a")
+
+
+class ContractsCollection:
+    """
+    The contracts collection in Qdrant, or its shard collections: where they
+    live, how they are laid out and how they are created. Needs no OpenAI
+    access, so snapshot export and import work from this alone.
+    """
+
+    def __init__(self, vector_client=None):
+        self.qdrant_api_key = os.getenv("QDRANT_API_KEY", "")
+        self.qdrant_collection_name = os.getenv("QDRANT_COLLECTION_NAME", "")
+        self.qdrant_url = os.getenv("QDRANT_URL", "")
+        self.embedding_model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+        self.collection_profile = get_profile()
+        self.router = ShardRouter.from_env(self.qdrant_collection_name)
+        self.vector_size = self.collection_profile.vector_size(
+            int(os.getenv("VECTOR_SIZE", "1536"))
+        )
+
+        if vector_client is None and (
+            not self.qdrant_url
+            or not self.qdrant_api_key
+            or not self.qdrant_collection_name
+        ):
+            raise ValueError("Qdrant configuration is incomplete")
+        self.vector_client = vector_client or QdrantClient(
+            url=self.qdrant_url, api_key=self.qdrant_api_key
+        )
+
+    def _create_collection(self) -> None:
+        """Create the vector collection, or one per shard, if it doesn't exist already."""
+        try:
+            for collection_name in self.router.collections():
+                if self.vector_client.collection_exists(collection_name):
+                    logger.info(
+                        f"Collection {collection_name} already exists... skipping creation"
+                    )
+                    self._check_vector_size(collection_name)
+                else:
+                    self._create_sharded_collection(collection_name)
+                self._create_payload_indexes(collection_name)
+        except Exception as e:
+            logger.error(f"Error creating collection: {str(e)}")
+            raise
+
+    def _create_sharded_collection(self, collection_name: str) -> None:
+        """Create one collection, with a shard key per category under custom sharding."""
+        profile = self.collection_profile
+        custom_sharding = self.router.mode == "shard_key"
+        self.vector_client.create_collection(
+            collection_name=collection_name,
+            vectors_config=profile.vectors_config(self.vector_size),
+            quantization_config=profile.quantization_config(),
+            hnsw_config=profile.hnsw_config(),
+            **({"sharding_method": ShardingMethod.CUSTOM} if custom_sharding else {}),
+        )
+        if custom_sharding:
+            for shard in self.router.shards():
+                self.vector_client.create_shard_key(collection_name, shard)
+        logger.info(
+            f"Collection {collection_name} created successfully "
+            f"with the {profile.name} profile"
+        )
 
-class ContractsService:
+    def _check_vector_size(self, collection_name: str) -> None:
+        """Fail early when the collection was built for a different vector size or sharding."""
+        params = self.vector_client.get_collection(collection_name).config.params
+        vectors = params.vectors
+        if isinstance(vectors, VectorParams) and vectors.size != self.vector_size:
+            raise ValueError(
+                f"Collection {collection_name} stores {vectors.size}-dim vectors "
+                f"but the {self.collection_profile.name} profile produces {self.vector_size}"
+            )
+        if self.router.mode == "shard_key" and params.sharding_method != ShardingMethod.CUSTOM:
+            raise ValueError(
+                f"Collection {collection_name} was created without custom sharding; "
+                f"re-create it to use QDRANT_SHARDING=shard_key"
+            )
+
+    def _create_payload_indexes(self, collection_name: str) -> None:
+        """Create missing payload indexes, including on collections created earlier."""
+        payload_schema = self.vector_client.get_collection(collection_name).payload_schema
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            if field_name in payload_schema:
+                continue
+            self.vector_client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+                wait=True,
+            )
+            logger.info(f"Created {field_schema} payload index on {field_name}")
+
+
+class ContractsService(ContractsCollection):
     """
     Service for processing, classifying, and storing contract documents in a vector database.
     Handles document conversion, chunking, classification, and embedding.
+
+    Clients are built from the environment unless passed in, which lets the
+    benchmarks run against local Qdrant and fake OpenAI clients.
     """
 
-    def __init__(self):
+    def __init__(self, vector_client=None, openai_client=None, classifier=None):
         # Load all environment variables at initialization
         self.contracts_dir = os.getenv("CONTRACTS_DIR", "knowledge/contracts")
         self.openai_key = os.getenv("OPENAI_API_KEY", "")
-        self.qdrant_api_key = os.getenv("QDRANT_API_KEY", "")
-        self.qdrant_collection_name = os.getenv("QDRANT_COLLECTION_NAME", "")
-        self.qdrant_url = os.getenv("QDRANT_URL", "")
-        self.embedding_model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
-        self.vector_size = int(os.getenv("VECTOR_SIZE", "1536"))
+        self.pipeline_config = PipelineConfig.from_env()
+        self.file_index = FileStateIndex(
+            os.getenv("FILE_STATE_INDEX_PATH", ".cache/file_state.json"),
+            use_mmap=os.getenv("FILE_HASH_MMAP", "false").lower() == "true",
+        )
+        self._embedded_hashes: Set[str] = set()
+        self._embedded_files: Set[str] = set()
 
         # Validate critical configuration
-        self._validate_configuration()
+        self._validate_configuration(require_openai=openai_client is None or classifier is None)
 
         # Initialize clients
-        self.vector_client = QdrantClient(
-            url=self.qdrant_url, api_key=self.qdrant_api_key
+        super().__init__(vector_client)
+
+        # Retries are left to the request scheduler, which knows about the rate limits
+        self.openai_client = openai_client or openai.Client(
+            api_key=self.openai_key, max_retries=0
+        )
+        self.embedding_cache = shared_embedding_cache()
+        self.embedder = EmbeddingBatcher(
+            self.openai_client,
+            self.embedding_model,
+            dimensions=self.collection_profile.dimensions,
+            cache=self.embedding_cache,
+            scheduler=shared_scheduler(self.embedding_model),
+        )
+        self.chunker = SemanticChunker(
+            self.embedder,
+            block_sentences=int(os.getenv("CHUNK_BLOCK_SENTENCES", "512")),
+        )
+        self.classifier = classifier or ContractClassifier.from_env(
+            self.openai_key, cache=shared_classification_cache()
         )
-        self.openai_client = openai.Client(api_key=self.openai_key)
-        # self.chunker = HybridChunker()
-        self.doc_converter = MarkItDown(enable_builtins=True)
+        self._doc_converter = None
+        self.conversion_cache = shared_conversion_cache()
 
-    def _validate_configuration(self) -> None:
-        """Validate that all required configuration is present."""
+    def _validate_configuration(self, require_openai: bool = True) -> None:
+        """Validate that the contracts directory and, when needed, the OpenAI key are set."""
         if not self.contracts_dir or not os.path.isdir(self.contracts_dir):
             raise ValueError(f"Invalid contracts directory: {self.contracts_dir}")
-        if not self.openai_key:
+        if require_openai and not self.openai_key:
             raise ValueError("OpenAI API key is required")
-        if (
-            not self.qdrant_url
-            or not self.qdrant_api_key
-            or not self.qdrant_collection_name
-        ):
-            raise ValueError("Qdrant configuration is incomplete")
 
     @property
-    def llm(self) -> LLM:
+    def doc_converter(self):
+        """In-process document converter, built on first use since it loads every converter."""
+        if self._doc_converter is None:
+            from markitdown import MarkItDown
+
+            self._doc_converter = MarkItDown(enable_builtins=True)
+        return self._doc_converter
+
+    @property
+    def llm(self) -> "LLM":
         """Get the LLM instance for contract classification."""
-        return LLM(
-            model="o3-mini",
-            api_key=self.openai_key,
-            response_format=ContractClassification,
-        )
+        return self.classifier.llm
 
-    def load_and_classify_contracts(self) -> None:
-        """Main method to create collection and process all contracts."""
+    def load_and_classify_contracts(self) -> int:
+        """
+        Main method to create collection and process all contracts. Returns the
+        number of files that failed and are left for the next run.
+        """
         try:
             self._create_collection()
-            self._populate_collection()
+            return self._populate_collection()
         except Exception as e:
             logger.error(f"Error processing contracts: {str(e)}")
             raise
 
-    def _create_collection(self) -> None:
-        """Create the vector collection if it doesn't exist already."""
-        try:
-            if self.vector_client.collection_exists(self.qdrant_collection_name):
-                logger.info(
-                    f"Collection {self.qdrant_collection_name} already exists... skipping creation"
-                )
-            else:
-                self.vector_client.create_collection(
-                    collection_name=self.qdrant_collection_name,
-                    vectors_config=VectorParams(
-                        size=self.vector_size, distance=Distance.COSINE
-                    ),
-                )
-                logger.info(
-                    f"Collection {self.qdrant_collection_name} created successfully"
-                )
-        except Exception as e:
-            logger.error(f"Error creating collection: {str(e)}")
-            raise
-
-    def _populate_collection(self) -> None:
-        """Process and embed all contracts found in the contracts directory."""
-        points = []
+    def _populate_collection(self) -> int:
+        """
+        Process and embed all contracts found in the contracts directory and
+        return the number of files that failed.
+        """
+        points_uploaded = 0
         files_processed = 0
+        files_failed = 0
         files_skipped = 0
+        counters_lock = threading.Lock()
 
-        # Get list of files to process
-        try:
-            contract_files = os.listdir(self.contracts_dir)
-        except Exception as e:
-            logger.error(f"Error reading contracts directory: {str(e)}")
-            raise
+        # Make sure the contracts directory is readable
+        if not os.path.isdir(self.contracts_dir):
+            logger.error(f"Error reading contracts directory: {self.contracts_dir}")
+            raise ValueError(f"Invalid contracts directory: {self.contracts_dir}")
 
-        for filename in contract_files:
-            contract_full_path = os.path.join(self.contracts_dir, filename)
-            try:
-                # Calculate file hash
-                with open(contract_full_path, "rb") as file:
-                    md5 = hashlib.md5(file.read()).hexdigest()
+        # Fetch every known contract once so skip checks are set lookups
+        self._embedded_hashes, self._embedded_files = self._load_embedded_contracts()
 
+        def new_contracts():
+            nonlocal files_skipped
+            # Unchanged files reuse their stored hash without being opened
+            for filename, contract_full_path, md5 in self.file_index.scan(
+                self.contracts_dir
+            ):
                 # Skip if already processed
                 if self._contract_already_embedded(md5):
                     logger.info(f"{filename} already exists in collection... skipping")
@@ -128,220 +268,391 @@ class ContractsService:
                     continue
 
                 logger.info(f"Processing {filename}")
+                yield ContractJob(filename=filename, file_path=contract_full_path, md5=md5)
 
-                # Process the new contract
-                points.extend(self._process_contract(contract_full_path, filename, md5))
-                files_processed += 1
+        uploader = PointUploader.from_env(self.vector_client, self.qdrant_collection_name)
 
+        def on_complete(job: ContractJob) -> None:
+            nonlocal points_uploaded, files_processed, files_failed
+            # Store each file's points as soon as it is done, so memory stays flat
+            # and an interrupted run keeps every file committed before it
+            try:
+                uploaded = self._commit_contract(job, uploader)
             except Exception as e:
-                logger.error(f"Error processing {filename}: {str(e)}")
-                # Continue with next file instead of failing completely
-                continue
+                logger.error(f"Error upserting points of {job.filename} to Qdrant: {str(e)}")
+                self._discard_contract_points(job, uploader)
+                with counters_lock:
+                    files_failed += 1
+                return
+            finally:
+                job.points, job.payload_updates, job.previous_payloads = [], {}, {}
+
+            logger.info(f"Upserted {uploaded} points from {job.filename}")
+            with counters_lock:
+                self._embedded_hashes.add(job.md5)
+                self._embedded_files.add(job.filename)
+                points_uploaded += uploaded
+                files_processed += 1
 
-        # Upsert all points in a single batch
-        if points:
-            try:
-                self.vector_client.upsert(
-                    collection_name=self.qdrant_collection_name, points=points
-                )
-                logger.info(
-                    f"Upserted {len(points)} points from {files_processed} files"
+        # Convert, classify, embed and upload new contracts in overlapping stages
+        try:
+            with metrics.span("ingest.run"):
+                stage_failures = IngestionPipeline(self, self.pipeline_config).run(
+                    new_contracts(), on_complete
                 )
-            except Exception as e:
-                logger.error(f"Error upserting points to Qdrant: {str(e)}")
-                raise
-        else:
+            # Files that failed to convert, classify or embed never reach on_complete
+            files_failed += stage_failures
+        finally:
+            uploader.close()
+            self.file_index.save()
+
+        metrics.incr("ingest.files_processed", files_processed)
+        metrics.incr("ingest.files_skipped", files_skipped)
+        metrics.incr("ingest.files_failed", files_failed)
+        metrics.incr("ingest.files_hashed", self.file_index.hashed)
+
+        if not files_processed and not files_failed:
             logger.info("No new documents to process")
 
         logger.info(
-            f"Processing complete: {files_processed} files processed, {files_skipped} files skipped"
+            f"Processing complete: {files_processed} files processed ({points_uploaded} points), "
+            f"{files_skipped} files skipped, {files_failed} files failed"
         )
+        logger.info(
+            f"File index: {self.file_index.reused} hashes reused, "
+            f"{self.file_index.hashed} files hashed"
+        )
+        if self.classifier.cache is not None:
+            stats = self.classifier.cache.stats()
+            logger.info(
+                f"Classification cache: {stats['hits']} hits, {stats['misses']} misses"
+            )
+        if self.conversion_cache is not None:
+            stats = self.conversion_cache.stats()
+            logger.info(
+                f"Conversion cache: {stats['hits']} hits, {stats['misses']} misses"
+            )
+        if self.embedding_cache is not None:
+            stats = self.embedding_cache.stats()
+            logger.info(
+                f"Embedding cache: {stats['hits']} hits, {stats['misses']} misses "
+                f"({stats['hit_rate']:.0%} hit rate)"
+            )
+        return files_failed
 
-    def _combine_sentences(
-        self, sentences: List[Dict], buffer_size: int = 3
-    ) -> List[Dict]:
-        """Combines sentences with surrounding context buffer."""
-        for i in range(len(sentences)):
-            combined_sentence = ""
-
-            # Add preceding sentences
-            for j in range(i - buffer_size, i):
-                if j >= 0:
-                    combined_sentence += sentences[j]["sentence"] + " "
-
-            # Add current sentence
-            combined_sentence += sentences[i]["sentence"]
-
-            # Add following sentences
-            for j in range(i + 1, i + 1 + buffer_size):
-                if j < len(sentences):
-                    combined_sentence += " " + sentences[j]["sentence"]
-
-            sentences[i]["combined_sentence"] = combined_sentence.strip()
+    def _semantic_chunker(self, text: str) -> List[str]:
+        """Chunk text based on semantic similarity, streaming long documents in blocks."""
+        return list(self.chunker.iter_chunks(text))
 
-        return sentences
+    def _process_contract(
+        self, file_path: str, filename: str, md5: str
+    ) -> List[PointStruct]:
+        """Process a single contract file and return points for embedding."""
+        job = ContractJob(filename=filename, file_path=file_path, md5=md5)
 
-    def _calculate_cosine_distances(
-        self, sentences: List[Dict]
-    ) -> tuple[List[float], List[Dict]]:
-        """Calculate cosine distances between consecutive sentences."""
-        distances = []
-        for i in range(len(sentences) - 1):
-            embedding_current = sentences[i]["combined_sentence_embedding"]
-            embedding_next = sentences[i + 1]["combined_sentence_embedding"]
+        # Convert document, or reuse its cached markdown
+        def convert():
+            result = self.doc_converter.convert(file_path)
+            return result.markdown, result.title
 
-            similarity = cosine_similarity([embedding_current], [embedding_next])[0][0]
-            distance = 1 - similarity
+        job.markdown, job.title = cached_conversion(self.conversion_cache, md5, convert)
 
-            distances.append(distance)
-            sentences[i]["distance_to_next"] = distance
+        # Classify contract
+        job.classification = self._classify_contract(job.markdown, md5, job.title)
 
-        return distances, sentences
+        return self._build_points(job)
 
-    def _semantic_chunker(self, text: str) -> List[str]:
-        """Chunk text based on semantic similarity."""
-        # Split into sentences
-        single_sentences_list = re.split(r"(?<=[.?!])\s+", text)
-        sentences = [
-            {"sentence": x, "index": i} for i, x in enumerate(single_sentences_list)
-        ]
+    def _build_points(self, job: ContractJob) -> List[PointStruct]:
+        """
+        Chunk and embed a converted, classified contract and return its new points.
 
-        # Combine sentences with context
-        sentences = self._combine_sentences(sentences)
+        Point IDs are derived from the contract and the chunk content, so when a
+        contract that is already in the collection changes, only new or changed
+        chunks are embedded. Unchanged chunks only get their metadata refreshed
+        and chunks that disappeared are marked stale on the job.
+        """
+        points = []
 
-        # Get embeddings
-        embeddings = self.openai_client.embeddings.create(
-            model=self.embedding_model,
-            input=[x["combined_sentence"] for x in sentences],
+        # Create chunks using semantic chunking
+        with metrics.span("ingest.chunk"):
+            chunks = self._semantic_chunker(job.markdown)
+        point_ids = self._chunk_point_ids(job.filename, chunks)
+
+        existing: Dict[str, dict] = {}
+        if job.filename in self._embedded_files:
+            existing = self._existing_points(job.filename, _category(job))
+        new_indices = [i for i, point_id in enumerate(point_ids) if point_id not in existing]
+        job.stale_ids = list(existing.keys() - set(point_ids))
+
+        # Embed all new chunks in as few requests as possible
+        with metrics.span("ingest.embed_chunks"):
+            vectors = self.embedder.embed(
+                [chunks[i] for i in new_indices], group=job.filename
+            )
+        metrics.incr("ingest.chunks", len(chunks))
+        metrics.incr("ingest.chunks_embedded", len(new_indices))
+        report = self.embedder.take_report(job.filename)
+        if report.failed:
+            # Fail the whole file rather than indexing it with chunks missing;
+            # it is not recorded as done, so the next run picks it up again
+            raise RuntimeError(
+                f"{report.failed} of {len(new_indices)} chunks of {job.filename} "
+                f"could not be embedded"
+            )
+        logger.info(
+            f"Embedded {len(new_indices)} of {len(chunks)} chunks of {job.filename} in "
+            f"{report.requests} requests ({report.requests_saved} requests saved)"
         )
+        vectors_by_index = dict(zip(new_indices, vectors))
 
-        for i, sentence in enumerate(sentences):
-            sentence["combined_sentence_embedding"] = embeddings.data[i].embedding
-
-        # Calculate distances and find breakpoints
-        distances, sentences = self._calculate_cosine_distances(sentences)
-        breakpoint_threshold = np.percentile(distances, 95)
-        breakpoint_indices = [
-            i for i, x in enumerate(distances) if x > breakpoint_threshold
-        ]
-
-        # Create chunks
-        chunks = []
-        start_index = 0
-        for index in breakpoint_indices:
-            group = sentences[start_index : index + 1]
-            chunks.append(" ".join([d["sentence"] for d in group]))
-            start_index = index + 1
-
-        # Add final chunk
-        if start_index < len(sentences):
-            chunks.append(" ".join([d["sentence"] for d in sentences[start_index:]]))
-
-        return chunks
-
-    def _process_contract(
-        self, file_path: str, filename: str, md5: str
-    ) -> List[PointStruct]:
-        """Process a single contract file and return points for embedding."""
-        points = []
+        # Process each chunk
+        for i, (chunk, point_id) in enumerate(zip(chunks, point_ids)):
+            # Create metadata
+            metadata = {
+                "md5": job.md5,
+                "filename": job.filename,
+                "contract_classification": job.classification,
+                "chunk_index": i,
+                "total_chunks": len(chunks),
+                "chunk_length": len(chunk),
+                "processed_date": datetime.datetime.now().isoformat(),
+                "title": job.title,
+            }
+
+            # Unchanged chunks keep their vector
+            if i not in vectors_by_index:
+                job.payload_updates[point_id] = metadata
+                job.previous_payloads[point_id] = existing[point_id]
+                continue
 
-        # Convert document
-        result = self.doc_converter.convert(file_path)
+            # Create point
+            points.append(
+                PointStruct(
+                    id=point_id,
+                    vector=vectors_by_index[i],
+                    payload={
+                        "text": chunk,
+                        "metadata": metadata,
+                    },
+                )
+            )
 
-        # Classify contract
-        classification = self._classify_contract(result.markdown)
+        return points
 
-        # Create chunks using semantic chunking
-        chunks = self._semantic_chunker(result.markdown)
+    @staticmethod
+    def _chunk_point_ids(filename: str, chunks: List[str]) -> List[str]:
+        """Deterministic point IDs from the contract identity and chunk content."""
+        occurrences: Dict[str, int] = {}
+        point_ids = []
+        for chunk in chunks:
+            digest = text_hash(chunk)
+            # Repeated identical chunks within one contract still get distinct IDs
+            occurrence = occurrences.get(digest, 0)
+            occurrences[digest] = occurrence + 1
+            point_ids.append(
+                str(uuid.uuid5(POINT_ID_NAMESPACE, f"{filename}:{digest}:{occurrence}"))
+            )
+        return point_ids
+
+    def _existing_points(self, filename: str, category: Optional[str] = None) -> Dict[str, dict]:
+        """
+        Metadata of the points currently stored for a contract file in the shard
+        its category routes to, by point ID. Points left in another shard are
+        re-created.
+        """
+        collection_name, shard_key = self.router.route(category)
+        shard = {"shard_key_selector": shard_key} if shard_key else {}
+        points: Dict[str, dict] = {}
+        offset = None
+        while True:
+            records, offset = self.vector_client.scroll(
+                collection_name=collection_name,
+                scroll_filter=Filter(
+                    must=[
+                        FieldCondition(
+                            key="metadata.filename", match=MatchValue(value=filename)
+                        )
+                    ]
+                ),
+                limit=1000,
+                offset=offset,
+                with_payload=["metadata"],
+                with_vectors=False,
+                **shard,
+            )
+            for record in records:
+                points[str(record.id)] = (record.payload or {}).get("metadata", {})
+            if offset is None:
+                break
+        return points
 
-        # Process each chunk
-        for i, chunk in enumerate(chunks):
-            try:
-                # Create embedding
-                embedding_result = self.openai_client.embeddings.create(
-                    input=chunk, model=self.embedding_model
+    def _commit_contract(self, job: ContractJob, uploader: PointUploader) -> int:
+        """
+        Store a processed contract: upload new points, then refresh the metadata of
+        unchanged points and finally delete stale ones, so the contract is never
+        missing chunks while it is being updated. Points are written to the shard
+        of the contract's category, and any left in another shard by an earlier
+        classification are removed last.
+        """
+        collection_name, shard_key = self.router.route(_category(job))
+        with metrics.span("ingest.upload"):
+            uploaded = uploader.upload(job.points, collection_name, shard_key)
+
+        with metrics.span("ingest.update_payloads"):
+            self._set_metadata(
+                collection_name, shard_key, job.payload_updates, uploader.batch_size
+            )
+        metrics.incr("ingest.payloads_updated", len(job.payload_updates))
+
+        if job.stale_ids:
+            with metrics.span("ingest.delete_stale"):
+                self.vector_client.delete(
+                    collection_name=collection_name,
+                    points_selector=PointIdsList(points=job.stale_ids, shard_key=shard_key),
+                    wait=True,
                 )
-                vector = embedding_result.data[0].embedding
-
-                # Create metadata
-                metadata = {
-                    "md5": md5,
-                    "filename": filename,
-                    "contract_classification": classification,
-                    "chunk_index": i,
-                    "total_chunks": len(chunks),
-                    "chunk_length": len(chunk),
-                    "processed_date": datetime.datetime.now().isoformat(),
-                    "title": result.title,
-                }
-
-                # Create point
-                point_id = str(uuid.uuid4())
-                points.append(
-                    PointStruct(
-                        id=point_id,
-                        vector=vector,
-                        payload={
-                            "text": chunk,
-                            "metadata": metadata,
-                        },
-                    )
+            metrics.incr("ingest.stale_chunks_removed", len(job.stale_ids))
+            logger.info(f"Removed {len(job.stale_ids)} stale chunks of {job.filename}")
+
+        if self.router.enabled and job.filename in self._embedded_files:
+            self._remove_from_other_shards(job.filename, _category(job))
+
+        return uploaded
+
+    def _set_metadata(
+        self,
+        collection_name: str,
+        shard_key: Optional[str],
+        metadata_by_id: Dict[str, dict],
+        batch_size: int,
+    ) -> None:
+        """Replace the metadata of existing points, in batches of update operations."""
+        operations = [
+            SetPayloadOperation(
+                set_payload=SetPayload(
+                    payload={"metadata": metadata}, points=[point_id], shard_key=shard_key
+                )
+            )
+            for point_id, metadata in metadata_by_id.items()
+        ]
+        for start in range(0, len(operations), batch_size):
+            self.vector_client.batch_update_points(
+                collection_name=collection_name,
+                update_operations=operations[start : start + batch_size],
+                wait=True,
+            )
+
+    def _remove_from_other_shards(self, filename: str, category: Optional[str]) -> None:
+        """Delete a contract's points filed under a category it no longer has."""
+        collection_name, shard_key = self.router.route(category)
+        contract = Filter(
+            must=[FieldCondition(key="metadata.filename", match=MatchValue(value=filename))]
+        )
+        if shard_key is not None:
+            self.vector_client.delete(
+                collection_name=collection_name,
+                points_selector=contract,
+                shard_key_selector=[s for s in self.router.shards() if s != shard_key],
+                wait=True,
+            )
+            return
+        for other in self.router.collections():
+            if other != collection_name:
+                self.vector_client.delete(
+                    collection_name=other, points_selector=contract, wait=True
                 )
-            except Exception as e:
-                logger.error(f"Error processing chunk {i} of {filename}: {str(e)}")
-                continue
 
-        return points
+    def _load_embedded_contracts(self) -> Tuple[Set[str], Set[str]]:
+        """
+        Collect the md5 and filename of every contract in the collection, or in
+        every shard collection, in a single scroll pass.
+        """
+        hashes: Set[str] = set()
+        filenames: Set[str] = set()
+        offset = None
+        for collection_name in self.router.collections():
+            while True:
+                records, offset = self.vector_client.scroll(
+                    collection_name=collection_name,
+                    limit=1000,
+                    offset=offset,
+                    with_payload=["metadata.md5", "metadata.filename"],
+                    with_vectors=False,
+                )
+                for record in records:
+                    metadata = (record.payload or {}).get("metadata", {})
+                    if metadata.get("md5"):
+                        hashes.add(metadata["md5"])
+                    if metadata.get("filename"):
+                        filenames.add(metadata["filename"])
+                if offset is None:
+                    break
+        logger.info(f"Found {len(hashes)} contracts already in the collection")
+        return hashes, filenames
 
     def _contract_already_embedded(self, md5: str) -> bool:
-        existing_points = self.vector_client.scroll(
-            collection_name=self.qdrant_collection_name,
-            scroll_filter={"must": [{"key": "metadata.md5", "match": {"text": md5}}]},  # type: ignore
-        )[0]
-        return len(existing_points) > 0
-
-    def _classify_contract(self, document: str) -> dict:
-        prompt = f"""
-        You are a contract classifier expert.
-        You are given a contract.
-        You need to classify the contract into one of the following categories:
-        - Affiliate Agreement
-        - Co-Branding
-        - Development
-        - Distributor
-        - Endorsement
-        - Franchise
-        - Hosting
-        - IP
-        - Joint Venture
-        - License Agreement
-        - Maintenance
-        - Manufacturing
-        - Marketing
-        - Non-Compete Non-Solicit
-        - Outsourcing
-        - Promotion
-        - Reseller
-        - Service
-        - Sponsorship
-        - Strategic Alliance
-        - Supply
-        - Transportation
-
-        It's imperative that:
-        1. You only return the category name
-        2. One category needs to be selected out of this list
-        3. The reasoning provided has to be thorough yet concise
-
-        This is the contract's content:
-        {document}
+        return md5 in self._embedded_hashes
+
+    def _discard_contract_points(self, job: ContractJob, uploader: PointUploader) -> None:
+        """
+        Undo a partially committed contract so it is retried next run: remove the
+        points new in this run and give unchanged points their previous metadata
+        back. The points stored before this run are left in place, so a failed
+        update never leaves the contract with fewer chunks than it had.
         """
-        result = self.llm.call(prompt)
-        result_dict = json.loads(result)
+        collection_name, shard_key = self.router.route(_category(job))
+        try:
+            new_ids = [point.id for point in job.points]
+            if new_ids:
+                self.vector_client.delete(
+                    collection_name=collection_name,
+                    points_selector=PointIdsList(points=new_ids, shard_key=shard_key),
+                    wait=True,
+                )
+            self._set_metadata(
+                collection_name, shard_key, job.previous_payloads, uploader.batch_size
+            )
+        except Exception as e:
+            logger.error(f"Error removing partial points of {job.filename}: {str(e)}")
+
+    def remove_missing_contracts(self) -> int:
+        """Delete the points of contracts whose file is gone from the contracts directory."""
+        present = {
+            entry.name for entry in os.scandir(self.contracts_dir) if entry.is_file()
+        }
+        missing = self._embedded_files - present
+        for filename in missing:
+            for collection_name in self.router.collections():
+                self.vector_client.delete(
+                    collection_name=collection_name,
+                    points_selector=Filter(
+                        must=[
+                            FieldCondition(
+                                key="metadata.filename", match=MatchValue(value=filename)
+                            )
+                        ]
+                    ),
+                    wait=True,
+                )
+            logger.info(f"Removed {filename} from collection, the file no longer exists")
+        self._embedded_files -= missing
+        return len(missing)
+
+    def _classify_contract(
+        self, document: str, md5: Optional[str] = None, title: Optional[str] = None
+    ) -> dict:
+        with metrics.span("ingest.classify"):
+            result_dict = self.classifier.classify(document, md5=md5, title=title)
         print(f">>>> Document classified as {result_dict['category']}")
         return result_dict
 
 
+def _category(job: ContractJob) -> Optional[str]:
+    """Category a contract was classified as, which decides its shard."""
+    classification = job.classification
+    return classification.get("category") if isinstance(classification, dict) else None
+
+
 if __name__ == "__main__":
     contracts_service = ContractsService()
     contracts_service.load_and_classify_contracts()
@@ -0,0 +1,87 @@
+import os
+import re
+from dataclasses import dataclass
+from typing import Iterable, List, Optional, Tuple
+
+from src.contract_analysis.classification import CATEGORIES
+
+SHARDING_MODES = ("none", "shard_key", "collection")
+
+# Shard of contracts whose category is not one of CATEGORIES
+OTHER_SHARD = "other"
+
+CATEGORY_FIELD = "metadata.contract_classification.category"
+
+
+def shard_name(category: Optional[str]) -> str:
+    """Shard of a contract category, e.g. "License Agreement" -> "license_agreement"."""
+    if category not in CATEGORIES:
+        return OTHER_SHARD
+    return re.sub(r"[^a-z0-9]+", "_", category.lower()).strip("_")
+
+
+@dataclass(frozen=True)
+class ShardRouter:
+    """
+    Where the points of a contract category live.
+
+    "none" keeps every contract in one collection. "shard_key" uses Qdrant's
+    custom sharding: one collection with a shard key per category, which needs
+    a Qdrant server. "collection" keeps one collection per category, named
+    `<collection>__<shard>`, and works with any Qdrant deployment. With either
+    of the last two, a search scoped to some categories only visits their shards.
+    """
+
+    collection_name: str
+    mode: str = "none"
+
+    def __post_init__(self):
+        if self.mode not in SHARDING_MODES:
+            raise ValueError(
+                f"Unknown sharding mode {self.mode}, expected one of {', '.join(SHARDING_MODES)}"
+            )
+
+    @classmethod
+    def from_env(cls, collection_name: str) -> "ShardRouter":
+        return cls(collection_name, os.getenv("QDRANT_SHARDING", "none"))
+
+    @property
+    def enabled(self) -> bool:
+        return self.mode != "none"
+
+    @staticmethod
+    def shards() -> List[str]:
+        return [shard_name(category) for category in CATEGORIES] + [OTHER_SHARD]
+
+    def shard_collection(self, shard: str) -> str:
+        return f"{self.collection_name}__{shard}"
+
+    def collections(self) -> List[str]:
+        """Every physical collection the contracts are stored in."""
+        if self.mode == "collection":
+            return [self.shard_collection(shard) for shard in self.shards()]
+        return [self.collection_name]
+
+    def route(self, category: Optional[str]) -> Tuple[str, Optional[str]]:
+        """(collection, shard key) the points of a contract category are written to."""
+        shard = shard_name(category)
+        if self.mode == "collection":
+            return self.shard_collection(shard), None
+        if self.mode == "shard_key":
+            return self.collection_name, shard
+        return self.collection_name, None
+
+    def targets(
+        self, categories: Optional[Iterable[str]] = None
+    ) -> List[Tuple[str, Optional[List[str]]]]:
+        """
+        (collection, shard keys) a search has to visit: only the shards of
+        `categories` when given, otherwise all of them. A shard key list of
+        None means every shard of that collection.
+        """
+        if not self.enabled or categories is None:
+            return [(collection, None) for collection in self.collections()]
+        shards = sorted({shard_name(category) for category in categories})
+        if self.mode == "shard_key":
+            return [(self.collection_name, shards)]
+        return [(self.shard_collection(shard), None) for shard in shards]
@@ -0,0 +1,385 @@
+"""
+Compact snapshots of the embedded contracts collection.
+
+    python -m src.contract_analysis.snapshot export PATH [--dtype float16]
+    python -m src.contract_analysis.snapshot import PATH [--local DIR]
+
+A snapshot is a directory a new environment can be loaded from without
+converting, classifying or embedding any contract again:
+
+    manifest.json      embedding model, vector size, checksums and one entry per
+                       contract: filename, md5, title and classification
+    vectors.npy        (points, vector_size) float32 or float16
+    ids.npy            (points, 16) uint8 point UUIDs
+    contract.npy       index of each point's contract in the manifest
+    chunk_index.npy    position of each point's chunk in its contract
+    text_offsets.npy   (points + 1) byte offsets of each chunk in texts.bin
+    texts.bin          the chunk texts, UTF-8, back to back
+
+Every array is a plain .npy file opened memory-mapped, so an import streams the
+vectors from disk into the uploader instead of loading them. Point payloads are
+rebuilt from the columns and the contract entries, since every chunk of a
+contract repeats its md5, filename, title and classification.
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import logging
+import os
+import shutil
+import uuid
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from qdrant_client.models import PointStruct
+
+from src.contract_analysis.metrics import metrics
+from src.contract_analysis.uploader import PointUploader
+
+logger = logging.getLogger(__name__)
+
+SNAPSHOT_FORMAT = 1
+MANIFEST = "manifest.json"
+TEXTS = "texts.bin"
+ARRAYS = ("vectors", "ids", "contract", "chunk_index", "text_offsets")
+VECTOR_DTYPES = ("float32", "float16")
+
+CHECKSUM_BLOCK_SIZE = 1024 * 1024
+
+
+def _checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(CHECKSUM_BLOCK_SIZE), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+@dataclass
+class Snapshot:
+    """A snapshot on disk, with its arrays memory-mapped."""
+
+    path: str
+    manifest: dict
+    vectors: np.ndarray
+    ids: np.ndarray
+    contract: np.ndarray
+    chunk_index: np.ndarray
+    text_offsets: np.ndarray
+    texts: np.ndarray
+
+    @classmethod
+    def open(cls, path: str, verify: bool = True) -> "Snapshot":
+        """
+        Map a snapshot's files. With `verify` every file is checked against the
+        manifest's checksums first, which catches a truncated or corrupted copy.
+        """
+        with open(os.path.join(path, MANIFEST), "r", encoding="utf-8") as file:
+            manifest = json.load(file)
+        if manifest.get("format") != SNAPSHOT_FORMAT:
+            raise ValueError(
+                f"Unsupported snapshot format {manifest.get('format')} in {path}, "
+                f"expected {SNAPSHOT_FORMAT}"
+            )
+        if verify:
+            for name, checksum in manifest["checksums"].items():
+                if _checksum(os.path.join(path, name)) != checksum:
+                    raise ValueError(f"Snapshot file {name} does not match its checksum")
+
+        arrays = {
+            name: np.load(os.path.join(path, f"{name}.npy"), mmap_mode="r")
+            for name in ARRAYS
+        }
+        texts_path = os.path.join(path, TEXTS)
+        # An empty file cannot be memory-mapped
+        texts = (
+            np.memmap(texts_path, dtype=np.uint8, mode="r")
+            if os.path.getsize(texts_path)
+            else np.zeros(0, dtype=np.uint8)
+        )
+        snapshot = cls(path=path, manifest=manifest, texts=texts, **arrays)
+        snapshot._check_shapes()
+        return snapshot
+
+    def __len__(self) -> int:
+        return self.manifest["points"]
+
+    def _check_shapes(self) -> None:
+        points = len(self)
+        expected = {
+            "vectors": (points, self.manifest["vector_size"]),
+            "ids": (points, 16),
+            "contract": (points,),
+            "chunk_index": (points,),
+            "text_offsets": (points + 1,),
+        }
+        for name, shape in expected.items():
+            if getattr(self, name).shape != shape:
+                raise ValueError(
+                    f"Snapshot array {name} has shape {getattr(self, name).shape}, "
+                    f"expected {shape}"
+                )
+        if len(self.texts) != int(self.text_offsets[-1]):
+            raise ValueError("Snapshot texts do not match their offsets")
+
+    def validate(self, embedding_model: str, vector_size: int) -> None:
+        """Fail when the vectors were not produced the way this environment embeds queries."""
+        if self.manifest["embedding_model"] != embedding_model:
+            raise ValueError(
+                f"Snapshot vectors were embedded with {self.manifest['embedding_model']} "
+                f"but EMBEDDING_MODEL is {embedding_model}"
+            )
+        if self.manifest["vector_size"] != vector_size:
+            raise ValueError(
+                f"Snapshot stores {self.manifest['vector_size']}-dim vectors "
+                f"but the collection profile produces {vector_size}"
+            )
+
+    def text(self, i: int) -> str:
+        start, end = int(self.text_offsets[i]), int(self.text_offsets[i + 1])
+        return self.texts[start:end].tobytes().decode("utf-8")
+
+    def payload(self, i: int) -> dict:
+        """The payload ingestion stored for point `i`."""
+        contract = self.manifest["contracts"][int(self.contract[i])]
+        text = self.text(i)
+        return {
+            "text": text,
+            "metadata": {
+                "md5": contract["md5"],
+                "filename": contract["filename"],
+                "contract_classification": contract["classification"],
+                "chunk_index": int(self.chunk_index[i]),
+                "total_chunks": contract["total_chunks"],
+                "chunk_length": len(text),
+                "processed_date": contract["processed_date"],
+                "title": contract["title"],
+            },
+        }
+
+    def points(self, rows: Sequence[int]) -> List[PointStruct]:
+        # Read the rows in one go; sorted rows keep the reads sequential
+        vectors = np.asarray(self.vectors[rows], dtype=np.float32)
+        return [
+            PointStruct(
+                id=str(uuid.UUID(bytes=self.ids[i].tobytes())),
+                vector=vector.tolist(),
+                payload=self.payload(i),
+            )
+            for i, vector in zip(rows, vectors)
+        ]
+
+
+def export_snapshot(
+    collection, path: str, dtype: str = "float32", batch_size: int = 1000
+) -> dict:
+    """
+    Write every point of a ContractsCollection, or of its every shard
+    collection, to a new snapshot directory and return its manifest. The directory is
+    written under a temporary name and renamed when complete.
+    """
+    if dtype not in VECTOR_DTYPES:
+        raise ValueError(f"Unknown vector dtype {dtype}, expected one of {', '.join(VECTOR_DTYPES)}")
+    if os.path.exists(path):
+        raise ValueError(f"Snapshot path {path} already exists")
+
+    client = collection.vector_client
+    collections = [c for c in collection.router.collections() if client.collection_exists(c)]
+    total = sum(client.count(c, exact=True).count for c in collections)
+    size = collection.vector_size
+
+    temporary = f"{path}.tmp"
+    shutil.rmtree(temporary, ignore_errors=True)
+    os.makedirs(temporary)
+
+    vectors = np.lib.format.open_memmap(
+        os.path.join(temporary, "vectors.npy"), mode="w+", dtype=dtype, shape=(total, size)
+    )
+    ids = np.zeros((total, 16), dtype=np.uint8)
+    contract = np.zeros(total, dtype=np.int32)
+    chunk_index = np.zeros(total, dtype=np.int32)
+    text_offsets = np.zeros(total + 1, dtype=np.int64)
+    contracts: List[dict] = []
+    contract_rows: Dict[Tuple[str, str], int] = {}
+
+    n = 0
+    with metrics.span("snapshot.export"), open(os.path.join(temporary, TEXTS), "wb") as texts:
+        for collection_name in collections:
+            offset = None
+            while True:
+                records, offset = client.scroll(
+                    collection_name=collection_name,
+                    limit=batch_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True,
+                )
+                if n + len(records) > total:
+                    raise RuntimeError("The collection changed while it was exported")
+                for record in records:
+                    if not isinstance(record.vector, list):
+                        raise ValueError(
+                            f"Point {record.id} of {collection_name} has named vectors, "
+                            f"which snapshots do not support"
+                        )
+                    metadata = record.payload["metadata"]
+                    key = (metadata["filename"], metadata["md5"])
+                    row = contract_rows.get(key)
+                    if row is None:
+                        row = contract_rows[key] = len(contracts)
+                        contracts.append(
+                            {
+                                "filename": metadata["filename"],
+                                "md5": metadata["md5"],
+                                "title": metadata.get("title"),
+                                "classification": metadata.get("contract_classification"),
+                                "total_chunks": metadata.get("total_chunks"),
+                                "processed_date": metadata.get("processed_date"),
+                                "points": 0,
+                            }
+                        )
+                    entry = contracts[row]
+                    entry["points"] += 1
+                    # Chunks refreshed by a later run carry a later date
+                    entry["processed_date"] = (
+                        max(entry["processed_date"] or "", metadata.get("processed_date") or "")
+                        or None
+                    )
+
+                    vectors[n] = record.vector
+                    ids[n] = np.frombuffer(uuid.UUID(str(record.id)).bytes, dtype=np.uint8)
+                    contract[n] = row
+                    chunk_index[n] = metadata["chunk_index"]
+                    text = record.payload["text"].encode("utf-8")
+                    texts.write(text)
+                    text_offsets[n + 1] = text_offsets[n] + len(text)
+                    n += 1
+                if offset is None:
+                    break
+        if n != total:
+            raise RuntimeError("The collection changed while it was exported")
+
+        vectors.flush()
+        del vectors
+        for name, array in (
+            ("ids", ids),
+            ("contract", contract),
+            ("chunk_index", chunk_index),
+            ("text_offsets", text_offsets),
+        ):
+            np.save(os.path.join(temporary, f"{name}.npy"), array)
+
+    files = [f"{name}.npy" for name in ARRAYS] + [TEXTS]
+    manifest = {
+        "format": SNAPSHOT_FORMAT,
+        "created": datetime.datetime.now().isoformat(),
+        "collection": collection.qdrant_collection_name,
+        "embedding_model": collection.embedding_model,
+        "vector_size": size,
+        "profile": collection.collection_profile.name,
+        "dtype": dtype,
+        "points": total,
+        "contracts": contracts,
+        "checksums": {name: _checksum(os.path.join(temporary, name)) for name in files},
+    }
+    with open(os.path.join(temporary, MANIFEST), "w", encoding="utf-8") as file:
+        json.dump(manifest, file)
+    os.replace(temporary, path)
+
+    metrics.incr("snapshot.points_exported", total)
+    logger.info(
+        f"Exported {total} points of {len(contracts)} contracts to {path} "
+        f"({sum(os.path.getsize(os.path.join(path, name)) for name in files)} bytes)"
+    )
+    return manifest
+
+
+def import_snapshot(collection, path: str, verify: bool = True) -> int:
+    """
+    Bulk-load a snapshot into an empty ContractsCollection and return the number
+    of points uploaded. Collections are created first and points go to the
+    shard their contract's category routes to, so a snapshot can be imported
+    under any QDRANT_SHARDING mode. Contracts loaded this way are skipped by
+    the next ingestion run since their md5 is already in the collection.
+    """
+    snapshot = Snapshot.open(path, verify=verify)
+    snapshot.validate(collection.embedding_model, collection.vector_size)
+
+    client = collection.vector_client
+    collection._create_collection()
+    for collection_name in collection.router.collections():
+        if client.count(collection_name, exact=True).count:
+            raise ValueError(
+                f"Collection {collection_name} is not empty; "
+                f"snapshots are only imported into empty collections"
+            )
+
+    # Contracts grouped by the collection and shard key they are routed to
+    routes: Dict[Tuple[str, Optional[str]], List[int]] = {}
+    for row, entry in enumerate(snapshot.manifest["contracts"]):
+        classification = entry["classification"]
+        category = classification.get("category") if isinstance(classification, dict) else None
+        routes.setdefault(collection.router.route(category), []).append(row)
+
+    uploader = PointUploader.from_env(client, collection.qdrant_collection_name)
+    # Enough points per call to keep every upload worker busy
+    step = uploader.batch_size * uploader.parallel * 4
+    uploaded = 0
+    try:
+        with metrics.span("snapshot.import"):
+            for (collection_name, shard_key), rows in routes.items():
+                indices = np.flatnonzero(np.isin(snapshot.contract, rows))
+                for start in range(0, len(indices), step):
+                    points = snapshot.points(indices[start : start + step])
+                    uploaded += uploader.upload(points, collection_name, shard_key)
+    finally:
+        uploader.close()
+
+    metrics.incr("snapshot.points_imported", uploaded)
+    logger.info(
+        f"Imported {uploaded} points of {len(snapshot.manifest['contracts'])} "
+        f"contracts from {path}"
+    )
+    return uploaded
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export_parser = commands.add_parser("export", help="Write the collection to a snapshot")
+    export_parser.add_argument("path")
+    export_parser.add_argument(
+        "--dtype", choices=VECTOR_DTYPES, default="float32", help="Stored vector precision"
+    )
+    import_parser = commands.add_parser("import", help="Load a snapshot into empty collections")
+    import_parser.add_argument("path")
+    import_parser.add_argument(
+        "--local", metavar="DIR", help="Load into local on-disk Qdrant in DIR instead of QDRANT_URL"
+    )
+    import_parser.add_argument(
+        "--no-verify", action="store_true", help="Skip checking the file checksums"
+    )
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    from src.contract_analysis.services import ContractsCollection
+
+    vector_client = None
+    if args.command == "import" and args.local:
+        from qdrant_client import QdrantClient
+
+        vector_client = QdrantClient(path=args.local)
+    # Snapshots only move points, so no OpenAI client or key is needed
+    collection = ContractsCollection(vector_client=vector_client)
+
+    if args.command == "export":
+        export_snapshot(collection, args.path, dtype=args.dtype)
+    else:
+        import_snapshot(collection, args.path, verify=not args.no_verify)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,26 +1,77 @@
+import importlib.util
 import json
 import os
-from typing import Any, Optional, Type
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import TYPE_CHECKING, Any, Dict, List, Literal, Optional, Tuple, Type, Union
 
+# qdrant-client is only imported once a search runs, which keeps crew startup fast
+QDRANT_AVAILABLE = importlib.util.find_spec("qdrant_client") is not None
 
-try:
-    from qdrant_client import QdrantClient
-    from qdrant_client.http.models import Filter, FieldCondition, MatchValue
-
-    QDRANT_AVAILABLE = True
-except ImportError:
-    QDRANT_AVAILABLE = False
-    QdrantClient = Any  # type placeholder
-    Filter = Any
-    FieldCondition = Any
-    MatchValue = Any
+if TYPE_CHECKING:
+    from qdrant_client.http.models import Filter
 
 from crewai.tools import BaseTool
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
+from src.contract_analysis.cache import TTLCache, shared_embedding_cache, text_hash
+from src.contract_analysis.formatting import compact_results, count_tokens
+from src.contract_analysis.metrics import metrics
+from src.contract_analysis.scheduler import INTERACTIVE, estimate_tokens, shared_scheduler
+from src.contract_analysis.sharding import CATEGORY_FIELD, ShardRouter
 
-class QdrantToolSchema(BaseModel):
-    """Input for QdrantTool."""
+
+# Payload fields with a payload index, see PAYLOAD_INDEXES in services.py
+FILTERABLE_FIELDS = (
+    "metadata.filename",
+    "metadata.contract_classification.category",
+    "metadata.md5",
+    "metadata.chunk_index",
+)
+
+# Seconds a shard collection found empty is skipped before it is counted again
+EMPTY_RECHECK_INTERVAL = 1.0
+
+# Older prompts filter on the classification object itself
+FIELD_ALIASES = {
+    "metadata.contract_classification": "metadata.contract_classification.category",
+}
+
+
+def _field_condition(
+    key: str, value: Optional[Union[str, int]] = None, any_of: Optional[List[Any]] = None
+):
+    from qdrant_client.http.models import FieldCondition, MatchAny, MatchValue
+
+    key = FIELD_ALIASES.get(key, key)
+    if any_of:
+        return FieldCondition(key=key, match=MatchAny(any=list(any_of)))
+    return FieldCondition(key=key, match=MatchValue(value=value))
+
+
+class FilterCondition(BaseModel):
+    """One condition of a combined metadata filter."""
+
+    key: str = Field(
+        ...,
+        description=f"Metadata field to filter on, one of: {', '.join(FILTERABLE_FIELDS)}.",
+    )
+    value: Optional[Union[str, int]] = Field(
+        default=None, description="Exact value the field has to match."
+    )
+    any: Optional[List[Union[str, int]]] = Field(
+        default=None,
+        description="Match any of these values, e.g. two contract filenames.",
+    )
+    occur: Literal["must", "should", "must_not"] = Field(
+        default="must",
+        description="'must' conditions all have to match, at least one 'should' condition has to match, 'must_not' conditions exclude.",
+    )
+
+
+class QuerySpec(BaseModel):
+    """A single query of a batch search, with its own optional filter."""
 
     query: str = Field(
         ...,
@@ -34,25 +85,86 @@ class QdrantToolSchema(BaseModel):
         default=None,
         description="Filter by value. Pass only the value, not the question.",
     )
+    conditions: Optional[List[FilterCondition]] = Field(
+        default=None,
+        description="Additional metadata conditions for this query.",
+    )
+
+
+class QdrantToolSchema(BaseModel):
+    """Input for QdrantTool."""
+
+    query: Optional[str] = Field(
+        default=None,
+        description="The query to search retrieve relevant information from the Qdrant database. Pass only the query, not the question.",
+    )
+    filter_by: Optional[str] = Field(
+        default=None,
+        description="Filter by properties. Pass only the properties, not the question.",
+    )
+    filter_value: Optional[str] = Field(
+        default=None,
+        description="Filter by value. Pass only the value, not the question.",
+    )
+    conditions: Optional[List[FilterCondition]] = Field(
+        default=None,
+        description=(
+            "Combined metadata conditions, e.g. metadata.filename matching any of two "
+            "contracts, so one search covers several named contracts."
+        ),
+    )
+    queries: Optional[List[QuerySpec]] = Field(
+        default=None,
+        description=(
+            "Several queries to run in one search, each with its own optional filter, "
+            "e.g. the same clause in two different contracts. Results are grouped per query."
+        ),
+    )
+    token_budget: Optional[int] = Field(
+        default=None,
+        description=(
+            "Maximum tokens of compact results; the most relevant sentences of each "
+            "hit are kept. Leave empty for the configured default."
+        ),
+    )
 
 
 class QdrantVectorSearchTool(BaseTool):
     """Tool to query and filter results from a Qdrant database.
 
     This tool enables vector similarity search on internal documents stored in Qdrant,
-    with optional filtering capabilities.
+    with optional filtering capabilities. Several queries can be passed at once; they
+    are embedded in one request and searched with a single batch query.
+
+    When the contracts are sharded by category, a search filtered to categories
+    or to named contracts only visits their shards; any other search fans out
+    to every shard in parallel and the hits are merged by score.
 
     Attributes:
-        client: Configured QdrantClient instance
+        client: Optional QdrantClient to use; one is created on first search otherwise
         collection_name: Name of the Qdrant collection to search
+        collection_profile: Vector storage profile the collection was created with
         limit: Maximum number of results to return
         score_threshold: Minimum similarity score threshold
         qdrant_url: Qdrant server URL
         qdrant_api_key: Authentication key for Qdrant
+        cache_ttl: Seconds query vectors and search results stay cached
+        cache_size: Maximum number of cached query vectors and search results
+        collection_check_interval: Seconds between checks for collection changes
+        index_version_path: Index version marker the indexer rewrites after every
+            run; a new marker invalidates cached results at once
+        output_mode: "full" returns every hit with its whole chunk and metadata,
+            "compact" fits the results into `token_budget` tokens
+        token_budget: Default token budget of compact results
+        sharding: How the contracts are sharded by category, see ShardRouter
+
+    Agents running in parallel share one tool instance: a search that is already
+    in flight is awaited instead of repeated, and between `begin_kickoff` and
+    `end_kickoff` every result is kept for the rest of the kickoff.
     """
 
     model_config = {"arbitrary_types_allowed": True}
-    client: QdrantClient = None
+    client: Any = None
     name: str = "QdrantVectorSearchTool"
     description: str = "A tool to search the Qdrant database for relevant information on internal documents."
     args_schema: Type[BaseModel] = QdrantToolSchema
@@ -74,15 +186,46 @@ class QdrantVectorSearchTool(BaseTool):
         default=None,
         description="A custom embedding function to use for vectorization. If not provided, the default model will be used.",
     )
+    collection_profile: Optional[str] = Field(
+        default=None,
+        description="Collection profile the collection was created with. Defaults to QDRANT_COLLECTION_PROFILE.",
+    )
+    cache_ttl: float = Field(default=300.0)
+    cache_size: int = Field(default=256)
+    collection_check_interval: float = Field(default=30.0)
+    index_version_path: str = Field(
+        default_factory=lambda: os.getenv("INDEX_VERSION_PATH", ".cache/index_version.json")
+    )
+    output_mode: Literal["full", "compact"] = Field(
+        default_factory=lambda: os.getenv("SEARCH_OUTPUT_MODE", "full")
+    )
+    token_budget: int = Field(
+        default_factory=lambda: int(os.getenv("SEARCH_TOKEN_BUDGET", "1500"))
+    )
+    sharding: Literal["none", "shard_key", "collection"] = Field(
+        default_factory=lambda: os.getenv("QDRANT_SHARDING", "none")
+    )
+
+    _openai_client: Any = PrivateAttr(default=None)
+    _client_lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _vector_cache: TTLCache = PrivateAttr(default=None)
+    _result_cache: TTLCache = PrivateAttr(default=None)
+    _collection_fingerprint: Any = PrivateAttr(default=None)
+    _collection_checked_at: float = PrivateAttr(default=0.0)
+    _index_marker: Any = PrivateAttr(default=None)
+    _inflight: Dict[Any, Future] = PrivateAttr(default_factory=dict)
+    _inflight_lock: Any = PrivateAttr(default_factory=threading.Lock)
+    _kickoff_results: Optional[Dict[Any, List[dict]]] = PrivateAttr(default=None)
+    _kickoffs: int = PrivateAttr(default=0)
+    _contract_categories: Dict[str, str] = PrivateAttr(default_factory=dict)
+    _empty_collections: Dict[str, float] = PrivateAttr(default_factory=dict)
+    _fanout: Any = PrivateAttr(default=None)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
-        if QDRANT_AVAILABLE:
-            self.client = QdrantClient(
-                url=self.qdrant_url,
-                api_key=self.qdrant_api_key,
-            )
-        else:
+        self._vector_cache = TTLCache(maxsize=self.cache_size, ttl=self.cache_ttl)
+        self._result_cache = TTLCache(maxsize=self.cache_size, ttl=self.cache_ttl)
+        if not QDRANT_AVAILABLE:
             import click
 
             if click.confirm(
@@ -100,9 +243,12 @@ class QdrantVectorSearchTool(BaseTool):
 
     def _run(
         self,
-        query: str,
+        query: Optional[str] = None,
         filter_by: Optional[str] = None,
         filter_value: Optional[str] = None,
+        queries: Optional[List[Any]] = None,
+        conditions: Optional[List[Any]] = None,
+        token_budget: Optional[int] = None,
     ) -> str:
         """Execute vector similarity search on Qdrant.
 
@@ -110,53 +256,517 @@ class QdrantVectorSearchTool(BaseTool):
             query: Search query to vectorize and match
             filter_by: Optional metadata field to filter on
             filter_value: Optional value to filter by
+            queries: Optional list of queries, each with its own optional filter
+            conditions: Optional must/should/must_not conditions combined with the filter
+            token_budget: Optional token budget overriding the default of compact output
 
         Returns:
-            JSON string containing search results with metadata and scores
+            JSON string containing search results with metadata and scores. With
+            `queries`, a list of {"query", "results"} objects, one per query. In
+            compact mode an object with the trimmed "results" (or "queries") and
+            the "tokens" used and saved.
 
         Raises:
             ImportError: If qdrant-client is not installed
-            ValueError: If Qdrant credentials are missing
+            ValueError: If Qdrant credentials are missing or no query is given
         """
 
         if not self.qdrant_url:
             raise ValueError("QDRANT_URL is not set")
 
-        # Create filter if filter parameters are provided
-        search_filter = None
-        if filter_by and filter_value:
-            search_filter = Filter(
-                must=[
-                    FieldCondition(key=filter_by, match=MatchValue(value=filter_value))
+        if queries:
+            specs = [
+                spec if isinstance(spec, QuerySpec) else QuerySpec(**spec)
+                for spec in queries
+            ]
+            results = self._search(
+                [
+                    (
+                        spec.query,
+                        self._build_filter(
+                            spec.filter_by, spec.filter_value, spec.conditions
+                        ),
+                    )
+                    for spec in specs
                 ]
             )
+            grouped = [
+                {"query": spec.query, "results": spec_results}
+                for spec, spec_results in zip(specs, results)
+            ]
+            full = json.dumps(grouped, indent=2)
+            if self.output_mode != "compact":
+                return full
+            return self._compact(grouped, full, token_budget or self.token_budget, grouped=True)
 
-        # Search in Qdrant using the built-in query method
-        query_vector = (
-            self._vectorize_query(query)
-            if not self.custom_embedding_fn
-            else self.custom_embedding_fn(query)
+        if not query:
+            raise ValueError("Either query or queries is required")
+        search_filter = self._build_filter(filter_by, filter_value, conditions)
+        results = self._search([(query, search_filter)])[0]
+        full = json.dumps(results, indent=2)
+        if self.output_mode != "compact":
+            return full
+        return self._compact(
+            [{"query": query, "results": results}], full, token_budget or self.token_budget
         )
-        search_results = self.client.query_points(
-            collection_name=self.collection_name,
-            query=query_vector,
-            query_filter=search_filter,
-            limit=self.limit,
-            score_threshold=self.score_threshold,
+
+    @staticmethod
+    def _compact(
+        groups: List[dict], full: str, token_budget: int, grouped: bool = False
+    ) -> str:
+        """
+        Fit the results of each query into an equal share of the token budget
+        left after the response envelope, so the whole response stays within it.
+        """
+        full_tokens = count_tokens(full)
+
+        def render(compact_groups: List[dict], omitted: dict, used: int) -> str:
+            output = (
+                {"queries": compact_groups}
+                if grouped
+                else {"results": compact_groups[0]["results"]}
+            )
+            if any(omitted.values()):
+                output["omitted"] = omitted
+            output["tokens"] = {
+                "budget": token_budget,
+                "used": used,
+                "full": full_tokens,
+                "saved": max(full_tokens - used, 0),
+            }
+            return json.dumps(output, ensure_ascii=False, separators=(",", ":"))
+
+        # The envelope with every hit left out, and counts as wide as they can get
+        widest = max(token_budget, full_tokens, 1)
+        envelope = count_tokens(
+            render(
+                [{"query": group["query"], "results": []} for group in groups],
+                {"duplicates": widest, "over_budget": widest},
+                widest,
+            )
         )
+        share = max(token_budget - envelope, 0) // len(groups)
+
+        compact_groups = []
+        duplicates = dropped = 0
+        for group in groups:
+            compact, counts = compact_results(group["query"], group["results"], share)
+            compact_groups.append({"query": group["query"], "results": compact})
+            duplicates += counts["duplicates"]
+            dropped += counts["dropped"]
 
-        # Format results similar to storage implementation
+        def response() -> Tuple[str, int]:
+            omitted = {"duplicates": duplicates, "over_budget": dropped}
+            used, text = 0, ""
+            # The reported count is part of what it counts; repeat until it settles
+            for _ in range(3):
+                text = render(compact_groups, omitted, used)
+                counted = count_tokens(text)
+                if counted == used:
+                    break
+                used = counted
+            return text, count_tokens(text)
+
+        text, used = response()
+        # Token counts of the parts do not add up exactly; drop the lowest-ranked
+        # hits until the response itself is within the budget
+        while used > token_budget and any(group["results"] for group in compact_groups):
+            max(compact_groups, key=lambda group: len(group["results"]))["results"].pop()
+            dropped += 1
+            text, used = response()
+
+        metrics.incr("search.compact_tokens", used)
+        metrics.incr("search.compact_tokens_saved", max(full_tokens - used, 0))
+        return text
+
+    def _search(self, searches: List[Tuple[str, Optional["Filter"]]]) -> List[List[dict]]:
+        """
+        Run (query, filter) searches and return the formatted results of each.
+        Cached searches are answered from memory; the rest are embedded together
+        and sent to Qdrant as one batch query.
+        """
+        search_started = time.perf_counter()
+        # Identical searches against an unchanged collection are answered from cache
+        self._check_collection_changed()
+
+        results: List[Optional[List[dict]]] = [None] * len(searches)
+        pending = []
+        for i, (query, search_filter) in enumerate(searches):
+            # Queries differing only in whitespace share cache entries
+            query = " ".join(query.split())
+            cache_key = (
+                self.collection_name,
+                query,
+                search_filter.model_dump_json(exclude_none=True) if search_filter else None,
+                self.limit,
+                self.score_threshold,
+            )
+            memo = self._kickoff_results
+            cached = memo.get(cache_key) if memo is not None else None
+            if cached is None:
+                cached = self._result_cache.get(cache_key)
+            if cached is not None:
+                results[i] = cached
+            else:
+                pending.append((i, query, search_filter, cache_key))
+
+        metrics.incr("search.queries", len(searches))
+        metrics.incr("search.result_cache_hits", len(searches) - len(pending))
+
+        # Searches another thread is already running, e.g. for a parallel task, are awaited
+        owned, waiting = [], []
+        with self._inflight_lock:
+            for item in pending:
+                future = self._inflight.get(item[3])
+                if future is None:
+                    self._inflight[item[3]] = Future()
+                    owned.append(item)
+                else:
+                    waiting.append((item[0], future))
+        metrics.incr("search.inflight_shared", len(waiting))
+
+        try:
+            if owned:
+                for (i, _, _, cache_key), found in zip(owned, self._query(owned)):
+                    results[i] = found
+                    self._inflight[cache_key].set_result(found)
+        except BaseException as e:
+            for _, _, _, cache_key in owned:
+                if not self._inflight[cache_key].done():
+                    self._inflight[cache_key].set_exception(e)
+            raise
+        finally:
+            with self._inflight_lock:
+                for _, _, _, cache_key in owned:
+                    self._inflight.pop(cache_key, None)
+
+        for i, future in waiting:
+            results[i] = future.result()
+        metrics.observe("search.total", time.perf_counter() - search_started)
+        return results
+
+    def _query(self, pending: List[tuple]) -> List[List[dict]]:
+        """Embed (index, query, filter, cache key) searches together and run them as one batch."""
+        started = time.perf_counter()
+
+        from qdrant_client.http.models import QueryRequest
+
+        from src.contract_analysis.profiles import get_profile
+
+        # Search in Qdrant using the built-in query method
+        profile = get_profile(self.collection_profile)
+        query_texts = [query for _, query, _, _ in pending]
+        with metrics.span("search.embed"):
+            query_vectors = (
+                self._vectorize_queries(query_texts)
+                if not self.custom_embedding_fn
+                else [self.custom_embedding_fn(query) for query in query_texts]
+            )
+        # Each search goes to the shards its filter allows, grouped per collection
+        router = self.router
+        per_collection: Dict[str, List[Tuple[int, QueryRequest]]] = {}
+        for n, (vector, (_, _, search_filter, _)) in enumerate(zip(query_vectors, pending)):
+            for collection_name, shard_keys in router.targets(self._scope(search_filter)):
+                if collection_name in self._empty_collections:
+                    continue
+                per_collection.setdefault(collection_name, []).append(
+                    (
+                        n,
+                        QueryRequest(
+                            query=vector,
+                            filter=search_filter,
+                            params=profile.search_params(),
+                            limit=self.limit,
+                            score_threshold=self.score_threshold,
+                            with_payload=True,
+                            shard_key=shard_keys,
+                        ),
+                    )
+                )
+        metrics.incr("search.shard_requests", sum(len(b) for b in per_collection.values()))
+
+        def run(collection_name: str):
+            return self.qdrant_client.query_batch_points(
+                collection_name=collection_name,
+                requests=[request for _, request in per_collection[collection_name]],
+            )
+
+        with metrics.span("search.qdrant"):
+            if len(per_collection) <= 1:
+                responses = {name: run(name) for name in per_collection}
+            else:
+                responses = dict(zip(per_collection, self.fanout_executor.map(run, per_collection)))
+
+        # Merge every search's hits from all of its shards by score
+        hits: List[list] = [[] for _ in pending]
+        for collection_name, batch in per_collection.items():
+            for (n, _), response in zip(batch, responses[collection_name]):
+                hits[n].extend(response.points)
+
+        cost = (time.perf_counter() - started) / len(pending)
+        memo = self._kickoff_results
         results = []
-        # Extract the list of ScoredPoint objects from the tuple
-        for point in search_results:
+        for (_, _, _, cache_key), points in zip(pending, hits):
+            points.sort(key=lambda point: point.score, reverse=True)
+            found = self._format_points(points[: self.limit])
+            self._result_cache.put(cache_key, found, cost)
+            if memo is not None:
+                memo[cache_key] = found
+            results.append(found)
+        return results
+
+    @property
+    def router(self) -> ShardRouter:
+        return ShardRouter(self.collection_name, self.sharding)
+
+    @property
+    def fanout_executor(self) -> ThreadPoolExecutor:
+        """Threads querying several shard collections at once."""
+        if self._fanout is None:
+            with self._client_lock:
+                if self._fanout is None:
+                    self._fanout = ThreadPoolExecutor(
+                        max_workers=min(len(self.router.collections()), 8),
+                        thread_name_prefix="qdrant-fanout",
+                    )
+        return self._fanout
+
+    def _scope(self, search_filter: Optional["Filter"]) -> Optional[List[str]]:
+        """
+        Categories a filter limits a search to, from `must` conditions on the
+        category or on contract filenames. None when it may match any category.
+        """
+        if search_filter is None or not self.router.enabled:
+            return None
+        categories: Optional[set] = None
+        filenames: Optional[set] = None
+        for condition in search_filter.must or []:
+            match = getattr(condition, "match", None)
+            values = getattr(match, "any", None) or [getattr(match, "value", None)]
+            values = {value for value in values if value is not None}
+            if not values:
+                continue
+            if condition.key == CATEGORY_FIELD:
+                categories = values if categories is None else categories & values
+            elif condition.key == "metadata.filename":
+                filenames = values if filenames is None else filenames & values
+        if filenames is not None:
+            found = self._categories_of(filenames)
+            if found is not None:
+                categories = found if categories is None else categories & found
+        return sorted(categories) if categories is not None else None
+
+    def _categories_of(self, filenames: set) -> Optional[set]:
+        """Categories of named contracts, looked up once; None if one is not stored."""
+        from qdrant_client.http.models import Filter
+
+        missing = [name for name in filenames if name not in self._contract_categories]
+        for filename in missing:
+            contract = _field_condition("metadata.filename", value=filename)
+            for collection_name in self.router.collections():
+                records, _ = self.qdrant_client.scroll(
+                    collection_name=collection_name,
+                    scroll_filter=Filter(must=[contract]),
+                    limit=1,
+                    with_payload=[CATEGORY_FIELD],
+                    with_vectors=False,
+                )
+                if records:
+                    classification = (records[0].payload or {}).get("metadata", {}).get(
+                        "contract_classification", {}
+                    )
+                    self._contract_categories[filename] = classification.get("category")
+                    break
+            else:
+                return None
+        return {self._contract_categories[name] for name in filenames}
+
+    @staticmethod
+    def _build_filter(
+        filter_by: Optional[str] = None,
+        filter_value: Optional[str] = None,
+        conditions: Optional[List[Any]] = None,
+    ):
+        """
+        Create filter if filter parameters are provided. The single
+        filter_by/filter_value pair and every `must` condition have to match, at
+        least one `should` condition has to match and no `must_not` condition may.
+        """
+        clauses: Dict[str, list] = {"must": [], "should": [], "must_not": []}
+        if filter_by and filter_value:
+            clauses["must"].append(_field_condition(filter_by, value=filter_value))
+        for condition in conditions or []:
+            if not isinstance(condition, FilterCondition):
+                condition = FilterCondition(**condition)
+            clauses[condition.occur].append(
+                _field_condition(condition.key, condition.value, condition.any)
+            )
+
+        if not any(clauses.values()):
+            return None
+        from qdrant_client.http.models import Filter
+
+        return Filter(**{occur: found for occur, found in clauses.items() if found})
+
+    @staticmethod
+    def _format_points(points) -> List[dict]:
+        """Format results similar to storage implementation."""
+        results = []
+        for point in points:
             result = {
-                "metadata": point[1][0].payload.get("metadata", {}),
-                "context": point[1][0].payload.get("text", ""),
-                "distance": point[1][0].score,
+                "metadata": point.payload.get("metadata", {}),
+                "context": point.payload.get("text", ""),
+                "distance": point.score,
             }
             results.append(result)
+        return results
+
+    def cache_stats(self) -> Dict[str, Dict[str, float]]:
+        """Hit rates and latency saved by the query vector and search result caches."""
+        return {
+            "query_vectors": self._vector_cache.stats(),
+            "search_results": self._result_cache.stats(),
+        }
+
+    def clear_cache(self) -> None:
+        """Drop cached search results, e.g. after the collection was re-indexed."""
+        self._result_cache.clear()
+        self._contract_categories.clear()
+        if self._kickoff_results is not None:
+            self._kickoff_results.clear()
+
+    def begin_kickoff(self) -> bool:
+        """
+        Keep every search result until the matching `end_kickoff`, for all agents.
+        Returns whether this is the only kickoff running.
+        """
+        with self._inflight_lock:
+            self._kickoffs += 1
+            if self._kickoff_results is None:
+                self._kickoff_results = {}
+            return self._kickoffs == 1
+
+    def end_kickoff(self) -> bool:
+        """
+        Drop the kickoff's results once no kickoff is running anymore. Returns
+        whether the last running kickoff ended.
+        """
+        with self._inflight_lock:
+            self._kickoffs = max(self._kickoffs - 1, 0)
+            if not self._kickoffs:
+                self._kickoff_results = None
+            return not self._kickoffs
+
+    def _recheck_empty_collections(self, now: float) -> None:
+        """
+        Count the shard collections found empty more than EMPTY_RECHECK_INTERVAL
+        ago again, so contracts written without an index run (a snapshot import,
+        another process) show up without waiting for the next collection check.
+        Cached results are dropped when one of them has points now.
+        """
+        stale = [
+            name
+            for name, found_at in self._empty_collections.items()
+            if now - found_at >= EMPTY_RECHECK_INTERVAL
+        ]
+        if not stale:
+            return
+        # Replaced rather than mutated, since searches read it from several threads
+        empties = dict(self._empty_collections)
+        filled = False
+        for collection_name in stale:
+            try:
+                empty = not self.qdrant_client.count(collection_name, exact=False).count
+            except Exception:
+                # Searching a shard that may be empty is only slower
+                empty = False
+            if empty:
+                empties[collection_name] = now
+            else:
+                empties.pop(collection_name, None)
+                filled = True
+        self._empty_collections = empties
+        if filled:
+            self.clear_cache()
+
+    def _index_marker_state(self) -> Optional[Tuple[int, int, int]]:
+        """Identity of the index version marker file, which is replaced on every write."""
+        try:
+            stat = os.stat(self.index_version_path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def _check_collection_changed(self) -> None:
+        """
+        Invalidate cached results when the collection's contents have changed:
+        right away when the indexer recorded a run, and otherwise when the point
+        or segment counts differ at the next periodic check.
+        """
+        now = time.monotonic()
+        # One stat per search; re-indexed contracts can leave both counts unchanged
+        marker = self._index_marker_state()
+        marker_changed = marker != self._index_marker
+        checked_recently = now - self._collection_checked_at < self.collection_check_interval
+        if not marker_changed and checked_recently:
+            self._recheck_empty_collections(now)
+            return
+        self._collection_checked_at = now
+        try:
+            infos = [
+                self.qdrant_client.get_collection(collection_name)
+                for collection_name in self.router.collections()
+            ]
+        except Exception:
+            # Without collection info cached results only expire through their TTL
+            # or the next index run
+            if marker_changed:
+                self._index_marker = marker
+                self.clear_cache()
+            return
+        self._index_marker = marker
+        fingerprint = (marker,) + tuple(
+            (info.points_count, info.segments_count) for info in infos
+        )
+        # Shard collections without points are left out of searches until they are
+        # rechecked; an index run rewrites the marker, which refreshes them right away
+        if self.router.mode == "collection":
+            self._empty_collections = {
+                name: now
+                for name, info in zip(self.router.collections(), infos)
+                if not info.points_count
+            }
+        if fingerprint != self._collection_fingerprint:
+            if self._collection_fingerprint is not None:
+                self.clear_cache()
+            self._collection_fingerprint = fingerprint
+
+    @property
+    def qdrant_client(self):
+        """The Qdrant client, created on first use unless one was passed in."""
+        if self.client is None:
+            with self._client_lock:
+                if self.client is None:
+                    from qdrant_client import QdrantClient
+
+                    self.client = QdrantClient(
+                        url=self.qdrant_url, api_key=self.qdrant_api_key
+                    )
+        return self.client
 
-        return json.dumps(results, indent=2)
+    @property
+    def openai_client(self):
+        """OpenAI client shared by every query, reusing its pooled HTTP connections."""
+        if self._openai_client is None:
+            with self._client_lock:
+                if self._openai_client is None:
+                    import openai
+
+                    # Retries go through the shared request scheduler
+                    self._openai_client = openai.Client(
+                        api_key=os.getenv("OPENAI_API_KEY"), max_retries=0
+                    )
+        return self._openai_client
 
     def _vectorize_query(self, query: str) -> list[float]:
         """Default vectorization function with openai.
@@ -167,15 +777,56 @@ class QdrantVectorSearchTool(BaseTool):
         Returns:
             list[float]: The vectorized query
         """
-        import openai
+        return self._vectorize_queries([query])[0]
+
+    def _vectorize_queries(self, queries: List[str]) -> List[list[float]]:
+        """Vectorize several queries, sending every uncached one in a single request."""
+        from src.contract_analysis.profiles import get_profile
+
+        model = os.getenv("EMBEDDING_MODEL", "text-embedding-3-small")
+        dimensions = get_profile(self.collection_profile).dimensions
+        started = time.perf_counter()
+        embeddings: List[Optional[list[float]]] = [
+            self._vector_cache.get((model, dimensions, query)) for query in queries
+        ]
+
+        missing = [i for i, embedding in enumerate(embeddings) if embedding is None]
+        not_in_memory = list(missing)
+        metrics.incr("search.vector_cache_hits", len(queries) - len(missing))
+        cache = shared_embedding_cache()
+        if missing and cache is not None:
+            digests = {i: text_hash(queries[i]) for i in missing}
+            cached = cache.get_many(model, dimensions or 0, digests.values())
+            for i in missing:
+                embeddings[i] = cached.get(digests[i])
+            missing = [i for i in missing if embeddings[i] is None]
 
-        client = openai.Client(api_key=os.getenv("OPENAI_API_KEY"))
-        embedding = (
-            client.embeddings.create(
-                input=[query],
-                model="text-embedding-3-small",
+        if missing:
+            kwargs = {"dimensions": dimensions} if dimensions else {}
+            metrics.incr("search.embedding_requests")
+            metrics.incr("search.embedding_inputs", len(missing))
+            inputs = [queries[i] for i in missing]
+            # Searches go ahead of bulk ingestion requests waiting on the same quota
+            response = shared_scheduler(model).call(
+                lambda: self.openai_client.embeddings.create(
+                    input=inputs, model=model, **kwargs
+                ),
+                tokens=sum(estimate_tokens(text) for text in inputs),
+                priority=INTERACTIVE,
             )
-            .data[0]
-            .embedding
-        )
-        return embedding
+            for data in response.data:
+                embeddings[missing[data.index]] = data.embedding
+            if cache is not None:
+                cache.put_many(
+                    model,
+                    dimensions or 0,
+                    [(text_hash(queries[i]), embeddings[i]) for i in missing],
+                )
+
+        if not_in_memory:
+            cost = (time.perf_counter() - started) / len(not_in_memory)
+            for i in not_in_memory:
+                self._vector_cache.put(
+                    (model, dimensions, queries[i]), embeddings[i], cost
+                )
+        return embeddings
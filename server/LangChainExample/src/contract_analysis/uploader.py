@@ -0,0 +1,101 @@
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List, Optional
+
+from src.contract_analysis.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class PointUploader:
+    """
+    Streams points to a Qdrant collection in fixed-size batches.
+
+    Batches are uploaded by a small thread pool. The number of batches in flight
+    is bounded, so callers block (backpressure) instead of piling up vectors in
+    memory when Qdrant is slower than ingestion. `upload` returns once all of the
+    caller's batches are acknowledged, which makes it a per-file commit point.
+    """
+
+    def __init__(
+        self,
+        client,
+        collection_name: str,
+        batch_size: int = 256,
+        parallel: int = 2,
+        max_pending: Optional[int] = None,
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = max(batch_size, 1)
+        self.parallel = max(parallel, 1)
+        self.uploaded = 0
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.parallel, thread_name_prefix="qdrant-upload"
+        )
+        self._pending = threading.BoundedSemaphore(max_pending or self.parallel * 2)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, client, collection_name: str) -> "PointUploader":
+        return cls(
+            client,
+            collection_name,
+            batch_size=int(os.getenv("QDRANT_UPSERT_BATCH_SIZE", "256")),
+            parallel=int(os.getenv("QDRANT_UPSERT_PARALLEL", "2")),
+        )
+
+    def upload(
+        self,
+        points: List,
+        collection_name: Optional[str] = None,
+        shard_key: Optional[str] = None,
+    ) -> int:
+        """
+        Upsert points in batches and wait until all of them are stored. The
+        collection and shard key default to the uploader's collection without one.
+        """
+        collection_name = collection_name or self.collection_name
+        futures: List[Future] = []
+        for start in range(0, len(points), self.batch_size):
+            batch = points[start : start + self.batch_size]
+            self._pending.acquire()
+            try:
+                future = self._executor.submit(
+                    self._upsert, batch, collection_name, shard_key
+                )
+            except Exception:
+                self._pending.release()
+                raise
+            future.add_done_callback(lambda _: self._pending.release())
+            futures.append(future)
+
+        # Surface the first failure only after every batch has settled
+        errors = [future.exception() for future in futures]
+        for error in errors:
+            if error is not None:
+                raise error
+        return len(points)
+
+    def _upsert(
+        self, batch: List, collection_name: str, shard_key: Optional[str] = None
+    ) -> None:
+        kwargs = {"shard_key_selector": shard_key} if shard_key else {}
+        with metrics.span("qdrant.upsert"):
+            self.client.upsert(
+                collection_name=collection_name, points=batch, wait=True, **kwargs
+            )
+        with self._lock:
+            self.uploaded += len(batch)
+        if metrics.enabled:
+            metrics.incr("qdrant.points_upserted", len(batch))
+            # float32 vector payload, which dominates the request size
+            metrics.incr(
+                "qdrant.vector_bytes_upserted",
+                sum(len(point.vector) * 4 for point in batch),
+            )
+
+    def close(self) -> None:
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,45 @@
+import pytest
+
+from src.contract_analysis.benchmarks.chunking import CLAUSES
+from src.contract_analysis.benchmarks.fakes import FakeOpenAIClient
+from src.contract_analysis.chunking import SemanticChunker
+from src.contract_analysis.embeddings import EmbeddingBatcher
+
+
+def make_chunker(buffer_size: int, block_sentences: int = 8) -> SemanticChunker:
+    embedder = EmbeddingBatcher(FakeOpenAIClient(64), "text-embedding-3-small", dimensions=64)
+    return SemanticChunker(embedder, buffer_size=buffer_size, block_sentences=block_sentences)
+
+
+def contract_text(sentences: int) -> str:
+    return " ".join(f"{CLAUSES[i % len(CLAUSES)]} Item {i}." for i in range(sentences))
+
+
+@pytest.mark.parametrize("buffer_size", [0, 1, 3])
+@pytest.mark.parametrize("sentences", [1, 7, 8, 9, 41])
+def test_iter_chunks_gives_back_every_sentence(buffer_size, sentences):
+    text = contract_text(sentences)
+    chunks = list(make_chunker(buffer_size).iter_chunks(text))
+
+    assert " ".join(chunks) == " ".join(SemanticChunker.split_sentences(text))
+
+
+@pytest.mark.parametrize("buffer_size", [0, 1, 3])
+def test_iter_chunks_matches_chunk_within_one_block(buffer_size):
+    text = contract_text(20)
+    chunker = make_chunker(buffer_size, block_sentences=512)
+
+    assert list(chunker.iter_chunks(text)) == chunker.chunk(text)
+
+
+def test_iter_chunks_embeds_the_same_windows_as_chunk():
+    text = contract_text(41)
+    windows = SemanticChunker.combine_sentences(SemanticChunker.split_sentences(text), 3)
+    chunker = make_chunker(3)
+    embedded = []
+    embed_windows = chunker.embed_windows
+    chunker.embed_windows = lambda block: embedded.extend(block) or embed_windows(block)
+
+    list(chunker.iter_chunks(text))
+
+    assert embedded == windows
@@ -0,0 +1,67 @@
+import pytest
+
+from src.contract_analysis.benchmarks.chunking import CLAUSES
+from src.contract_analysis.formatting import compact_results, entry_tokens
+from src.contract_analysis.scheduler import estimate_tokens
+
+
+def search_hits(count: int, sentences: int = 12) -> list:
+    """Hits in score order, each from its own contract."""
+    return [
+        {
+            "context": " ".join(
+                f"{CLAUSES[(hit + i) % len(CLAUSES)]} Clause {hit}.{i}."
+                for i in range(sentences)
+            ),
+            "metadata": {
+                "filename": f"contract-{hit}.pdf",
+                "contract_classification": {"category": "License Agreement"},
+                "chunk_index": hit,
+                "total_chunks": count,
+            },
+            "distance": 0.9 - hit * 0.01,
+        }
+        for hit in range(count)
+    ]
+
+
+@pytest.mark.parametrize("budget", [60, 100, 200, 500, 1000, 3000])
+def test_compact_results_stay_within_budget(budget):
+    compact, _ = compact_results(
+        "license termination", search_hits(8), budget, count=estimate_tokens
+    )
+
+    assert sum(entry_tokens(entry, estimate_tokens) for entry in compact) <= budget
+
+
+def test_tight_budget_keeps_the_best_hits_first():
+    hits = search_hits(8)
+
+    compact, dropped = compact_results("license termination", hits, 200, count=estimate_tokens)
+
+    assert compact
+    assert [entry["file"] for entry in compact] == [
+        hit["metadata"]["filename"] for hit in hits[: len(compact)]
+    ]
+    assert dropped["dropped"] == len(hits) - len(compact)
+
+
+def test_large_budget_keeps_every_hit_whole():
+    hits = search_hits(3)
+
+    compact, dropped = compact_results("license", hits, 100_000, count=estimate_tokens)
+
+    assert [entry["text"] for entry in compact] == [hit["context"] for hit in hits]
+    assert dropped == {"duplicates": 0, "dropped": 0}
+
+
+def test_repeated_chunks_are_dropped_as_duplicates():
+    hits = search_hits(2)
+    repeat = dict(hits[0], distance=0.5)
+
+    compact, dropped = compact_results(
+        "license", hits + [repeat], 100_000, count=estimate_tokens
+    )
+
+    assert len(compact) == 2
+    assert dropped["duplicates"] == 1
@@ -0,0 +1,100 @@
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from src.contract_analysis.scheduler import RequestScheduler
+
+
+class APIError(Exception):
+    """Stands in for an OpenAI error carrying an HTTP status and response headers."""
+
+    def __init__(self, status_code: int, headers: dict = None):
+        super().__init__(f"Error code: {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+def failing(errors: list, result="ok"):
+    """A call that raises the given errors in turn and then returns `result`."""
+    calls = []
+
+    def call():
+        calls.append(time.monotonic())
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return call, calls
+
+
+def make_scheduler(**kwargs) -> RequestScheduler:
+    options = dict(max_concurrency=8, max_retries=3, base_delay=0.01, max_delay=0.05)
+    options.update(kwargs)
+    return RequestScheduler("test", **options)
+
+
+def test_rate_limited_call_is_retried_after_the_servers_delay():
+    scheduler = make_scheduler()
+    call, calls = failing([APIError(429, {"retry-after-ms": "200"})])
+
+    assert scheduler.call(call) == "ok"
+    assert len(calls) == 2
+    assert calls[1] - calls[0] >= 0.2
+    assert scheduler.stats == {"calls": 2, "retries": 1, "rate_limited": 1}
+
+
+def test_rate_limit_halves_concurrency_once_per_burst():
+    scheduler = make_scheduler()
+    # Three requests in flight together all come back rate limited
+    for _ in range(3):
+        scheduler._acquire(0, priority=1)
+    for _ in range(3):
+        scheduler._release(0, error=APIError(429, {"retry-after-ms": "50"}))
+
+    assert scheduler.limit == 4
+    assert scheduler.stats["rate_limited"] == 3
+
+
+def test_concurrency_grows_back_after_successes():
+    scheduler = make_scheduler()
+    scheduler._acquire(0, priority=1)
+    scheduler._release(0, error=APIError(429))
+    assert scheduler.limit == 4
+
+    for _ in range(4):
+        scheduler.call(lambda: "ok")
+
+    assert scheduler.limit == 5
+
+
+def test_exhausted_retries_raise_the_last_error():
+    scheduler = make_scheduler(max_retries=2)
+    call, calls = failing([APIError(429) for _ in range(3)])
+
+    with pytest.raises(APIError):
+        scheduler.call(call)
+    assert len(calls) == 3
+    assert scheduler.stats["retries"] == 2
+
+
+@pytest.mark.parametrize("status", [400, 401, 413])
+def test_non_retryable_errors_are_raised_at_once(status):
+    scheduler = make_scheduler()
+    call, calls = failing([APIError(status)])
+
+    with pytest.raises(APIError):
+        scheduler.call(call)
+    assert len(calls) == 1
+    assert scheduler.stats["retries"] == 0
+
+
+def test_token_quota_delays_calls_past_the_budget():
+    # 600 tokens per minute refill 10 per second
+    scheduler = make_scheduler(tokens_per_minute=600, interactive_reserve=0)
+    scheduler.call(lambda: "ok", tokens=600)
+
+    started = time.monotonic()
+    scheduler.call(lambda: "ok", tokens=5)
+
+    assert time.monotonic() - started >= 0.4
@@ -0,0 +1,145 @@
+import pytest
+from qdrant_client import QdrantClient
+
+from src.contract_analysis.benchmarks.chunking import CLAUSES
+from src.contract_analysis.benchmarks.fakes import FakeClassifierLLM, FakeOpenAIClient
+from src.contract_analysis.classification import CATEGORIES, ContractClassifier
+from src.contract_analysis.pipeline import ContractJob
+from src.contract_analysis.services import ContractsService
+from src.contract_analysis.uploader import PointUploader
+
+COLLECTION = "test_contracts"
+
+
+@pytest.fixture
+def service(tmp_path, monkeypatch):
+    monkeypatch.setenv("CONTRACTS_DIR", str(tmp_path))
+    monkeypatch.setenv("QDRANT_COLLECTION_NAME", COLLECTION)
+    monkeypatch.setenv("QDRANT_SHARDING", "none")
+    monkeypatch.setenv("FILE_STATE_INDEX_PATH", str(tmp_path / "file_state.json"))
+    for name in ("EMBEDDING_CACHE_PATH", "CLASSIFICATION_CACHE_PATH", "CONVERSION_CACHE_PATH"):
+        monkeypatch.setenv(name, "")
+    service = ContractsService(
+        vector_client=QdrantClient(location=":memory:"),
+        openai_client=FakeOpenAIClient(),
+        classifier=ContractClassifier("", llm=FakeClassifierLLM(CATEGORIES)),
+    )
+    service._create_collection()
+    return service
+
+
+def contract(sentences: int, changed: int = -1) -> str:
+    """Markdown of a contract, with the sentence at index `changed` reworded."""
+    return " ".join(
+        f"{CLAUSES[i % len(CLAUSES)]} {'Revised item' if i == changed else 'Item'} {i}."
+        for i in range(sentences)
+    )
+
+
+def job_for(markdown: str) -> ContractJob:
+    return ContractJob(
+        filename="license.md",
+        file_path="license.md",
+        md5=str(hash(markdown)),
+        markdown=markdown,
+        classification={"category": "License Agreement", "reasoning": ""},
+    )
+
+
+def commit(service: ContractsService, job: ContractJob) -> None:
+    uploader = PointUploader(service.vector_client, COLLECTION)
+    try:
+        service._commit_contract(job, uploader)
+    finally:
+        uploader.close()
+    service._embedded_files.add(job.filename)
+
+
+def stored_ids(service: ContractsService) -> set:
+    records, _ = service.vector_client.scroll(COLLECTION, limit=10_000)
+    return {str(record.id) for record in records}
+
+
+def test_chunk_point_ids_are_stable_and_distinct_for_repeated_chunks():
+    chunks = ["Same clause.", "Other clause.", "Same clause."]
+
+    ids = ContractsService._chunk_point_ids("a.md", chunks)
+
+    assert ids == ContractsService._chunk_point_ids("a.md", chunks)
+    assert len(set(ids)) == 3
+    assert set(ids).isdisjoint(ContractsService._chunk_point_ids("b.md", chunks))
+
+
+def test_new_contract_embeds_every_chunk(service):
+    job = job_for(contract(40))
+
+    points = service._build_points(job)
+
+    chunks = service._semantic_chunker(job.markdown)
+    assert [point.id for point in points] == service._chunk_point_ids(job.filename, chunks)
+    assert job.payload_updates == {}
+    assert job.stale_ids == []
+
+
+def test_unchanged_contract_only_refreshes_metadata(service):
+    first = job_for(contract(40))
+    first.points = service._build_points(first)
+    commit(service, first)
+
+    again = job_for(contract(40))
+    points = service._build_points(again)
+
+    assert points == []
+    assert set(again.payload_updates) == stored_ids(service)
+    assert again.stale_ids == []
+
+
+def test_changed_contract_embeds_new_chunks_and_removes_stale_ones(service):
+    first = job_for(contract(40))
+    first.points = service._build_points(first)
+    commit(service, first)
+    before = stored_ids(service)
+
+    changed = job_for(contract(40, changed=25))
+    changed.points = service._build_points(changed)
+    new_ids = {point.id for point in changed.points}
+    chunk_ids = set(
+        service._chunk_point_ids(changed.filename, service._semantic_chunker(changed.markdown))
+    )
+
+    assert new_ids and changed.stale_ids
+    assert new_ids.isdisjoint(before)
+    assert set(changed.payload_updates) == before & chunk_ids
+    assert set(changed.stale_ids) == before - chunk_ids
+
+    commit(service, changed)
+    assert stored_ids(service) == chunk_ids
+
+
+def test_failed_update_keeps_the_previous_points(service, monkeypatch):
+    first = job_for(contract(40))
+    first.points = service._build_points(first)
+    commit(service, first)
+    records, _ = service.vector_client.scroll(COLLECTION, limit=10_000)
+    before = {str(record.id): record.payload["metadata"]["md5"] for record in records}
+
+    changed = job_for(contract(40, changed=25))
+    changed.points = service._build_points(changed)
+    delete = service.vector_client.delete
+
+    def fail_stale_delete(*args, points_selector=None, **kwargs):
+        if getattr(points_selector, "points", None) == changed.stale_ids:
+            raise RuntimeError("Qdrant unavailable")
+        return delete(*args, points_selector=points_selector, **kwargs)
+
+    monkeypatch.setattr(service.vector_client, "delete", fail_stale_delete)
+    with pytest.raises(RuntimeError):
+        commit(service, changed)
+    uploader = PointUploader(service.vector_client, COLLECTION)
+    try:
+        service._discard_contract_points(changed, uploader)
+    finally:
+        uploader.close()
+
+    records, _ = service.vector_client.scroll(COLLECTION, limit=10_000)
+    assert {str(record.id): record.payload["metadata"]["md5"] for record in records} == before